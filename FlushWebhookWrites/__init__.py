@@ -0,0 +1,14 @@
+from main import *
+import logging
+import azure.functions as func
+import write_buffer
+
+
+def main(timer: func.TimerRequest) -> None:
+    """Write whatever webhook rows are still buffered, however few."""
+    buffer = write_buffer.WriteBuffer()
+    try:
+        written = buffer.flush(write_rows_to_sheet, force=True)
+        logging.info(f"Flushed {written} buffered webhook rows")
+    finally:
+        buffer.close()
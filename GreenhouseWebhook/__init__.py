@@ -0,0 +1,59 @@
+from main import *
+import logging
+import azure.functions as func
+import webhooks
+import write_buffer
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Greenhouse "application created/updated" webhooks. The application is
+    processed on its own and its rows are buffered, so sheet writes happen
+    in small batches (see write_buffer and FlushWebhookWrites).
+    Applications already written with the same resume are skipped.
+    """
+    body = req.get_body()
+    secret = webhooks.webhook_secret()
+    if not secret:
+        logging.error("GREENHOUSE_WEBHOOK_SECRET is not configured")
+        return func.HttpResponse("Webhook secret not configured", status_code=500)
+    if not webhooks.verify_signature(
+        body, req.headers.get(webhooks.SIGNATURE_HEADER), secret
+    ):
+        logging.warning("Rejected webhook with an invalid signature")
+        return func.HttpResponse("Invalid signature", status_code=401)
+    try:
+        event = json.loads(body)
+    except ValueError:
+        return func.HttpResponse("Invalid JSON", status_code=400)
+
+    action = event.get("action")
+    if action not in webhooks.APPLICATION_ACTIONS:
+        return func.HttpResponse(f"Ignored {action}", status_code=200)
+    application_id = webhooks.application_id(event)
+    if application_id is None:
+        return func.HttpResponse("No application in payload", status_code=400)
+
+    buffer = write_buffer.WriteBuffer()
+    try:
+        result = await process_application(
+            application_id, write_rows=lambda rows: buffer.add(application_id, rows)
+        )
+        if result.status_code >= 400:
+            return result
+        try:
+            written = buffer.flush(write_rows_to_sheet)
+        except Exception as e:
+            # Rows stay buffered for the next flush
+            logging.error(f"Webhook flush failed: {e}")
+            written = 0
+        return func.HttpResponse(
+            f"Application {application_id} - {result.get_body().decode()}"
+            f" - {written} rows written",
+            status_code=result.status_code,
+        )
+    except Exception as e:
+        logging.error(f"Webhook exception found: {e}")
+        return func.HttpResponse(str(e), status_code=500)
+    finally:
+        buffer.close()
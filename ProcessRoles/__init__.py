@@ -1,6 +1,8 @@
 from main import *
 import logging
 import azure.functions as func
+import profiling
+import run_lease
 
 
 async def main(req: func.HttpRequest) -> func.HttpResponse:
@@ -16,14 +18,32 @@ async def main(req: func.HttpRequest) -> func.HttpResponse:
     ).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     try:
-        result = await process(created_after_date, created_before_date)
+        profile_suffix = ""
+        if profiling.profiling_requested(req):
+            async with profiling.ProcessProfiler() as profiler:
+                result = await run_lease.single_flight(
+                    created_after_date, created_before_date, process
+                )
+            profile_suffix = f" - profile {profiler.profile_id}"
+        else:
+            # Overlapping triggers attach to the in-flight run or only
+            # process the part of the window nobody has covered yet.
+            result = await run_lease.single_flight(
+                created_after_date, created_before_date, process
+            )
         if result.status_code == 200:
             return func.HttpResponse(
-                f"Main 1 - Processed - {result.status_code}", status_code=200
+                f"Main 1 - Processed - {result.status_code}{profile_suffix}",
+                status_code=200,
+            )
+        elif result.status_code == 202:
+            return func.HttpResponse(
+                f"Main 1 - {result.get_body().decode()}{profile_suffix}",
+                status_code=202,
             )
         else:
             return func.HttpResponse(
-                f"Main 0 Failed to Process - {result.get_body()} -{result.status_code}",
+                f"Main 0 Failed to Process - {result.get_body()} -{result.status_code}{profile_suffix}",
                 status_code=500,
             )
     except Exception as e:
@@ -0,0 +1,35 @@
+from main import *
+import logging
+import azure.functions as func
+import run_lease
+import work_queue
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Same window as ProcessRoles, but only fetches the applications and
+    queues their ids in micro-batches for ProcessRolesWorker instances. The
+    messages are sent inside the run lease, so a failed send fails the run
+    and the next trigger retries it.
+    """
+    created_after_date = (
+        datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1)
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    created_before_date = (
+        datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=1)
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    try:
+        queue = work_queue.StorageQueue()
+        try:
+            return await run_lease.single_flight(
+                created_after_date,
+                created_before_date,
+                lambda after, before: enqueue_process(after, before, queue),
+            )
+        finally:
+            queue.close()
+    except Exception as e:
+        logging.error(f"Fanout exception found: {e}")
+        return func.HttpResponse(str(e), status_code=500)
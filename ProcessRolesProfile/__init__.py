@@ -0,0 +1,25 @@
+import json
+import logging
+import azure.functions as func
+import profiling
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Download a ProcessRoles profile as a zip (?id=<profile_id>), or list the
+    available profile ids when no id is given.
+    """
+    profile_id = req.params.get("id")
+    if not profile_id:
+        return func.HttpResponse(
+            json.dumps(profiling.list_profiles()), mimetype="application/json"
+        )
+    archive = profiling.profile_archive(profile_id)
+    if archive is None:
+        logging.error(f"Profile not found: {profile_id}")
+        return func.HttpResponse("Profile not found", status_code=404)
+    return func.HttpResponse(
+        archive,
+        mimetype="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.zip"'},
+    )
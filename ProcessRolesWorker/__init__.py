@@ -0,0 +1,19 @@
+from main import *
+import logging
+import azure.functions as func
+
+
+async def main(msg: func.QueueMessage) -> None:
+    """
+    Process one micro-batch queued by ProcessRolesFanout. Its rows are
+    written before the message completes; raising lets the platform retry
+    the message and eventually poison it.
+    """
+    work_item = msg.get_json()
+    result = await process_work_item(work_item, write_rows=write_rows_to_sheet)
+    if result.status_code >= 500:
+        raise RuntimeError(result.get_body().decode())
+    logging.info(
+        f"Work item {work_item['run_id']}#{work_item['part']}: "
+        f"{result.get_body().decode()}"
+    )
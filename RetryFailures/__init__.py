@@ -0,0 +1,17 @@
+from main import *
+import logging
+import azure.functions as func
+import retry
+
+
+async def main(timer: func.TimerRequest) -> None:
+    """
+    Reprocess due items from the retry queue: failed downloads, unparsable
+    LLM responses and Batches that were still running at their deadline.
+    """
+    try:
+        summary = await retry.retry_failures()
+        logging.info(f"Retried failures: {summary}")
+    except Exception as e:
+        # Items keep their backoff and are picked up by the next run
+        logging.error(f"Retry run failed: {e}")
@@ -0,0 +1,291 @@
+import contextlib
+import logging
+import os
+import sqlite3
+
+import storage
+import telemetry
+
+SUMMARY_HEADERS = [
+    "Role",
+    "Date Quarter",
+    "Dimension",
+    "Value",
+    "Rows",
+    "Candidates",
+]
+# Breakdown dimensions reported per Role / Date Quarter. Each maps to the
+# flattened row fields whose non-empty values make up the dimension value.
+AGGREGATE_DIMENSIONS = {
+    "Total": [],
+    "Education": ["Education"],
+    "Schools": ["Schools"],
+    "Relevant Experience": ["Relevant Experience"],
+    "Country": ["Country"],
+    "State/Province": ["Country", "State/Province"],
+    "City": ["Country", "State/Province", "City"],
+}
+FIRST_DATA_ROW = 2  # Row 1 of the summary tab holds SUMMARY_HEADERS
+
+
+def aggregate_db_path():
+    # Shared by every run, so pushes don't find the store behind the sheet
+    return os.getenv("ROLE_TRENDS_DB_PATH") or storage.state_db_path(
+        "role_trends_aggregates.db"
+    )
+
+
+@contextlib.contextmanager
+def push_lock(db_path=None, timeout=300):
+    """
+    Serialize updating the store and pushing the summary tab, so concurrent
+    runs don't hand the same new sheet row to different groups. The lock is
+    a write transaction on a file next to the store, released on close (or
+    when the holding process dies).
+    """
+    lock = sqlite3.connect(
+        f"{db_path or aggregate_db_path()}.lock", timeout=timeout, isolation_level=None
+    )
+    try:
+        lock.execute("BEGIN IMMEDIATE")
+        yield
+    finally:
+        lock.close()
+
+
+def open_aggregate_store(db_path=None):
+    """
+    The rollup store. It is a cache of the summary tab: the sheet owns row
+    positions, and a store that has fallen behind the sheet (e.g. one that
+    was lost, or a sheet edited by hand) is rebuilt from the raw tab before
+    it pushes.
+    """
+    conn = sqlite3.connect(db_path or aggregate_db_path())
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(aggregates)")]
+    if "sheet_row" in columns:
+        # Stores from before the sheet owned row positions; rebuilt on push
+        conn.executescript(
+            "DROP TABLE aggregates; DROP TABLE IF EXISTS aggregate_members;"
+        )
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS aggregates (
+            role TEXT NOT NULL,
+            quarter TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            candidate_count INTEGER NOT NULL DEFAULT 0,
+            pushed_row_count INTEGER,
+            pushed_candidate_count INTEGER,
+            pending INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (role, quarter, dimension, value)
+        );
+        CREATE TABLE IF NOT EXISTS aggregate_members (
+            role TEXT NOT NULL,
+            quarter TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            candidate_id TEXT NOT NULL,
+            PRIMARY KEY (role, quarter, dimension, value, candidate_id)
+        );
+        """)
+    return conn
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def aggregate_keys(row):
+    """
+    Given a flattened row from normalize_candidates, return the
+    (role, quarter, dimension, value) groups the row contributes to.
+    Dimensions whose fields are empty on this row are skipped, which is
+    the case for the padding rows expand_candidate produces.
+    """
+    role = _clean(row.get("Role"))
+    quarter = _clean(row.get("Date Quarter"))
+    keys = []
+    for dimension, fields in AGGREGATE_DIMENSIONS.items():
+        if not fields:
+            keys.append((role, quarter, dimension, "All"))
+            continue
+        parts = [_clean(row.get(field)) for field in fields]
+        if not parts[-1]:
+            continue
+        keys.append((role, quarter, dimension, " / ".join(p for p in parts if p)))
+    return keys
+
+
+def update_aggregates(conn, flattened_rows):
+    """
+    Fold newly normalized rows into the persisted rollups. Only the groups
+    touched by these rows are updated and flagged as pending for the sheet,
+    so the cost is proportional to the new rows rather than the full history.
+    Returns the number of groups changed.
+    """
+    changed = set()
+    with conn:
+        for row in flattened_rows:
+            candidate_id = _clean(row.get("Candidate Id"))
+            for key in aggregate_keys(row):
+                conn.execute(
+                    "INSERT OR IGNORE INTO aggregates "
+                    "(role, quarter, dimension, value) VALUES (?, ?, ?, ?)",
+                    key,
+                )
+                new_member = False
+                if candidate_id:
+                    new_member = conn.execute(
+                        "INSERT OR IGNORE INTO aggregate_members "
+                        "(role, quarter, dimension, value, candidate_id) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (*key, candidate_id),
+                    ).rowcount
+                conn.execute(
+                    "UPDATE aggregates SET row_count = row_count + 1, "
+                    "candidate_count = candidate_count + ?, pending = 1 "
+                    "WHERE role = ? AND quarter = ? AND dimension = ? AND value = ?",
+                    (1 if new_member else 0, *key),
+                )
+                changed.add(key)
+    return len(changed)
+
+
+def read_summary(service, spreadsheet_id, sheet_name):
+    """
+    The summary tab as {(role, quarter, dimension, value): (sheet_row,
+    row_count, candidate_count)}, plus the next free row.
+    """
+    values = (
+        service.spreadsheets()
+        .values()
+        .get(spreadsheetId=spreadsheet_id, range=f"{sheet_name}!A:F")
+        .execute()
+        .get("values", [])
+    )
+    rows = {}
+    for sheet_row, row in enumerate(values[1:], start=FIRST_DATA_ROW):
+        row = [_clean(value) for value in row] + [""] * (6 - len(row))
+        counts = tuple(int(value) if value.isdigit() else None for value in row[4:6])
+        rows[tuple(row[:4])] = (sheet_row, *counts)
+    return rows, max(len(values) + 1, FIRST_DATA_ROW)
+
+
+def rebuild_aggregates(conn, service, spreadsheet_id, raw_tab, raw_headers):
+    """
+    Recompute every rollup from the raw tab, e.g. for a store that has never
+    seen the rows already on the sheet.
+    """
+    values = (
+        service.spreadsheets()
+        .values()
+        .get(spreadsheetId=spreadsheet_id, range=f"{raw_tab}!A:S")
+        .execute()
+        .get("values", [])
+    )
+    if values and values[0][:1] == raw_headers[:1]:
+        values = values[1:]
+    with conn:
+        conn.execute("DELETE FROM aggregates")
+        conn.execute("DELETE FROM aggregate_members")
+    update_aggregates(conn, [dict(zip(raw_headers, row)) for row in values])
+    telemetry.count("rebuilds")
+    logging.warning(f"Rebuilt Role Trends aggregates from {len(values)} raw rows")
+
+
+def push_aggregate_updates(
+    service, spreadsheet_id, sheet_name, conn, raw_tab=None, raw_headers=None
+):
+    """
+    Write the pending summary rows with a single batchUpdate, then clear
+    their pending flag. Rows are located by their key in the summary tab,
+    and new keys go after its last row. If the tab holds counts this store
+    didn't push, the store is rebuilt from raw_tab first (and nothing is
+    pushed without one). Rows that fail to push stay pending. Callers hold
+    push_lock().
+    """
+    pending = conn.execute(
+        "SELECT role, quarter, dimension, value, row_count, candidate_count, "
+        "pushed_row_count, pushed_candidate_count FROM aggregates "
+        "WHERE pending > 0"
+    ).fetchall()
+    if not pending:
+        return 0
+    on_sheet, next_row = read_summary(service, spreadsheet_id, sheet_name)
+    stale = [
+        row[:4]
+        for row in pending
+        if tuple(row[:4]) in on_sheet and on_sheet[tuple(row[:4])][1:] != row[6:8]
+    ]
+    if stale:
+        if raw_tab is None:
+            raise RuntimeError(
+                f"{len(stale)} Role Trends summary rows differ from the local "
+                "store and no raw tab was given to rebuild it from"
+            )
+        rebuild_aggregates(conn, service, spreadsheet_id, raw_tab, raw_headers)
+        pending = conn.execute(
+            "SELECT role, quarter, dimension, value, row_count, candidate_count "
+            "FROM aggregates"
+        ).fetchall()
+    data = []
+    if next_row == FIRST_DATA_ROW:
+        data.append({"range": f"{sheet_name}!A1:F1", "values": [SUMMARY_HEADERS]})
+    for row in sorted(pending):
+        key, counts = tuple(row[:4]), tuple(row[4:6])
+        if key in on_sheet:
+            sheet_row = on_sheet[key][0]
+            if on_sheet[key][1:] == counts:
+                continue
+        else:
+            sheet_row, next_row = next_row, next_row + 1
+        data.append(
+            {
+                "range": f"{sheet_name}!A{sheet_row}:F{sheet_row}",
+                "values": [[*key, *counts]],
+            }
+        )
+    if data:
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "RAW", "data": data},
+        ).execute()
+    with conn:
+        # A group counted again since it was read stays pending
+        conn.executemany(
+            "UPDATE aggregates SET pending = 0, pushed_row_count = ?, "
+            "pushed_candidate_count = ? "
+            "WHERE role = ? AND quarter = ? AND dimension = ? AND value = ? "
+            "AND row_count = ? AND candidate_count = ?",
+            [(*row[4:6], *row[:4], *row[4:6]) for row in pending],
+        )
+    updated = len([d for d in data if not d["range"].endswith("A1:F1")])
+    telemetry.count("rows", updated)
+    print(f"Updated {updated} Role Trends summary rows")
+    return updated
+
+
+@telemetry.traced()
+def refresh_role_trends(
+    service,
+    spreadsheet_id,
+    sheet_name,
+    flattened_rows,
+    raw_tab=None,
+    raw_headers=None,
+):
+    with push_lock():
+        conn = open_aggregate_store()
+        try:
+            update_aggregates(conn, flattened_rows)
+            return push_aggregate_updates(
+                service, spreadsheet_id, sheet_name, conn, raw_tab, raw_headers
+            )
+        except Exception as e:
+            logging.error(f"Failed to refresh Role Trends aggregates: {e}")
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,201 @@
+"""
+Which applications have been written to the raw tab, and with which
+resume. The poll, webhook, fan-out and retry paths all claim applications
+here before the LLM stage, so an application is extracted and written once,
+and again only when its resume changes.
+
+Each claim has an owner (the run holding it) and its own expiry, so a run
+can renew or release only its own claims, and a claim handed to a queued
+Batch lasts as long as the Batch may run.
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+
+import storage
+
+CLAIMED = "claimed"
+WRITTEN = "written"
+
+
+def application_log_path():
+    return os.getenv("APPLICATION_LOG_DB_PATH") or storage.state_db_path(
+        "recruitment_applications.db"
+    )
+
+
+def claim_seconds():
+    # How long a claim keeps other paths off an application that is being
+    # processed; longer than a run, so a crashed run's claims lapse
+    return float(os.getenv("APPLICATION_CLAIM_SECONDS", 3600))
+
+
+def batch_claim_seconds():
+    # A Batch may take its whole 24h completion window, and is collected by
+    # the next retry run after that
+    return float(os.getenv("APPLICATION_BATCH_CLAIM_SECONDS", 26 * 3600))
+
+
+def new_owner():
+    """An owner id for one run's claims."""
+    return f"run:{uuid.uuid4().hex}"
+
+
+def batch_owner(batch_id):
+    """The owner of the claims on a queued Batch's candidates."""
+    return f"batch:{batch_id}"
+
+
+def resume_key(application):
+    """
+    What identifies the application's current resume. Attachment URLs are
+    signed per request, so the filename and upload time are used instead.
+    """
+    resume = next(
+        (
+            attachment
+            for attachment in application.get("attachments") or []
+            if attachment.get("type") == "resume"
+        ),
+        None,
+    )
+    if resume is None:
+        return ""
+    return f"{resume.get('filename', '')}|{resume.get('created_at', '')}"
+
+
+def tracked(application):
+    """
+    The parts of an application the log looks at, small enough to hand back
+    from a backfill worker to the coordinator that marks it written.
+    """
+    return {
+        "id": application.get("id"),
+        "attachments": [
+            attachment
+            for attachment in application.get("attachments") or []
+            if attachment.get("type") == "resume"
+        ],
+    }
+
+
+class ApplicationLog:
+    def __init__(self, db_path=None):
+        self.conn = sqlite3.connect(
+            db_path or application_log_path(),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS applications ("
+            "application_id TEXT PRIMARY KEY, resume_key TEXT NOT NULL, "
+            "status TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "owner TEXT, expires_at REAL)"
+        )
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(applications)")
+        ]
+        if "owner" not in columns:
+            # Logs from before claims had owners; their claims count as lapsed
+            self.conn.execute("ALTER TABLE applications ADD COLUMN owner TEXT")
+            self.conn.execute("ALTER TABLE applications ADD COLUMN expires_at REAL")
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, application):
+        return self.conn.execute(
+            "SELECT resume_key, status, owner, expires_at FROM applications "
+            "WHERE application_id = ?",
+            (str(application["id"]),),
+        ).fetchone()
+
+    @staticmethod
+    def _taken(row, key, now, owner=None):
+        """Whether the row keeps anyone but owner off this resume."""
+        if row is None or row[0] != key:
+            return False
+        if row[1] == WRITTEN:
+            return True
+        return row[2] != owner and (row[3] or 0) > now
+
+    def unwritten(self, applications):
+        """The applications not written or claimed with their current resume."""
+        now = time.time()
+        return [
+            application
+            for application in applications
+            if application.get("id") is None
+            or not self._taken(self._row(application), resume_key(application), now)
+        ]
+
+    def claim(self, applications, owner, ttl=None):
+        """
+        Claim applications for owner; returns those claimed. Ones that are
+        written with the same resume, or claimed by another owner, are left
+        out; owner's own claims are renewed. Applications without an id
+        can't be tracked and are kept.
+        """
+        ttl = claim_seconds() if ttl is None else ttl
+        now = time.time()
+        claimed = []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for application in applications:
+                if application.get("id") is None:
+                    claimed.append(application)
+                    continue
+                key = resume_key(application)
+                if self._taken(self._row(application), key, now, owner):
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO applications VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(application["id"]), key, CLAIMED, now, owner, now + ttl),
+                )
+                claimed.append(application)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def hand_over(self, applications, owner, new_owner, ttl):
+        """Pass owner's claims to new_owner, e.g. a queued Batch, for ttl."""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE applications SET owner = ?, expires_at = ?, updated_at = ? "
+            "WHERE application_id = ? AND status = ? AND owner = ?",
+            [
+                (new_owner, now + ttl, now, str(a["id"]), CLAIMED, owner)
+                for a in applications
+                if a.get("id") is not None
+            ],
+        )
+
+    def mark_written(self, applications):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO applications VALUES (?, ?, ?, ?, NULL, NULL)",
+            [
+                (str(a["id"]), resume_key(a), WRITTEN, time.time())
+                for a in applications
+                if a.get("id") is not None
+            ],
+        )
+
+    def release(self, applications, owner):
+        """
+        Drop owner's claims that didn't end in a write, so a retry can take
+        them; other owners' claims are left alone.
+        """
+        self.conn.executemany(
+            "DELETE FROM applications "
+            "WHERE application_id = ? AND status = ? AND owner = ?",
+            [
+                (str(a["id"]), CLAIMED, owner)
+                for a in applications
+                if a.get("id") is not None
+            ],
+        )
@@ -0,0 +1,262 @@
+"""
+Backfill a historical date range by splitting it into shards sized by
+application volume and processing them in parallel worker processes.
+
+    python backfill.py --start 2024-01-01 --end 2025-01-01 --workers 4
+
+Workers run the normal process() pipeline for their window but hand their
+rows back instead of writing them; the coordinator writes each finished
+shard to the sheet (and Role Trends aggregates) one at a time, and only then
+marks its applications written in the application log. Greenhouse and
+OpenAI calls from every worker draw from shared rate limiters.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import math
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import application_log
+import main
+import rate_limits
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+LAST_PAGE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+
+def parse_timestamp(value):
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def estimate_applications(created_after, created_before):
+    """
+    Count applications in a window with a single one-item page: Harvest's
+    Link header points rel="last" at the page number, which is the count.
+    """
+    url = (
+        f"{main.HARVEST_API_URL}/applications?"
+        f"created_after={format_timestamp(created_after)}"
+        f"&created_before={format_timestamp(created_before)}"
+    )
+    headers = {"Authorization": f"Basic {main.GREENHOUSE_API_KEY_ENCODED}"}
+    response = main.harvest_get(url, headers, {"page": 1, "per_page": 1})
+    response.raise_for_status()
+    match = LAST_PAGE.search(response.headers.get("Link", ""))
+    if match:
+        return int(match.group(1))
+    return len(response.json())
+
+
+def plan_shards(start, end, target_size=2000, probe_days=7, estimate=None):
+    """
+    Split [start, end) into windows of roughly target_size applications.
+    The range is probed in probe_days windows; busy probe windows are split
+    evenly and quiet neighbours are merged. Returns (after, before, expected)
+    tuples.
+    """
+    estimate = estimate or estimate_applications
+    step = datetime.timedelta(days=probe_days)
+    shards = []
+    current_start, current_count = None, 0
+    probe_start = start
+    while probe_start < end:
+        probe_end = min(probe_start + step, end)
+        count = estimate(probe_start, probe_end)
+        if count > target_size:
+            if current_start is not None:
+                shards.append((current_start, probe_start, current_count))
+                current_start, current_count = None, 0
+            parts = math.ceil(count / target_size)
+            width = (probe_end - probe_start) / parts
+            for i in range(parts):
+                shard_end = (
+                    probe_end if i == parts - 1 else probe_start + width * (i + 1)
+                )
+                shards.append(
+                    (probe_start + width * i, shard_end, math.ceil(count / parts))
+                )
+        else:
+            if current_start is not None and current_count + count > target_size:
+                shards.append((current_start, probe_start, current_count))
+                current_start, current_count = None, 0
+            if current_start is None:
+                current_start = probe_start
+            current_count += count
+        probe_start = probe_end
+    if current_start is not None:
+        shards.append((current_start, end, current_count))
+    return [shard for shard in shards if shard[2] > 0]
+
+
+def _init_worker(greenhouse_limiter, openai_limiter):
+    rate_limits.configure("greenhouse", greenhouse_limiter)
+    rate_limits.configure("openai", openai_limiter)
+
+
+def run_shard(created_after, created_before, extraction_deadline=None):
+    rows, extracted = [], []
+    owner = application_log.new_owner()
+    response = asyncio.run(
+        main.process(
+            created_after,
+            created_before,
+            write_rows=rows.extend,
+            extraction_deadline=extraction_deadline,
+            extracted=extracted,
+            owner=owner,
+        )
+    )
+    return {
+        "created_after": created_after,
+        "created_before": created_before,
+        "status_code": response.status_code,
+        "message": response.get_body().decode("utf-8", errors="replace"),
+        "rows": rows,
+        # Claimed by the worker; marked written once the rows are written
+        "applications": [application_log.tracked(a) for a in extracted],
+        "owner": owner,
+    }
+
+
+def run_backfill(
+    start,
+    end,
+    workers=4,
+    target_size=2000,
+    probe_days=7,
+    greenhouse_rate="50/10",
+    openai_rate="500/60",
+    extraction_deadline=86400,
+    dry_run=False,
+    write_rows=None,
+):
+    start, end = parse_timestamp(start), parse_timestamp(end)
+    shards = plan_shards(start, end, target_size, probe_days)
+    expected_total = sum(expected for _, _, expected in shards)
+    print(f"Planned {len(shards)} shards for ~{expected_total} applications")
+    for after, before, expected in shards:
+        print(f"  {format_timestamp(after)} -> {format_timestamp(before)}: ~{expected}")
+    if dry_run or not shards:
+        return {"shards": len(shards), "completed": [], "failed": []}
+
+    write_rows = write_rows or main.write_rows_to_sheet
+    context = get_context("spawn")
+    greenhouse_limiter = rate_limits.RateLimiter.shared(
+        *rate_limits.parse_rate(greenhouse_rate), context=context
+    )
+    openai_limiter = rate_limits.RateLimiter.shared(
+        *rate_limits.parse_rate(openai_rate), context=context
+    )
+    completed, failed = [], []
+    done_expected, rows_written = 0, 0
+    started = time.monotonic()
+    log = application_log.ApplicationLog()
+    with contextlib.closing(log), ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(greenhouse_limiter, openai_limiter),
+    ) as pool:
+        futures = {
+            pool.submit(
+                run_shard,
+                format_timestamp(after),
+                format_timestamp(before),
+                extraction_deadline,
+            ): (after, before, expected)
+            for after, before, expected in shards
+        }
+        for future in as_completed(futures):
+            after, before, expected = futures[future]
+            window = f"{format_timestamp(after)} -> {format_timestamp(before)}"
+            result = None
+            try:
+                result = future.result()
+                if result["status_code"] != 200:
+                    raise RuntimeError(result["message"])
+                if result["rows"]:
+                    write_rows(result["rows"])
+                log.mark_written(result["applications"])
+                rows_written += len(result["rows"])
+                completed.append(window)
+            except Exception as e:
+                print(f"Shard {window} failed: {e}")
+                if result is not None:
+                    # So the rerun printed below processes them again
+                    log.release(result["applications"], result["owner"])
+                failed.append(window)
+            done_expected += expected
+            elapsed = time.monotonic() - started
+            remaining = elapsed / done_expected * (expected_total - done_expected)
+            print(
+                f"[{len(completed) + len(failed)}/{len(shards)}] {window} "
+                f"rows={rows_written} failed={len(failed)} "
+                f"elapsed={elapsed:.0f}s eta={remaining:.0f}s"
+            )
+    if failed:
+        print("Failed shards (rerun with --start/--end):")
+        for window in failed:
+            print(f"  {window}")
+    return {"shards": len(shards), "completed": completed, "failed": failed}
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--start", required=True, help="created_after, ISO date")
+    parser.add_argument("--end", required=True, help="created_before, ISO date")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--target-shard-size",
+        type=int,
+        default=2000,
+        help="Approximate applications per shard",
+    )
+    parser.add_argument("--probe-days", type=int, default=7)
+    parser.add_argument(
+        "--greenhouse-rate",
+        default="50/10",
+        help="Harvest requests allowed per window across all workers",
+    )
+    parser.add_argument(
+        "--openai-rate",
+        default="500/60",
+        help="OpenAI requests allowed per window across all workers",
+    )
+    parser.add_argument(
+        "--extraction-deadline",
+        type=float,
+        default=86400,
+        help="Seconds each shard may wait for LLM results; long enough for Batch",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    args = parser.parse_args(argv)
+    return run_backfill(
+        args.start,
+        args.end,
+        workers=args.workers,
+        target_size=args.target_shard_size,
+        probe_days=args.probe_days,
+        greenhouse_rate=args.greenhouse_rate,
+        openai_rate=args.openai_rate,
+        extraction_deadline=args.extraction_deadline,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,481 @@
+"""
+In-process HTTP stand-ins for the Greenhouse Harvest API (plus resume
+attachment downloads), the OpenAI chat completions / files / batches API and
+the Google Sheets values API. Each runs a ThreadingHTTPServer on a free
+localhost port with configurable latency, error rate and rate limits, and
+records per-endpoint request stats for the load test.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import synthetic
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class FakeService:
+    """
+    Base class: routes requests to handle_<method>(path, query, body) and
+    injects latency and errors before the handler runs. latency is either a
+    number of seconds or a (min, max) range.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()  # batch views build completions under it
+        self.stats = {}
+        self.seen = set()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read_body(self):
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().split(b";")[0], 16)
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                        if size == 0:
+                            return b"".join(chunks)
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _dispatch(self, method):
+                body = self._read_body()
+                try:
+                    status, headers, payload = service.dispatch(
+                        method, self.path, self.headers, body
+                    )
+                except Exception as e:
+                    status, headers, payload = 500, {}, {"error": repr(e)}
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **headers}
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, str(value))
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("get")
+
+            def do_POST(self):
+                self._dispatch("post")
+
+            def do_PUT(self):
+                self._dispatch("put")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def endpoint(self, method, path):
+        """Collapse ids out of the path so stats group by endpoint."""
+        return f"{method.upper()} " + re.sub(r"/(?!v\d+/)[^/]*\d[^/]*", "/{id}", path)
+
+    def dispatch(self, method, raw_path, headers, body):
+        started = time.perf_counter()
+        parsed = urllib.parse.urlsplit(raw_path)
+        path = urllib.parse.unquote(parsed.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        with self.lock:
+            delay = self.latency
+            if isinstance(delay, (tuple, list)):
+                delay = self.random.uniform(*delay)
+            fail = self.random.random() < self.error_rate
+            request_key = (method, raw_path, hash(body))
+            retry = request_key in self.seen
+            self.seen.add(request_key)
+        time.sleep(delay)
+        if fail:
+            status, out_headers, payload = 500, {}, {"error": "injected failure"}
+        else:
+            handler = getattr(self, f"handle_{method}", None)
+            if handler is None:
+                status, out_headers, payload = 405, {}, {"error": "method"}
+            else:
+                status, out_headers, payload = handler(path, query, headers, body)
+        self.record(self.endpoint(method, path), status, started, retry)
+        return status, out_headers, payload
+
+    def record(self, endpoint, status, started, retry):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            stats = self.stats.setdefault(
+                endpoint, {"requests": 0, "repeats": 0, "statuses": {}, "latencies": []}
+            )
+            stats["requests"] += 1
+            stats["repeats"] += 1 if retry else 0
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            stats["latencies"].append(elapsed)
+
+    def summary(self):
+        with self.lock:
+            return {
+                endpoint: {
+                    "requests": stats["requests"],
+                    "repeats": stats["repeats"],
+                    "statuses": dict(stats["statuses"]),
+                    "p50_ms": round(percentile(stats["latencies"], 0.5) * 1000, 1),
+                    "p95_ms": round(percentile(stats["latencies"], 0.95) * 1000, 1),
+                    "p99_ms": round(percentile(stats["latencies"], 0.99) * 1000, 1),
+                }
+                for endpoint, stats in self.stats.items()
+            }
+
+
+class FakeGreenhouse(FakeService):
+    """
+    Harvest /v1/jobs and /v1/applications with page/per_page pagination,
+    created_after/created_before filtering, Link headers and X-RateLimit-*
+    headers (429 + Retry-After once the window's budget is spent), single
+    /v1/applications/<id> and /v1/jobs/<id> lookups, plus /resumes/<n>.<ext>
+    attachment downloads. Resume numbers in missing_resumes answer 404.
+    """
+
+    def __init__(
+        self,
+        applications=1000,
+        jobs=None,
+        rate_limit=50,
+        rate_window=10.0,
+        resume_pool=100,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.jobs = synthetic.make_jobs(jobs or max(1, applications // 50))
+        self.applications = []
+        self.application_count = applications
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.window_started = time.monotonic()
+        self.window_requests = 0
+        self.resume_pool = resume_pool
+        self.resumes = {}
+        self.missing_resumes = set()
+
+    def start(self):
+        super().start()
+        self.applications = synthetic.make_applications(
+            self.application_count, self.jobs, base_url=self.url
+        )
+        return self
+
+    def _rate_limit_headers(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_started >= self.rate_window:
+                self.window_started = now
+                self.window_requests = 0
+            self.window_requests += 1
+            remaining = self.rate_limit - self.window_requests
+            reset = self.rate_window - (now - self.window_started)
+        headers = {
+            "X-RateLimit-Limit": self.rate_limit,
+            "X-RateLimit-Remaining": max(0, remaining),
+        }
+        if remaining < 0:
+            headers["Retry-After"] = max(1, int(reset + 0.999))
+        return headers
+
+    def _page(self, path, query, items):
+        page = int(query.get("page", 1))
+        per_page = min(int(query.get("per_page", 100)), 500)
+        chunk = items[(page - 1) * per_page : page * per_page]
+        headers = self._rate_limit_headers()
+        if "Retry-After" in headers:
+            return 429, headers, {"message": "API rate limit exceeded"}
+        links = []
+        if page * per_page < len(items):
+            next_query = urllib.parse.urlencode({**query, "page": page + 1})
+            links.append(f'<{self.url}{path}?{next_query}>; rel="next"')
+        last_page = max(1, -(-len(items) // per_page))
+        last_query = urllib.parse.urlencode({**query, "page": last_page})
+        links.append(f'<{self.url}{path}?{last_query}>; rel="last"')
+        headers["Link"] = ", ".join(links)
+        return 200, headers, chunk
+
+    def _created_between(self, query):
+        after = query.get("created_after", "")[:19]
+        before = query.get("created_before", "")[:19]
+        return [
+            application
+            for application in self.applications
+            if (not after or application["applied_at"][:19] >= after)
+            and (not before or application["applied_at"][:19] < before)
+        ]
+
+    def _resume(self, path):
+        name = path.rsplit("/", 1)[-1]
+        number, extension = name.rsplit(".", 1)
+        if int(number) in self.missing_resumes:
+            return 404, {}, {"message": "not found"}
+        slot = (int(number) % self.resume_pool, extension)
+        with self.lock:
+            content = self.resumes.get(slot)
+        if content is None:
+            content = synthetic.make_resume_file(name, seed=slot[0])
+            with self.lock:
+                self.resumes[slot] = content
+        return 200, {"Content-Type": "application/octet-stream"}, content
+
+    def handle_get(self, path, query, headers, body):
+        if path == "/v1/jobs":
+            return self._page(path, query, self.jobs)
+        if path == "/v1/applications":
+            return self._page(path, query, self._created_between(query))
+        for prefix, items in (
+            ("/v1/applications/", self.applications),
+            ("/v1/jobs/", self.jobs),
+        ):
+            if path.startswith(prefix):
+                object_id = int(path.rsplit("/", 1)[-1])
+                for item in items:
+                    if item["id"] == object_id:
+                        return 200, self._rate_limit_headers(), item
+                return 404, {}, {"message": "not found"}
+        if path.startswith("/resumes/"):
+            return self._resume(path)
+        return 404, {}, {"message": "not found"}
+
+
+class FakeOpenAI(FakeService):
+    """
+    /v1/chat/completions, /v1/files and /v1/batches. Completions answer with
+    synthetic extraction JSON for the candidate found in the user message;
+    batches complete after batch_delay seconds.
+    """
+
+    CANDIDATE_ID = re.compile(r"'candidate_id': (\d+)")
+
+    def __init__(self, rate_limit_requests=5000, batch_delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limit_requests = rate_limit_requests
+        self.batch_delay = batch_delay
+        self.files = {}
+        self.batches = {}
+        self.cached_prefixes = set()
+
+    def _completion(self, request):
+        user = request["messages"][-1]["content"]
+        match = self.CANDIDATE_ID.search(user)
+        candidate_id = int(match.group(1)) if match else 0
+        application = {
+            "id": candidate_id,
+            "candidate_id": candidate_id,
+            "applied_at": "2024-02-01T00:00:00.000Z",
+            "jobs": [{"id": 1, "name": "Software Engineer"}],
+            "source": {"public_name": "LinkedIn"},
+            "attachments": [{"url": "https://files.example.com/resume.pdf"}],
+        }
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+        # Mimic provider prompt caching: a repeated system prefix of at least
+        # 1024 tokens is served from cache in 128-token increments.
+        system = request["messages"][0]["content"]
+        with self.lock:
+            cached_before = system in self.cached_prefixes
+            self.cached_prefixes.add(system)
+        prefix_tokens = len(system) // 4
+        cached = (prefix_tokens // 128) * 128 if cached_before else 0
+        cached = cached if cached >= 1024 else 0
+        content = synthetic.make_gpt_content(application, seed=candidate_id)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        }
+
+    def _batch_output(self, batch):
+        lines = []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            lines.append(
+                json.dumps(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": self._completion(request["body"]),
+                        },
+                        "error": None,
+                    }
+                )
+            )
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _batch_view(self, batch):
+        if batch["status"] == "in_progress" and (
+            time.monotonic() - batch["_created"] >= self.batch_delay
+        ):
+            output_id = f"file-{uuid.uuid4().hex}"
+            self.files[output_id] = self._batch_output(batch)
+            batch.update(status="completed", output_file_id=output_id)
+        return {k: v for k, v in batch.items() if not k.startswith("_")}
+
+    def handle_post(self, path, query, headers, body):
+        limit_headers = {
+            "x-ratelimit-limit-requests": self.rate_limit_requests,
+            "x-ratelimit-remaining-requests": self.rate_limit_requests - 1,
+        }
+        if path == "/v1/chat/completions":
+            return 200, limit_headers, self._completion(json.loads(body))
+        if path == "/v1/files":
+            # Multipart upload: keep the JSONL part, which is all we need.
+            match = re.search(
+                rb'name="file"[^\r\n]*\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', body, re.S
+            )
+            file_id = f"file-{uuid.uuid4().hex}"
+            with self.lock:
+                self.files[file_id] = match.group(1) if match else body
+            return 200, {}, {"id": file_id, "object": "file", "purpose": "batch"}
+        if path == "/v1/batches":
+            request = json.loads(body)
+            batch = {
+                "id": f"batch_{uuid.uuid4().hex}",
+                "object": "batch",
+                "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"],
+                "completion_window": request["completion_window"],
+                "status": "in_progress",
+                "output_file_id": None,
+                "error_file_id": None,
+                "created_at": int(time.time()),
+                "metadata": request.get("metadata"),
+                "_created": time.monotonic(),
+            }
+            with self.lock:
+                self.batches[batch["id"]] = batch
+            return 200, {}, self._batch_view(batch)
+        return 404, {}, {"error": {"message": "not found"}}
+
+    def handle_get(self, path, query, headers, body):
+        if path.startswith("/v1/batches/"):
+            with self.lock:
+                batch = self.batches.get(path.rsplit("/", 1)[-1])
+                view = self._batch_view(batch) if batch else None
+            if view is None:
+                return 404, {}, {"error": {"message": "no such batch"}}
+            return 200, {}, view
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match and match.group(1) in self.files:
+            return 200, {}, self.files[match.group(1)]
+        return 404, {}, {"error": {"message": "not found"}}
+
+
+class FakeSheets(FakeService):
+    """Sheets v4 values get / append / batchUpdate kept in memory per tab."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tabs = {}
+
+    @staticmethod
+    def _tab(range_name):
+        return range_name.split("!", 1)[0].strip("'")
+
+    def handle_get(self, path, query, headers, body):
+        match = re.fullmatch(r"/v4/spreadsheets/([^/]+)/values/(.+)", path)
+        if not match:
+            return 404, {}, {"error": {"message": "not found"}}
+        with self.lock:
+            rows = list(self.tabs.get(self._tab(match.group(2)), []))
+        return 200, {}, {"range": match.group(2), "values": rows}
+
+    def handle_post(self, path, query, headers, body):
+        request = json.loads(body or b"{}")
+        match = re.fullmatch(r"/v4/spreadsheets/([^/]+)/values/(.+):append", path)
+        if match:
+            tab = self._tab(match.group(2))
+            with self.lock:
+                self.tabs.setdefault(tab, []).extend(request.get("values", []))
+            return 200, {}, {"updates": {"updatedRows": len(request["values"])}}
+        if path.endswith("/values:batchUpdate"):
+            with self.lock:
+                for data in request.get("data", []):
+                    rows = self.tabs.setdefault(self._tab(data["range"]), [])
+                    start = int(re.search(r"![A-Z]+(\d+)", data["range"]).group(1))
+                    for offset, values in enumerate(data.get("values", [])):
+                        while len(rows) < start + offset:
+                            rows.append([])
+                        rows[start + offset - 1] = values
+            return 200, {}, {"totalUpdatedRanges": len(request.get("data", []))}
+        return 404, {}, {"error": {"message": "not found"}}
+
+    def row_count(self, tab):
+        with self.lock:
+            return len(self.tabs.get(tab, []))
+
+
+def sheets_service(url):
+    """A googleapiclient Sheets client that talks to a FakeSheets server."""
+    from google.auth.credentials import AnonymousCredentials
+    from googleapiclient.discovery import build
+
+    return build(
+        "sheets",
+        "v4",
+        credentials=AnonymousCredentials(),
+        client_options={"api_endpoint": url},
+        static_discovery=True,
+    )
@@ -0,0 +1,129 @@
+"""
+Run main.process end-to-end against the local fake Greenhouse, OpenAI and
+Sheets servers and report throughput, per-endpoint tail latency and how many
+requests were repeats (retries).
+
+    python -m benchmarks.load_test --applications 2000 --latency 0.05 0.3 \
+        --error-rate 0.01 --json load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from benchmarks.fake_services import (
+    FakeGreenhouse,
+    FakeOpenAI,
+    FakeSheets,
+    sheets_service,
+)
+from benchmarks.run import load_main
+
+
+def run_load_test(
+    applications=1000,
+    latency=(0.0, 0.0),
+    error_rate=0.0,
+    rate_limit=50,
+    rate_window=10.0,
+    llm_latency=None,
+):
+    main = load_main()
+    llm_latency = llm_latency if llm_latency is not None else latency
+    greenhouse = FakeGreenhouse(
+        applications=applications,
+        rate_limit=rate_limit,
+        rate_window=rate_window,
+        latency=latency,
+        error_rate=error_rate,
+    )
+    llm = FakeOpenAI(latency=llm_latency, error_rate=error_rate, seed=1)
+    sheets = FakeSheets(latency=latency, error_rate=error_rate, seed=2)
+    # A fresh application log, or a repeat run would skip every application
+    with greenhouse, llm, sheets, tempfile.TemporaryDirectory() as state:
+        service = sheets_service(sheets.url)
+        environ = {
+            "OPENAI_BASE_URL": f"{llm.url}/v1",
+            "APPLICATION_LOG_DB_PATH": os.path.join(state, "applications.db"),
+        }
+        with patch.object(main, "HARVEST_API_URL", f"{greenhouse.url}/v1"), patch.dict(
+            os.environ, environ
+        ), patch.object(main, "authenticate_google_sheets", return_value=service):
+            start = time.perf_counter()
+            response = asyncio.run(
+                main.process("2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z")
+            )
+            elapsed = time.perf_counter() - start
+        written = sheets.row_count(main.TAB_NAME)
+        return {
+            "applications": applications,
+            "status_code": response.status_code,
+            "seconds": round(elapsed, 3),
+            "applications_per_second": round(applications / elapsed, 2),
+            "rows_written": written,
+            "greenhouse": greenhouse.summary(),
+            "openai": llm.summary(),
+            "sheets": sheets.summary(),
+        }
+
+
+def _print_report(report):
+    print(
+        f"process -> {report['status_code']} in {report['seconds']}s "
+        f"({report['applications_per_second']} applications/s, "
+        f"{report['rows_written']} rows written)"
+    )
+    for service in ("greenhouse", "openai", "sheets"):
+        for endpoint, stats in sorted(report[service].items()):
+            print(
+                f"  {service:<10} {endpoint:<40} n={stats['requests']:<6} "
+                f"repeats={stats['repeats']:<4} p50={stats['p50_ms']}ms "
+                f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                f"statuses={stats['statuses']}"
+            )
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--applications", type=int, default=1000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        nargs=2,
+        default=[0.0, 0.0],
+        metavar=("MIN", "MAX"),
+        help="Per-request latency range in seconds for every fake service",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        nargs=2,
+        metavar=("MIN", "MAX"),
+        help="Override the latency range for the OpenAI fake",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=50)
+    parser.add_argument("--rate-window", type=float, default=10.0)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    report = run_load_test(
+        applications=args.applications,
+        latency=tuple(args.latency),
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        llm_latency=tuple(args.llm_latency) if args.llm_latency else None,
+    )
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,247 @@
+"""
+Per-stage throughput and memory benchmarks for the main.py pipeline on
+synthetic Greenhouse data.
+
+    python -m benchmarks.run --scales 1000 10000 50000 --json bench.json
+
+Each (stage, scale) runs in a fresh spawned process so that peak RSS is
+attributable to that stage alone.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from unittest.mock import patch
+
+from benchmarks import synthetic
+
+DEFAULT_SCALES = [1000, 10000, 50000]
+JOBS_PER_APPLICATIONS = 50
+RESUME_POOL_SIZE = 200
+
+
+def load_main():
+    """Import main.py with placeholder secrets so its import-time setup passes."""
+    os.environ.setdefault("GREENHOUSE_API_KEY", "benchmark")
+    os.environ.setdefault("GREENHOUSE_BASE_URL", "https://harvest.greenhouse.io")
+    os.environ.setdefault("SPREADSHEET_ID", "benchmark")
+    os.environ.setdefault("OPEN_AI_KEY", "benchmark")
+    os.environ.setdefault("USER_ID", "benchmark")
+    os.environ.setdefault(
+        "GOOGLE_SHEETS_CREDENTIALS_BASE64",
+        base64.b64encode(b'{"type": "service_account"}').decode("utf-8"),
+    )
+    import main
+
+    return main
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class _FakeResponse:
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+
+    def raise_for_status(self):
+        return None
+
+
+class _FakeSheetsService:
+    """Just enough of the Sheets client for write_to_google_sheet."""
+
+    def __init__(self):
+        self.appended = 0
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, **kwargs):
+        return self
+
+    def append(self, body=None, **kwargs):
+        self.appended += len(body["values"])
+        return self
+
+    def execute(self):
+        return {"values": []}
+
+
+def _inputs(count):
+    jobs = synthetic.make_jobs(max(1, count // JOBS_PER_APPLICATIONS))
+    applications = synthetic.make_applications(count, jobs)
+    return jobs, applications
+
+
+def stage_merge(main, count):
+    jobs, applications = _inputs(count)
+
+    def run():
+        return asyncio.run(main.merge_jobs_and_applications(jobs, applications))
+
+    return run
+
+
+def stage_resume_extraction(main, count):
+    _, applications = _inputs(count)
+    # Reuse a pool of rendered resumes; extraction cost does not depend on
+    # the bytes being unique and rendering 50k files would dominate setup.
+    pool = {}
+    for application in applications[:RESUME_POOL_SIZE]:
+        attachment = application["attachments"][0]
+        extension = os.path.splitext(attachment["filename"])[1]
+        pool.setdefault(extension, []).append(
+            synthetic.make_resume_file(attachment["filename"], seed=application["id"])
+        )
+
+    def fake_get(url, timeout=None, **kwargs):
+        extension = os.path.splitext(url)[1]
+        files = pool[extension]
+        return _FakeResponse(files[zlib.crc32(url.encode()) % len(files)])
+
+    def run():
+        with patch.object(main.requests, "get", fake_get):
+            return asyncio.run(main.download_resume_from_applications(applications))
+
+    return run
+
+
+def stage_validation_gpt(main, count):
+    _, applications = _inputs(count)
+    responses = [synthetic.make_gpt_response(a, a["id"]) for a in applications]
+
+    def run():
+        return main.validation_gpt_response(responses)
+
+    return run
+
+
+def stage_validation_batch(main, count):
+    _, applications = _inputs(count)
+    results = [synthetic.make_batch_result(a, a["id"]) for a in applications]
+
+    def run():
+        with patch("builtins.print"):
+            return main.validation_batch_response(results)
+
+    return run
+
+
+def stage_normalize(main, count):
+    _, applications = _inputs(count)
+    validated = [
+        json.loads(synthetic.make_gpt_content(a, a["id"])) for a in applications
+    ]
+
+    def run():
+        return main.normalize_candidates(validated)
+
+    return run
+
+
+def stage_write_rows(main, count):
+    _, applications = _inputs(count)
+    validated = [
+        json.loads(synthetic.make_gpt_content(a, a["id"])) for a in applications
+    ]
+    flattened_rows = main.normalize_candidates(validated)
+
+    def run():
+        service = _FakeSheetsService()
+        main.write_to_google_sheet(service, flattened_rows)
+        return service.appended
+
+    return run
+
+
+STAGES = {
+    "merge_jobs_and_applications": stage_merge,
+    "resume_extraction": stage_resume_extraction,
+    "validation_gpt_response": stage_validation_gpt,
+    "validation_batch_response": stage_validation_batch,
+    "normalize_candidates": stage_normalize,
+    "write_to_google_sheet": stage_write_rows,
+}
+
+
+def run_stage(stage, count, trace_allocations=False):
+    main = load_main()
+    run = STAGES[stage](main, count)
+    baseline_rss = _peak_rss_kb()
+    if trace_allocations:
+        # tracemalloc slows allocation-heavy stages several-fold, so wall
+        # times from a traced run are not comparable with untraced ones.
+        tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    traced_peak = None
+    if trace_allocations:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    return {
+        "stage": stage,
+        "count": count,
+        "seconds": round(elapsed, 4),
+        "items_per_second": round(count / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_kb() / 1024, 1),
+        "peak_rss_delta_mb": round((_peak_rss_kb() - baseline_rss) / 1024, 1),
+        "traced_peak_mb": traced_peak,
+    }
+
+
+def run_benchmarks(stages, scales, trace_allocations=False):
+    results = []
+    for count in scales:
+        for stage in stages:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(
+                    run_stage, stage, count, trace_allocations
+                ).result()
+            print(
+                f"{result['stage']:<30} {count:>7} "
+                f"{result['seconds']:>9.3f}s {result['items_per_second'] or 0:>10.1f}/s "
+                f"rss {result['peak_rss_mb']:>7.1f}MB (+{result['peak_rss_delta_mb']:.1f})"
+            )
+            results.append(result)
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument(
+        "--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES)
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="Report the tracemalloc peak as well (slows every stage down)",
+    )
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.stages, args.scales, args.trace_allocations)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,348 @@
+import datetime
+import io
+import json
+import random
+import struct
+
+from docx import Document
+
+FIRST_NAMES = ["Alice", "Bob", "Carla", "Deepak", "Elena", "Femi", "Grace", "Hiro"]
+LAST_NAMES = ["Nguyen", "Smith", "Okafor", "Garcia", "Kowalski", "Chen", "Patel"]
+ROLES = [
+    "Software Engineer",
+    "Data Scientist",
+    "Product Manager",
+    "Account Executive",
+    "Recruiter",
+    "Financial Analyst",
+]
+DEPARTMENTS = ["Engineering", "Data", "Product", "Sales", "People", "Finance"]
+OFFICES = ["Boston", "New York", "London", "Toronto", "Remote"]
+SCHOOLS = [
+    "Massachusetts Institute of Technology",
+    "University of Toronto",
+    "Boston University",
+    "Imperial College London",
+    "Northeastern University",
+]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+LOCATIONS = [
+    ("Boston", "Massachusetts", "USA"),
+    ("New York", "New York", "USA"),
+    ("Toronto", "Ontario", "Canada"),
+    ("London", "", "United Kingdom"),
+]
+EXPERIENCE = ["0-3 years", "4-7 years", "7-10 years", "10+ years"]
+BULLETS = [
+    "Led a cross-functional team delivering a customer-facing platform",
+    "Reduced infrastructure cost by 30% through capacity planning",
+    "Built reporting pipelines consumed by finance and operations",
+    "Mentored junior staff and ran the interview loop for the team",
+    "Owned quarterly planning and roadmap for a portfolio of products",
+    "Negotiated enterprise contracts with annual value above $1M",
+]
+RESUME_EXTENSIONS = [".pdf", ".pdf", ".pdf", ".docx", ".doc", ".txt"]
+
+
+def make_jobs(count, seed=0):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        department = rng.choice(DEPARTMENTS)
+        jobs.append(
+            {
+                "id": 1000 + i,
+                "name": f"{rng.choice(ROLES)} {i}",
+                "requisition_id": f"REQ-{i}",
+                "status": "open",
+                "confidential": False,
+                "departments": [{"id": i % 7, "name": department}],
+                "offices": [{"id": i % 5, "name": rng.choice(OFFICES)}],
+                "openings": [{"id": i, "opening_id": f"{i}-1", "status": "open"}],
+            }
+        )
+    return jobs
+
+
+def make_applications(count, jobs, seed=0, base_url="https://files.example.com"):
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    applications = []
+    for i in range(count):
+        job = rng.choice(jobs)
+        extension = rng.choice(RESUME_EXTENSIONS)
+        applied_at = start + datetime.timedelta(minutes=17 * i)
+        applications.append(
+            {
+                "id": 500000 + i,
+                "candidate_id": 900000 + i,
+                "prospect": False,
+                "applied_at": applied_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "last_activity_at": applied_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "status": "active",
+                "source": {
+                    "id": i % 11,
+                    "public_name": rng.choice(["LinkedIn", "Referral", "Website"]),
+                },
+                "jobs": [{"id": job["id"], "name": job["name"]}],
+                "current_stage": {"id": 1, "name": "Application Review"},
+                "answers": [],
+                "attachments": [
+                    {
+                        "filename": f"resume_{i}{extension}",
+                        "url": f"{base_url}/resumes/{i}{extension}",
+                        "type": "resume",
+                        "created_at": applied_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    }
+                ],
+            }
+        )
+    return applications
+
+
+def make_resume_text(seed=0, positions=4):
+    rng = random.Random(seed)
+    city, state, country = rng.choice(LOCATIONS)
+    lines = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        f"{city}, {state} {country} | candidate{seed}@example.com | 555-0100",
+        "",
+        "EXPERIENCE",
+    ]
+    for p in range(positions):
+        lines.append(
+            f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({2020 - 3 * p}-{2023 - 3 * p})"
+        )
+        lines.extend(f"- {rng.choice(BULLETS)}" for _ in range(rng.randint(4, 8)))
+        lines.append("")
+    lines.append("EDUCATION")
+    lines.append(f"B.Sc. Computer Science, {rng.choice(SCHOOLS)}, GPA 3.7")
+    lines.append(f"M.Sc. Statistics, {rng.choice(SCHOOLS)}")
+    lines.append("")
+    lines.append("SKILLS")
+    lines.append("Python, SQL, Excel, Stakeholder management, Forecasting")
+    return "\n".join(lines)
+
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(text, lines_per_page=50):
+    """
+    Build a small but valid PDF (Helvetica text, one content stream per page)
+    without any PDF writer dependency.
+    """
+    lines = text.split("\n")
+    pages = [
+        lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)
+    ] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page_lines in pages:
+        body = ["BT", "/F1 10 Tf", "14 TL", "50 750 Td"]
+        body.extend(f"({_pdf_escape(line)}) Tj T*" for line in page_lines)
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1", errors="replace")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return out.getvalue()
+
+
+def make_docx(text):
+    document = Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def _compound_file(streams):
+    """
+    Minimal OLE compound file (version 3, 512-byte sectors) holding the given
+    streams. Streams are padded to at least the 4096-byte mini stream cutoff
+    so everything lives in regular sectors and no mini FAT is needed.
+    """
+    sector = 512
+    free = no_stream = 0xFFFFFFFF
+    end_of_chain, fat_sector = 0xFFFFFFFE, 0xFFFFFFFD
+    # Directory entries compare by name length, then upper-cased name
+    names = sorted(streams, key=lambda name: (len(name), name.upper()))
+    data = [streams[name].ljust(4096, b"\0") for name in names]
+    data = [d.ljust(-(-len(d) // sector) * sector, b"\0") for d in data]
+    # Sector 0 is the FAT, sector 1 the directory, streams follow
+    fat = [fat_sector, end_of_chain]
+    starts = []
+    for d in data:
+        starts.append(len(fat))
+        count = len(d) // sector
+        fat.extend(range(len(fat) + 1, len(fat) + count))
+        fat.append(end_of_chain)
+    if len(fat) > sector // 4:
+        raise ValueError("Streams too large for a single FAT sector")
+    fat.extend([free] * (sector // 4 - len(fat)))
+
+    def entry(
+        name, kind, start, size, left=no_stream, right=no_stream, child=no_stream
+    ):
+        encoded = (name + "\0").encode("utf-16-le")
+        return (
+            encoded.ljust(64, b"\0")
+            + struct.pack("<HBB3I", len(encoded), kind, 1, left, right, child)
+            + b"\0" * 36
+            + struct.pack("<IQ", start, size)
+        )
+
+    # Directory tree: the root's child is the first stream and each stream
+    # is the right sibling of the one before it.
+    entries = [entry("Root Entry", 5, end_of_chain, 0, child=1)]
+    for i, (name, padded) in enumerate(zip(names, data), start=1):
+        # Recording the padded size keeps readers out of the mini stream
+        right = i + 1 if i < len(names) else no_stream
+        entries.append(entry(name, 2, starts[i - 1], len(padded), right=right))
+    entries.extend(
+        [b"\0" * 64 + struct.pack("<HBB3I", 0, 0, 0, *[no_stream] * 3) + b"\0" * 48]
+        * (4 - len(entries))
+    )
+    header = (
+        bytes.fromhex("D0CF11E0A1B11AE1")
+        + b"\0" * 16
+        + struct.pack("<HHHHH", 0x3E, 3, 0xFFFE, 9, 6)
+        + b"\0" * 6
+        + struct.pack("<IIIIIIIII", 0, 1, 1, 0, 4096, end_of_chain, 0, end_of_chain, 0)
+        + struct.pack("<109I", 0, *[free] * 108)
+    )
+    return (
+        header
+        + struct.pack(f"<{sector // 4}I", *fat)
+        + b"".join(entries)
+        + b"".join(data)
+    )
+
+
+def make_doc(text):
+    """
+    Build a Word 97 .doc: a FIB, the text in the WordDocument stream and a
+    piece table in 1Table. The first half of the text is stored as 8-bit
+    (compressed) text and the rest as UTF-16, like documents edited over time.
+    """
+    text = text.replace("\n", "\r") + "\r"
+    split = len(text) // 2
+    text_offset = 1024
+    compressed = text[:split].encode("cp1252", errors="replace")
+    wide = text[split:].encode("utf-16-le")
+    word = bytearray(text_offset) + compressed + wide
+    struct.pack_into("<HH", word, 0, 0xA5EC, 0x00C1)
+    struct.pack_into("<H", word, 0x0A, 0x0200)  # fWhichTblStm: use 1Table
+    struct.pack_into("<H", word, 32, 14)  # csw
+    struct.pack_into("<H", word, 62, 22)  # cslw
+    struct.pack_into("<I", word, 0x4C, len(text))  # ccpText
+    struct.pack_into("<H", word, 152, 93)  # cbRgFcLcb
+    plc = struct.pack("<3I", 0, split, len(text)) + struct.pack(
+        "<HIHHIH",
+        0,
+        (text_offset * 2) | 0x40000000,
+        0,
+        0,
+        text_offset + len(compressed),
+        0,
+    )
+    clx = struct.pack("<BI", 0x02, len(plc)) + plc
+    struct.pack_into("<II", word, 0x01A2, 0, len(clx))  # fcClx, lcbClx
+    return _compound_file({"WordDocument": bytes(word), "1Table": clx})
+
+
+def make_resume_file(filename, seed=0, positions=4):
+    text = make_resume_text(seed, positions)
+    if filename.lower().endswith(".pdf"):
+        return make_pdf(text)
+    if filename.lower().endswith(".docx"):
+        return make_docx(text)
+    if filename.lower().endswith(".doc"):
+        return make_doc(text)
+    return text.encode("utf-8")
+
+
+def make_gpt_content(application, seed=0):
+    rng = random.Random(seed)
+    city, state, country = rng.choice(LOCATIONS)
+    applied = application["applied_at"][:10]
+    quarter = f"Q{(int(applied[5:7]) - 1) // 3 + 1}"
+    return json.dumps(
+        {
+            "Candidate Id": application["candidate_id"],
+            "Candidate Name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "Company": rng.choice(OFFICES),
+            "Applied Date": applied,
+            "Date Quarter": quarter,
+            "Role": f" {application['jobs'][0]['name']} ",
+            "Department": rng.choice(DEPARTMENTS),
+            "Education": ["Undergraduate", "Masters"],
+            "Degree": ["B.Sc. Computer Science", "M.Sc. Statistics"],
+            "Schools": rng.sample(SCHOOLS, 2),
+            "Relevant Experience": rng.choice(EXPERIENCE),
+            "City": city,
+            "State/Province": state,
+            "Country": country,
+            "Source": application["source"]["public_name"],
+            "Previous Companies": rng.sample(COMPANIES, 3),
+            "Previous Job Titles": rng.sample(ROLES, 3),
+            "Resume Link": application["attachments"][0]["url"],
+        }
+    )
+
+
+def make_gpt_response(application, seed=0):
+    """A real-time completion as returned by parse_with_chatgpt."""
+    return "```json\n" + make_gpt_content(application, seed) + "\n```"
+
+
+def make_batch_result(application, seed=0):
+    """One line of a Batch API output file, as parsed by poll_gpt_check."""
+    return {
+        "id": f"batch_req_{application['id']}",
+        "custom_id": str(application["id"]),
+        "response": {
+            "status_code": 200,
+            "body": {
+                "choices": [
+                    {
+                        "message": {
+                            "role": "assistant",
+                            "content": make_gpt_content(application, seed),
+                        }
+                    }
+                ]
+            },
+        },
+        "error": None,
+    }
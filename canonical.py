@@ -0,0 +1,367 @@
+"""
+Canonical names for schools, companies and locations, so spelling variants
+from the LLM ("MIT", "Mass. Inst. of Technology", "Acme Corp." / "Acme
+Corporation", "MA") collapse to one value before rows are aggregated.
+
+Names are matched on a normalized key: first against the alias dictionary
+(seeded from data/canonical_aliases.json, plus reviewed additions), then by
+trigram similarity against those aliases. A fuzzy match must also agree word
+for word, in order, so "University of Washington" doesn't become
+"Washington University". Only seeded and reviewed names are match targets:
+fuzzy matches and names that match nothing are recorded for review but
+never absorb other names. An unmatched name is kept as given, spelled the
+way it was first seen by any instance sharing the store.
+
+Review names recorded for review from the command line:
+
+    python canonical.py --pending --kind school
+    python canonical.py --kind school --name "mass inst of tech" \
+        --canonical "Massachusetts Institute of Technology"
+    python canonical.py --export
+
+--export adds the reviewed aliases to data/canonical_aliases.json, so they
+ship with the app and seed every store.
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import storage
+import telemetry
+
+SEED_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "canonical_aliases.json"
+)
+# Candidate field -> kind of name it holds
+FIELDS = {
+    "Schools": "school",
+    "Previous Companies": "company",
+    "City": "city",
+    "State/Province": "state",
+    "Country": "country",
+}
+# Trigram (Dice) similarity needed for a fuzzy match
+MIN_SIMILARITY = 0.85
+# Shorter keys (abbreviations) are only matched exactly
+MIN_FUZZY_LENGTH = 5
+# Each word of a fuzzy match needs this similarity to the word it lines up
+# with; words shorter than MIN_FUZZY_LENGTH must be equal
+MIN_WORD_SIMILARITY = 0.6
+# Alias sources that are match targets; "new" and "fuzzy" await review
+TARGET_SOURCES = ("seed", "reviewed")
+# Words that don't distinguish one name from another
+IGNORED_WORDS = {
+    "company": {
+        "inc",
+        "incorporated",
+        "llc",
+        "llp",
+        "ltd",
+        "limited",
+        "corp",
+        "corporation",
+        "co",
+        "company",
+        "plc",
+        "gmbh",
+        "sa",
+        "ag",
+    },
+    "school": {"the"},
+}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def canonical_db_path():
+    return os.getenv("CANONICAL_DB_PATH") or storage.state_db_path(
+        "recruitment_canonical.db"
+    )
+
+
+def normalize_key(kind, name):
+    """Lower-case, accent- and punctuation-free key with filler words dropped."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("&", " and ")
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    ignored = IGNORED_WORDS.get(kind, set())
+    kept = [word for word in words if word not in ignored]
+    return " ".join(kept or words)
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient of two keys' trigram sets."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+def words_agree(key, other):
+    """Same number of words and each close to the one in the same position."""
+    words, other_words = key.split(), other.split()
+    if len(words) != len(other_words):
+        return False
+    for word, other_word in zip(words, other_words):
+        if word == other_word:
+            continue
+        if min(len(word), len(other_word)) < MIN_FUZZY_LENGTH:
+            return False
+        if similarity(word, other_word) < MIN_WORD_SIMILARITY:
+            return False
+    return True
+
+
+class CanonicalIndex:
+    """
+    Alias dictionary plus an in-memory trigram index per kind over the
+    match targets. Everything seen is persisted in SQLite with its source,
+    so unmatched names and fuzzy matches can be reviewed (see review()).
+    """
+
+    def __init__(self, db_path=None, seed_path=SEED_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            db_path or canonical_db_path(), timeout=30, check_same_thread=False
+        )
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "kind TEXT NOT NULL, alias_key TEXT NOT NULL, "
+                "canonical TEXT NOT NULL, source TEXT NOT NULL, "
+                "PRIMARY KEY (kind, alias_key))"
+            )
+        if seed_path:
+            self.load_seed(seed_path)
+        # kind -> alias key -> canonical name, for seeded and reviewed aliases
+        self.aliases = collections.defaultdict(dict)
+        # kind -> key -> first spelling, for names that matched nothing
+        self.unreviewed = collections.defaultdict(dict)
+        # kind -> trigram -> alias keys containing it
+        self.postings = collections.defaultdict(lambda: collections.defaultdict(set))
+        self.trigram_counts = {}
+        for kind, alias_key, canonical, source in self.conn.execute(
+            "SELECT kind, alias_key, canonical, source FROM aliases"
+        ):
+            if source in TARGET_SOURCES:
+                self._index(kind, alias_key, canonical)
+            elif source == "new":
+                self.unreviewed[kind][alias_key] = canonical
+
+    def close(self):
+        self.conn.close()
+
+    def load_seed(self, seed_path):
+        with open(seed_path, "r", encoding="utf-8") as file:
+            seed = json.load(file)
+        rows = []
+        for kind, names in seed.items():
+            for canonical, aliases in names.items():
+                for alias in [canonical, *aliases]:
+                    rows.append((kind, normalize_key(kind, alias), canonical, "seed"))
+        with self.conn:
+            # Seeds win over anything learned for the same key
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO aliases VALUES (?, ?, ?, ?)", rows
+            )
+
+    def _index(self, kind, alias_key, canonical):
+        self.aliases[kind][alias_key] = canonical
+        grams = trigrams(alias_key)
+        self.trigram_counts[(kind, alias_key)] = len(grams)
+        for gram in grams:
+            self.postings[kind][gram].add(alias_key)
+
+    def _record(self, kind, alias_key, canonical, source):
+        """Keep a name seen for review; it doesn't become a match target."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO aliases VALUES (?, ?, ?, ?)",
+                (kind, alias_key, canonical, source),
+            )
+
+    def _stored(self, kind, alias_key):
+        """(canonical, source) of a key as persisted, or None."""
+        return self.conn.execute(
+            "SELECT canonical, source FROM aliases WHERE kind = ? AND alias_key = ?",
+            (kind, alias_key),
+        ).fetchone()
+
+    def pending(self, kind=None):
+        """(kind, alias key, canonical, source) rows awaiting review."""
+        query = "SELECT kind, alias_key, canonical, source FROM aliases "
+        query += "WHERE source NOT IN (?, ?)"
+        params = list(TARGET_SOURCES)
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return self.conn.execute(query + " ORDER BY kind, alias_key", params).fetchall()
+
+    def export_reviewed(self, seed_path=SEED_PATH):
+        """
+        Add reviewed aliases to the seed file. Returns how many were added.
+        """
+        with open(seed_path, "r", encoding="utf-8") as file:
+            seed = json.load(file)
+        added = 0
+        for kind, alias_key, canonical in self.conn.execute(
+            "SELECT kind, alias_key, canonical FROM aliases "
+            "WHERE source = 'reviewed' ORDER BY kind, alias_key"
+        ):
+            aliases = seed.setdefault(kind, {}).setdefault(canonical, [])
+            known = {normalize_key(kind, alias) for alias in [canonical, *aliases]}
+            if alias_key not in known:
+                aliases.append(alias_key)
+                added += 1
+        with open(seed_path, "w", encoding="utf-8") as file:
+            json.dump(seed, file, indent=2, ensure_ascii=False)
+        return added
+
+    def review(self, kind, name, canonical):
+        """Accept name as an alias of canonical (e.g. after review)."""
+        key = normalize_key(kind, name)
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO aliases VALUES (?, ?, ?, ?)",
+                    (kind, key, canonical, "reviewed"),
+                )
+            self.unreviewed[kind].pop(key, None)
+            self._index(kind, key, canonical)
+
+    def best_match(self, kind, key):
+        """
+        (canonical, similarity) of the closest target whose words agree with
+        the key's, or (None, 0).
+        """
+        grams = trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self.postings[kind].get(gram, ()))
+        scored = sorted(
+            (
+                (
+                    2 * overlap / (len(grams) + self.trigram_counts[(kind, alias_key)]),
+                    alias_key,
+                )
+                for alias_key, overlap in shared.items()
+            ),
+            reverse=True,
+        )
+        for score, alias_key in scored:
+            if words_agree(key, alias_key):
+                return self.aliases[kind][alias_key], score
+        return None, 0.0
+
+    def canonicalize(self, kind, name):
+        if not isinstance(name, str) or not name.strip():
+            return name
+        key = normalize_key(kind, name)
+        if not key:
+            return name
+        with self.lock:
+            canonical = self.aliases[kind].get(key)
+            stored = None
+            if canonical is None:
+                stored = self._stored(kind, key)
+                if stored is not None and stored[1] in TARGET_SOURCES:
+                    # Reviewed since this index was loaded
+                    canonical = stored[0]
+                    self.unreviewed[kind].pop(key, None)
+                    self._index(kind, key, canonical)
+            if canonical is not None:
+                telemetry.count("canonical_exact")
+                return canonical
+            if len(key) >= MIN_FUZZY_LENGTH:
+                canonical, score = self.best_match(kind, key)
+                if canonical is not None and score >= MIN_SIMILARITY:
+                    self._record(kind, key, canonical, "fuzzy")
+                    telemetry.count("canonical_fuzzy")
+                    return canonical
+            canonical = self.unreviewed[kind].get(key)
+            if canonical is None:
+                if stored is None:
+                    self._record(kind, key, name.strip(), "new")
+                    # Another instance may have recorded its spelling first
+                    stored = self._stored(kind, key)
+                canonical = self.unreviewed[kind][key] = stored[0]
+            telemetry.count("canonical_new")
+            return canonical
+
+
+def get_index():
+    """The process-wide index for the current CANONICAL_DB_PATH."""
+    path = canonical_db_path()
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = CanonicalIndex(path)
+        return index
+
+
+@telemetry.traced()
+def canonicalize_candidates(candidates, index=None):
+    """
+    Replace school, company and location names in validated LLM results
+    with their canonical forms, in place. Returns the candidates.
+    """
+    index = index or get_index()
+    for candidate in candidates:
+        if not isinstance(candidate, dict):
+            continue
+        for field, kind in FIELDS.items():
+            value = candidate.get(field)
+            if isinstance(value, list):
+                # Not de-duplicated: Schools lines up with Degree/Education
+                candidate[field] = [index.canonicalize(kind, item) for item in value]
+            elif isinstance(value, str):
+                candidate[field] = index.canonicalize(kind, value)
+    telemetry.count("items", len(candidates))
+    return candidates
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Review canonical name aliases.")
+    parser.add_argument("--kind", choices=sorted(set(FIELDS.values())))
+    parser.add_argument("--name", help="Name (or alias key) to accept")
+    parser.add_argument("--canonical", help="Canonical name it stands for")
+    parser.add_argument(
+        "--pending", action="store_true", help="List names awaiting review"
+    )
+    parser.add_argument(
+        "--export",
+        action="store_true",
+        help="Add reviewed aliases to data/canonical_aliases.json",
+    )
+    args = parser.parse_args(argv)
+    if not (args.pending or args.export) and not (
+        args.kind and args.name and args.canonical
+    ):
+        parser.error("--pending, --export or --kind, --name and --canonical")
+    index = CanonicalIndex()
+    try:
+        if args.pending:
+            for kind, alias_key, canonical, source in index.pending(args.kind):
+                print(f"{kind:8} {source:6} {alias_key} -> {canonical}")
+        elif args.export:
+            print(f"Added {index.export_reviewed()} reviewed aliases to {SEED_PATH}")
+        else:
+            index.review(args.kind, args.name, args.canonical)
+            print(f"{args.kind}: {args.name} -> {args.canonical}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,119 @@
+"""
+Plain text from Word 97-2003 (.doc) files, read straight from the binary
+format: the FIB locates the piece table (CLX) in the table stream, and each
+piece is either 8-bit (cp1252) or UTF-16LE text in the WordDocument stream.
+"""
+
+import io
+import struct
+
+import olefile
+
+WORD_IDENT = 0xA5EC
+# nFib of Word 97; older files have no piece table to speak of
+NFIB_WORD97 = 0x00C1
+FLAG_ENCRYPTED = 0x0100
+FLAG_WHICH_TABLE = 0x0200
+# Offsets into the FIB (see [MS-DOC] 2.5.1)
+FIB_FLAGS = 0x000A
+FIB_FC_MIN = 0x0018  # followed by fcMac
+FIB_CCP_TEXT = 0x004C
+FIB_FC_CLX = 0x01A2  # followed by lcbClx
+FC_COMPRESSED = 0x40000000
+
+FIELD_BEGIN, FIELD_SEPARATOR, FIELD_END = "\x13", "\x14", "\x15"
+# Word's in-text control characters and what they mean as plain text
+CONTROL_CHARACTERS = {
+    "\r": "\n",  # paragraph end
+    "\x07": "\t",  # table cell / row end
+    "\x0b": "\n",  # line break
+    "\x0c": "\n",  # page or section break
+    "\x1e": "-",  # non-breaking hyphen
+    "\xa0": " ",
+}
+
+
+def _pieces(clx):
+    """Yield (cp_start, cp_end, fc, compressed) from a CLX's PlcPcd."""
+    position = 0
+    while position < len(clx):
+        clxt = clx[position]
+        if clxt == 0x01:
+            # Prc: formatting we don't need
+            (size,) = struct.unpack_from("<h", clx, position + 1)
+            position += 3 + size
+        elif clxt == 0x02:
+            (size,) = struct.unpack_from("<I", clx, position + 1)
+            plc = clx[position + 5 : position + 5 + size]
+            count = (len(plc) - 4) // 12
+            cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+            for i in range(count):
+                (fc,) = struct.unpack_from("<I", plc, 4 * (count + 1) + 8 * i + 2)
+                yield cps[i], cps[i + 1], fc & ~FC_COMPRESSED, bool(fc & FC_COMPRESSED)
+            return
+        else:
+            raise ValueError(f"Invalid CLX entry type {clxt:#x}")
+    raise ValueError("No piece table in the document")
+
+
+def _clean(text):
+    out, field_stack = [], []
+    for char in text:
+        if char == FIELD_BEGIN:
+            # Field codes (e.g. HYPERLINK "...") up to the separator are hidden
+            field_stack.append(True)
+        elif char == FIELD_SEPARATOR:
+            if field_stack:
+                field_stack[-1] = False
+        elif char == FIELD_END:
+            if field_stack:
+                field_stack.pop()
+        elif field_stack and field_stack[-1]:
+            continue
+        elif char in CONTROL_CHARACTERS:
+            out.append(CONTROL_CHARACTERS[char])
+        elif char >= " " or char in "\t\n":
+            out.append(char)
+    return "".join(out)
+
+
+def extract_doc_text(data):
+    """Return the main document text of a .doc file's bytes."""
+    with olefile.OleFileIO(io.BytesIO(data)) as ole:
+        if not ole.exists("WordDocument"):
+            raise ValueError("No WordDocument stream; not a Word document")
+        word = ole.openstream("WordDocument").read()
+        ident, nfib = struct.unpack_from("<HH", word, 0)
+        if ident != WORD_IDENT:
+            raise ValueError("Invalid Word document header")
+        (flags,) = struct.unpack_from("<H", word, FIB_FLAGS)
+        if flags & FLAG_ENCRYPTED:
+            raise ValueError("Encrypted Word document")
+        if nfib < NFIB_WORD97:
+            # Word 6/95: text is stored contiguously between fcMin and fcMac
+            fc_min, fc_mac = struct.unpack_from("<II", word, FIB_FC_MIN)
+            return _clean(word[fc_min:fc_mac].decode("cp1252", errors="replace"))
+
+        table_name = "1Table" if flags & FLAG_WHICH_TABLE else "0Table"
+        if not ole.exists(table_name):
+            raise ValueError(f"Missing {table_name} stream")
+        table = ole.openstream(table_name).read()
+
+    (ccp_text,) = struct.unpack_from("<I", word, FIB_CCP_TEXT)
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, FIB_FC_CLX)
+    parts = []
+    for cp_start, cp_end, fc, compressed in _pieces(table[fc_clx : fc_clx + lcb_clx]):
+        # Only the main document; footnotes, headers etc. come after ccpText
+        if cp_start >= ccp_text:
+            break
+        length = min(cp_end, ccp_text) - cp_start
+        if compressed:
+            start = fc // 2
+            parts.append(
+                word[start : start + length].decode("cp1252", errors="replace")
+            )
+        else:
+            parts.append(
+                word[fc : fc + 2 * length].decode("utf-16-le", errors="replace")
+            )
+    return _clean("".join(parts))
@@ -0,0 +1,69 @@
+"""
+Run a window through the queue-based fan-out on this machine.
+
+    python fanout.py --start 2024-01-01 --end 2024-01-08 --concurrency 8
+
+main.enqueue_process queues micro-batches of application ids on
+WORK_QUEUE_URL (a local SQLite queue by default) and worker threads drain it
+with main.process_work_item, the same functions the ProcessRolesFanout and
+ProcessRolesWorker Functions run. Each work item's rows are written before it is completed; items that
+failed stay queued and are picked up by the next run.
+"""
+
+import argparse
+import asyncio
+import threading
+
+import main
+import work_queue
+
+
+def run_fanout(start, end, concurrency=4, queue=None, write_rows=None):
+    own_queue = queue is None
+    queue = queue or work_queue.open_queue()
+    try:
+        response = asyncio.run(main.enqueue_process(start, end, queue))
+        if response.status_code != 200:
+            raise RuntimeError(response.get_body().decode())
+        written, write_lock = 0, threading.Lock()
+
+        def _write(rows):
+            nonlocal written
+            # One sheet write at a time across the worker threads
+            with write_lock:
+                (write_rows or main.write_rows_to_sheet)(rows)
+                written += len(rows)
+
+        async def _handle(work_item):
+            result = await main.process_work_item(work_item, write_rows=_write)
+            if result.status_code >= 500:
+                raise RuntimeError(result.get_body().decode())
+
+        completed, failed = work_queue.drain(queue, _handle, concurrency)
+        return {"completed": completed, "failed": failed, "rows": written}
+    finally:
+        if own_queue:
+            queue.close()
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--start", required=True, help="created_after, ISO date")
+    parser.add_argument("--end", required=True, help="created_before, ISO date")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--queue", default=None, help="memory:// or sqlite:///path (WORK_QUEUE_URL)"
+    )
+    args = parser.parse_args(argv)
+    summary = run_fanout(
+        args.start,
+        args.end,
+        concurrency=args.concurrency,
+        queue=work_queue.open_queue(args.queue) if args.queue else None,
+    )
+    print(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+# Rough chars-per-token ratio for English text; good enough for routing.
+CHARS_PER_TOKEN = 4
+EXPECTED_COMPLETION_TOKENS = 700
+
+_headroom = {}
+_headroom_lock = threading.Lock()
+
+
+def _env_number(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def routing_limits():
+    return {
+        # Per-minute limits of the real-time model on this account
+        "rpm": _env_number("OPENAI_RPM_LIMIT", 500),
+        "tpm": _env_number("OPENAI_TPM_LIMIT", 800000),
+        # Runs at or below this size always go real-time for latency
+        "small_run": _env_number("REALTIME_MAX_CANDIDATES", 200),
+        # How long a Batch is expected to take to come back
+        "batch_turnaround": _env_number("BATCH_TURNAROUND_SECONDS", 3600),
+    }
+
+
+def estimate_tokens(prompt, candidate):
+    return (
+        len(prompt) + len(f"Candidate Data: {candidate}")
+    ) // CHARS_PER_TOKEN + EXPECTED_COMPLETION_TOKENS
+
+
+def record_rate_limit_headers(headers):
+    """Remember the latest x-ratelimit-* headers from a real-time call."""
+    updates = {}
+    for key in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{key}")
+        if remaining is not None:
+            updates[f"remaining_{key}"] = float(remaining)
+    if updates:
+        with _headroom_lock:
+            _headroom.update(updates, observed_at=time.monotonic())
+
+
+def current_headroom(max_age=60):
+    """Remaining requests/tokens from the last minute, or {} if unknown."""
+    with _headroom_lock:
+        if not _headroom or time.monotonic() - _headroom["observed_at"] > max_age:
+            return {}
+        return dict(_headroom)
+
+
+def plan_extraction(token_estimates, deadline_seconds=None, headroom=None):
+    """
+    Decide how many candidates go through real-time chat completions and how
+    many through the Batch API. token_estimates holds one estimate per
+    candidate, in order; the first plan["realtime"] go real-time.
+
+    Small runs stay real-time. Otherwise real-time takes as many candidates
+    as the rate limits allow before the deadline (starting from the current
+    headroom), and the rest go to Batch. Without a deadline, or when Batch
+    can return before it, large runs go entirely through Batch.
+    """
+    limits = routing_limits()
+    headroom = headroom if headroom is not None else current_headroom()
+    count = len(token_estimates)
+
+    def _plan(realtime, reason):
+        mode = "realtime" if realtime == count else "batch" if not realtime else "split"
+        return {
+            "mode": mode,
+            "candidates": count,
+            "realtime": realtime,
+            "batch": count - realtime,
+            "estimated_tokens": sum(token_estimates),
+            "reason": reason,
+        }
+
+    if count <= limits["small_run"]:
+        return _plan(count, "small run")
+    if deadline_seconds is None or deadline_seconds >= limits["batch_turnaround"]:
+        return _plan(0, "large run and Batch can finish before the deadline")
+
+    # What is left of the current minute plus full minutes until the deadline
+    later_minutes = max(0.0, deadline_seconds / 60 - 1)
+    request_budget = (
+        headroom.get("remaining_requests", limits["rpm"])
+        + limits["rpm"] * later_minutes
+    )
+    token_budget = (
+        headroom.get("remaining_tokens", limits["tpm"]) + limits["tpm"] * later_minutes
+    )
+    fits, used_tokens = 0, 0
+    for estimate in token_estimates:
+        if fits + 1 > request_budget or used_tokens + estimate > token_budget:
+            break
+        fits += 1
+        used_tokens += estimate
+    if fits == count:
+        return _plan(count, "fits real-time rate limits before the deadline")
+    if fits == 0:
+        return _plan(0, "no real-time headroom")
+    return _plan(fits, "real-time headroom covers only part of the run")
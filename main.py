@@ -5,24 +5,73 @@ import json
 import logging
 import os
 import time
-import uuid
 import datetime
 import asyncio
 
 import azure.functions as func
 import openai
-import pdfplumber
 import requests
-from pypdf import PdfReader
 from docx import Document
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from requests import RequestException
 
+import application_log
+import canonical
+import doc_text
+import llm_routing
+import pdf_text
+import prompts
+import rate_limits
+import retry_queue
+import telemetry
+import work_queue
+from aggregates import refresh_role_trends
+
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SHEET_NAME = "'Role Trends'"
 MICROSOFT_SCOPE = ["https://graph.microsoft.com/.default"]
 TAB_NAME = "Role Trends Raw"
+RAW_HEADERS = [
+    "Candidate Id",
+    "Candidate Name",
+    "Company",
+    "Applied Date",
+    "Date Quarter",
+    "Role",
+    "Department",
+    "Education",
+    "Degree",
+    "Schools",
+    "Relevant Experience",
+    "City",
+    "State/Province",
+    "Country",
+    "Source",
+    "Previous Companies",
+    "Previous Job Titles",
+    "Resume Link",
+]
+HARVEST_API_URL = os.getenv("HARVEST_API_URL", "https://harvest.greenhouse.io/v1")
+# How long process() may spend on LLM extraction; the default fits inside the
+# Functions timeout. Backfills pass a longer deadline so big runs use Batch.
+EXTRACTION_DEADLINE_SECONDS = float(os.getenv("EXTRACTION_DEADLINE_SECONDS", 480))
+BATCH_POLL_SECONDS = 30
+# One model for both the real-time and the Batch leg, so a split run's rows
+# come from the same model
+EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL", "gpt-4o")
+# Candidates per queued work item in the fan-out path
+WORK_ITEM_SIZE = int(os.getenv("WORK_ITEM_SIZE", 5))
+
+
+class BatchPending:
+    """
+    Result placeholder for candidates in a Batch that was still running at
+    the deadline; the batch is queued and collected by retry_failures later.
+    """
+
+    def __init__(self, batch_id):
+        self.batch_id = batch_id
 
 
 def get_secrets():
@@ -39,7 +88,6 @@ def get_secrets():
         GOOGLE_SERVICE_ACCOUNT_JSON_DECODED = json.loads(
             base64.b64decode(service_account_base64)
         )
-        print("GREENHOUSE_API_KEY_ENCODED", GREENHOUSE_API_KEY_ENCODED)
         return (
             GREENHOUSE_BASE_URL,
             GREENHOUSE_API_KEY_ENCODED,
@@ -78,34 +126,16 @@ def authenticate_google_sheets():
     return service
 
 
+@telemetry.traced()
 def write_to_google_sheet(service, flattened_rows):
-    HEADERS = [
-        "Candidate Id",
-        "Candidate Name",
-        "Company",
-        "Applied Date",
-        "Date Quarter",
-        "Role",
-        "Department",
-        "Education",
-        "Degree",
-        "Schools",
-        "Relevant Experience",
-        "City",
-        "State/Province",
-        "Country",
-        "Source",
-        "Previous Companies",
-        "Previous Job Titles",
-        "Resume Link",
-    ]
     start_row = find_first_empty_row(service)
     range_name = f"{TAB_NAME}!A{start_row}:S"  # Adjust range as needed
     rows = []
     for row_data in flattened_rows:
-        row = [row_data.get(header, "") for header in HEADERS]
+        row = [row_data.get(header, "") for header in RAW_HEADERS]
         rows.append(row)
     body = {"values": rows}
+    telemetry.count("rows", len(rows))
     # Append to Google Sheets
     service.spreadsheets().values().append(
         spreadsheetId=SPREADSHEET_ID,
@@ -126,30 +156,20 @@ def create_openai_client_batch(OPEN_AI_KEY):
     return openai_client
 
 
-def read_prompt_text(text_path):
-    try:
-        with open(text_path, "r") as file:
-            return file.read()
-    except FileNotFoundError:
-        return "Flag as no prompt"
-
-
+@telemetry.traced()
 def batch_with_chatgpt(openai_client, merged_list):
-    gpt_prompt_path = "data/gpt_prompt.txt"
-    gpt_prompt = read_prompt_text(gpt_prompt_path)
+    gpt_prompt = prompts.get_prompt()
     jsonl_lines = []
-    for candidate in merged_list:
+    for index, candidate in enumerate(merged_list):
         prompt = {
-            "custom_id": str(uuid.uuid4()),
+            # The position lets wait_for_batch line results up with inputs
+            "custom_id": str(index),
             "method": "POST",
             "url": "/v1/chat/completions",
             "body": {
-                "model": "gpt-4o-mini",
+                "model": EXTRACTION_MODEL,
                 "response_format": {"type": "json_object"},
-                "messages": [
-                    {"role": "system", "content": gpt_prompt},
-                    {"role": "user", "content": f"Candidate info: {candidate}"},
-                ],
+                "messages": gpt_prompt.messages(candidate),
                 "max_tokens": 2500,
                 "n": 1,
                 "stop": None,
@@ -157,6 +177,8 @@ def batch_with_chatgpt(openai_client, merged_list):
             },
         }
         jsonl_lines.append(json.dumps(prompt).encode("utf-8"))
+    telemetry.count("items", len(jsonl_lines))
+    telemetry.count("bytes", sum(len(line) + 1 for line in jsonl_lines))
     json_memory_file = io.BytesIO()
     for line in jsonl_lines:
         json_memory_file.write(line + b"\n")
@@ -169,14 +191,19 @@ def batch_with_chatgpt(openai_client, merged_list):
         input_file_id=batch_input_file_id,
         endpoint="/v1/chat/completions",
         completion_window="24h",
-        metadata={"description": "candidate data reporting generator"},
+        metadata={
+            "description": "candidate data reporting generator",
+            "prompt_version": gpt_prompt.version,
+            "model": EXTRACTION_MODEL,
+        },
     )
     return batch
 
 
 def check_gpt(openai_client, batch):
     file_response = None
-    retrieved_batch = openai_client.batches.retrieve(batch.id)
+    # A Batch object, or the id of one queued by an earlier run
+    retrieved_batch = openai_client.batches.retrieve(getattr(batch, "id", batch))
     if retrieved_batch.status == "completed" and retrieved_batch.output_file_id:
         file_response = openai_client.files.content(retrieved_batch.output_file_id)
         return file_response.content
@@ -185,7 +212,7 @@ def check_gpt(openai_client, batch):
         raise Exception(
             f"Batch processing failed. Error details: {file_response.content}"
         )
-    elif retrieved_batch.status == "failed":
+    elif retrieved_batch.status in ("failed", "expired", "cancelled"):
         raise Exception(f"Batch processing failed. Error details: {retrieved_batch}")
     else:
         return None
@@ -206,24 +233,39 @@ def poll_gpt_check(check):
         return results
 
 
+def parse_gpt_result(result):
+    """The JSON object in a model response, or None if there isn't one."""
+    if not result:
+        return None
+    start_index = result.find("{")
+    end_index = result.rfind("}") + 1
+    try:
+        parsed = json.loads(result[start_index:end_index])
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) and parsed else None
+
+
+@telemetry.traced()
 def validation_gpt_response(results):
     success_json = []
     failed_json = []
     for result in results:
-        start_index = result.find("{")
-        end_index = result.rfind("}") + 1
-        json_string = result[start_index:end_index]
-        if json.loads(json_string):
-            success_json.append(json.loads(json_string))
+        parsed = parse_gpt_result(result)
+        if parsed:
+            success_json.append(parsed)
         else:
-            failed_json.append(json_string)
-        for i in success_json:
-            for key, value in i.items():
-                if key == "Role" or key == "Company":
-                    i[key] = value.strip()
+            failed_json.append(result)
+    for i in success_json:
+        for key, value in i.items():
+            if (key == "Role" or key == "Company") and isinstance(value, str):
+                i[key] = value.strip()
+    telemetry.count("items", len(success_json))
+    telemetry.count("failures", len(failed_json))
     return success_json, failed_json
 
 
+@telemetry.traced()
 def validation_batch_response(gpt_results):
     success_json = []
     failed_messages = []
@@ -240,6 +282,8 @@ def validation_batch_response(gpt_results):
                 continue
         else:
             failed_messages.append(result)
+    telemetry.count("items", len(success_json))
+    telemetry.count("failures", len(failed_messages))
     return success_json, failed_messages
 
 
@@ -255,36 +299,147 @@ def find_first_empty_row(service):
 
 
 async def parse_with_chatgpt(openai_client, candidate_data):
-    gpt_prompt_path = "data/gpt_prompt.txt"
-    gpt_prompt = read_prompt_text(gpt_prompt_path)
+    gpt_prompt = prompts.get_prompt()
 
     def _call_openai():
+        started = time.perf_counter()
         try:
-            messages = [
-                {"role": "system", "content": gpt_prompt},
-                {
-                    "role": "user",
-                    "content": f"Candidate Data: {candidate_data}",
-                },
-            ]
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
+            rate_limits.acquire("openai")
+            messages = gpt_prompt.messages(candidate_data)
+            raw_response = openai_client.chat.completions.with_raw_response.create(
+                model=EXTRACTION_MODEL,
                 messages=messages,
                 max_tokens=2500,
                 n=1,
                 stop=None,
                 temperature=0.5,
             )
+            llm_routing.record_rate_limit_headers(raw_response.headers)
+            response = raw_response.parse()
+            telemetry.observe("call_seconds", time.perf_counter() - started)
+            telemetry.count("calls")
+            if response.usage:
+                telemetry.count("prompt_tokens", response.usage.prompt_tokens)
+                telemetry.count("completion_tokens", response.usage.completion_tokens)
+                telemetry.count("cached_tokens", prompts.cached_tokens(response.usage))
             return response.choices[0].message.content
         except Exception as e:
             print(e)
+            telemetry.count("failures")
             return None
 
     return await asyncio.to_thread(_call_openai)
 
 
+def batch_contents(check):
+    """
+    Message contents of a finished Batch's output keyed by custom_id, in
+    the same shape parse_with_chatgpt returns.
+    """
+    contents = {}
+    for result in poll_gpt_check(check):
+        try:
+            body = result["response"]["body"]
+            contents[result["custom_id"]] = body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            continue
+        usage = body.get("usage") or {}
+        telemetry.count("prompt_tokens", usage.get("prompt_tokens", 0))
+        telemetry.count("completion_tokens", usage.get("completion_tokens", 0))
+        telemetry.count("cached_tokens", prompts.cached_tokens(usage))
+    return contents
+
+
+async def wait_for_batch(openai_client, batch, timeout=None, poll_interval=None):
+    """
+    Poll a Batch until it completes and return batch_contents of it. If the
+    timeout passes first, None is returned and the caller queues the batch.
+    """
+    poll_interval = poll_interval or BATCH_POLL_SECONDS
+    started = time.monotonic()
+    while True:
+        check = await asyncio.to_thread(check_gpt, openai_client, batch)
+        if check:
+            return batch_contents(check)
+        if timeout is not None and time.monotonic() - started + poll_interval > timeout:
+            print(f"Batch {batch.id} still pending after {timeout}s")
+            telemetry.count("batches_pending")
+            return None
+        await asyncio.sleep(poll_interval)
+
+
+@telemetry.traced()
+async def extract_with_chatgpt(openai_client, candidates, deadline_seconds=None):
+    """
+    Single entry point for LLM extraction. Routes each run to real-time
+    completions, the Batch API or a split of the two (see
+    llm_routing.plan_extraction) and returns one response per candidate, in
+    candidate order, with None where no usable response came back. A Batch
+    still running at the deadline is queued for retry_failures to collect,
+    and its candidates get a BatchPending.
+    """
+    gpt_prompt = prompts.get_prompt()
+    estimates = [llm_routing.estimate_tokens(gpt_prompt.text, c) for c in candidates]
+    plan = llm_routing.plan_extraction(estimates, deadline_seconds)
+    print(f"Extraction plan: {plan['mode']} ({plan['reason']})")
+    telemetry.current_span().attributes["prompt_version"] = gpt_prompt.version
+    telemetry.current_span().attributes["model"] = EXTRACTION_MODEL
+    telemetry.count("realtime_candidates", plan["realtime"])
+    telemetry.count("batch_candidates", plan["batch"])
+    telemetry.count("estimated_tokens", plan["estimated_tokens"])
+    started = time.monotonic()
+    realtime = candidates[: plan["realtime"]]
+    batched = candidates[plan["realtime"] :]
+    batch = None
+    if batched:
+        batch = await asyncio.to_thread(batch_with_chatgpt, openai_client, batched)
+    results = list(
+        await asyncio.gather(
+            *(parse_with_chatgpt(openai_client, candidate) for candidate in realtime)
+        )
+    )
+    if batch is not None:
+        remaining = None
+        if deadline_seconds is not None:
+            remaining = max(0, deadline_seconds - (time.monotonic() - started))
+        by_custom_id = await wait_for_batch(openai_client, batch, remaining)
+        if by_custom_id is None:
+            queue_failures(
+                retry_queue.BATCH,
+                [
+                    (
+                        {"id": batch.id, "candidates": batched},
+                        "batch pending at deadline",
+                    )
+                ],
+            )
+            pending = BatchPending(batch.id)
+            results.extend(pending for _ in batched)
+        else:
+            results.extend(by_custom_id.get(str(i)) for i in range(len(batched)))
+    return results
+
+
+def harvest_get(url, headers, params, max_rate_limit_retries=5):
+    """
+    GET a Harvest endpoint, waiting on the shared "greenhouse" rate limiter
+    first and honouring Retry-After when Harvest answers 429.
+    """
+    for attempt in range(max_rate_limit_retries + 1):
+        rate_limits.acquire("greenhouse")
+        response = requests.get(url, headers=headers, params=params)
+        telemetry.count("requests")
+        if response.status_code != 429 or attempt == max_rate_limit_retries:
+            return response
+        retry_after = float(response.headers.get("Retry-After", 10))
+        print(f"Harvest rate limit hit, retrying in {retry_after}s")
+        telemetry.count("rate_limited")
+        time.sleep(retry_after)
+
+
+@telemetry.traced()
 async def get_all_jobs():
-    url = "https://harvest.greenhouse.io/v1/jobs"
+    url = f"{HARVEST_API_URL}/jobs"
     headers = {"Authorization": f"Basic {GREENHOUSE_API_KEY_ENCODED}"}
     all_jobs = []
     per_page = 100
@@ -294,16 +449,18 @@ async def get_all_jobs():
     while True:
         try:
             params = {"page": page, "per_page": per_page}
-            response = requests.get(url, headers=headers, params=params)
+            response = harvest_get(url, headers, params)
             if response.status_code == 200:
                 jobs = response.json()
                 if not jobs:
                     break  # No more jobs to fetch
                 all_jobs.extend(jobs)
+                telemetry.count("items", len(jobs))
                 page += 1  # Move to the next page
                 retry_delay = 1  # Reset retry delay after a successful request
             else:
                 print(f"Failed to fetch jobs on page {page}: {response.status_code}")
+                telemetry.count("failures")
                 break
         except RequestException as e:
             print(f"RequestException on page {page}: {e}")
@@ -311,6 +468,7 @@ async def get_all_jobs():
                 print("Max retries reached, aborting.")
                 break
             else:
+                telemetry.count("retries")
                 time.sleep(retry_delay)
                 retry_delay *= 2  # Exponential backoff
                 max_retries -= 1
@@ -318,8 +476,9 @@ async def get_all_jobs():
     return all_jobs if all_jobs else None
 
 
+@telemetry.traced()
 async def get_applications(created_after, created_before):
-    url = f"https://harvest.greenhouse.io/v1/applications?created_after={created_after}&created_before={created_before}"
+    url = f"{HARVEST_API_URL}/applications?created_after={created_after}&created_before={created_before}"
     headers = {"Authorization": f"Basic {GREENHOUSE_API_KEY_ENCODED}"}
     filtered_applications = []
     per_page = 100
@@ -329,16 +488,18 @@ async def get_applications(created_after, created_before):
     while True:
         try:
             params = {"page": page, "per_page": per_page}
-            response = requests.get(url, headers=headers, params=params)
+            response = harvest_get(url, headers, params)
             if response.status_code == 200:
                 applications = response.json()
                 if not applications:
                     break
                 filtered_applications.extend(applications)
+                telemetry.count("items", len(applications))
                 page += 1  # Move to the next page
                 retry_delay = 1  # Reset retry delay after a successful request
             else:
                 print(f"Failed to fetch jobs on page {page}: {response.status_code}")
+                telemetry.count("failures")
                 break
         except RequestException as e:
             print(f"RequestException on page {page}: {e}")
@@ -346,6 +507,7 @@ async def get_applications(created_after, created_before):
                 print("Max retries reached, aborting.")
                 break
             else:
+                telemetry.count("retries")
                 time.sleep(retry_delay)
                 retry_delay *= 2  # Exponential backoff
                 max_retries -= 1
@@ -353,6 +515,70 @@ async def get_applications(created_after, created_before):
     return filtered_applications if filtered_applications else None
 
 
+def get_harvest_object(resource, object_id):
+    """A single Harvest object, e.g. ("applications", 123), or None."""
+    url = f"{HARVEST_API_URL}/{resource}/{object_id}"
+    headers = {"Authorization": f"Basic {GREENHOUSE_API_KEY_ENCODED}"}
+    try:
+        response = harvest_get(url, headers, {})
+    except RequestException as e:
+        print(f"RequestException fetching {resource} {object_id}: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"Failed to fetch {resource} {object_id}: {response.status_code}")
+        return None
+    return response.json()
+
+
+async def get_application(application_id):
+    """Re-fetch one application, e.g. to refresh expired attachment URLs."""
+    return get_harvest_object("applications", application_id)
+
+
+async def get_job(job_id):
+    return get_harvest_object("jobs", job_id)
+
+
+def queue_failures(stage, items):
+    """
+    Record failed applications/candidates in the retry queue so they can be
+    reprocessed on their own. items are (item, reason) pairs; queue errors
+    are logged rather than failing the run.
+    """
+    if not items:
+        return
+    try:
+        queue = retry_queue.RetryQueue()
+        try:
+            for item, reason in items:
+                queue.record(stage, item.get("id"), item, reason)
+        finally:
+            queue.close()
+        telemetry.count(f"queued_{stage}_failures", len(items))
+    except Exception as e:
+        logging.error(f"Failed to queue {stage} failures: {e}")
+
+
+def skip_written_applications(applications):
+    """
+    Leave out applications already written (or being processed) with their
+    current resume, before their resumes are downloaded. extract_and_write
+    claims them for real; this only saves the download.
+    """
+    try:
+        log = application_log.ApplicationLog()
+        try:
+            kept = log.unwritten(applications)
+        finally:
+            log.close()
+    except Exception as e:
+        logging.error(f"Failed to check written applications: {e}")
+        return applications
+    telemetry.count("already_written", len(applications) - len(kept))
+    return kept
+
+
+@telemetry.traced()
 async def merge_jobs_and_applications(all_jobs, filtered_applications):
     lookup_jobs_dict = {job["id"]: job for job in all_jobs}
     for job_id, job_data in lookup_jobs_dict.items():
@@ -367,6 +593,7 @@ async def merge_jobs_and_applications(all_jobs, filtered_applications):
     return merged_list
 
 
+@telemetry.traced()
 async def download_resume_from_applications(filtered_applications):
     failed = []
     for application in filtered_applications:
@@ -385,119 +612,364 @@ async def download_resume_from_applications(filtered_applications):
                 response = requests.get(resume_url, timeout=10)  # Added timeout
                 response.raise_for_status()  # Raise error for HTTP issues
                 file_bytes = response.content
+                telemetry.count("downloads")
+                telemetry.count("bytes", len(file_bytes))
                 extracted_text = ""
 
                 if filename.lower().endswith(".pdf"):
                     try:
-                        pdf_reader = PdfReader(io.BytesIO(file_bytes))
-                        extracted_text = "\n".join(
-                            page.extract_text() or "" for page in pdf_reader.pages
-                        )
-                    except Exception as e_pypdf2:
-                        print(f"PyPDF2 failed for {filename}: {e_pypdf2}")
-                        try:
-                            with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-                                extracted_text = "\n".join(
-                                    page.extract_text() or "" for page in pdf.pages
-                                )
-                        except Exception as e_pdfplumber:
-                            print(f"pdfplumber failed for {filename}: {e_pdfplumber}")
-                            failed.append(application)
-                            continue
+                        extracted_text = pdf_text.extract_pdf_text(file_bytes)
+                    except Exception as e_pdf:
+                        print(f"PDF extraction failed for {filename}: {e_pdf}")
+                        application["failure_reason"] = f"pdf: {e_pdf}"
+                        failed.append(application)
+                        continue
 
                 elif filename.lower().endswith(".docx"):
                     doc = Document(io.BytesIO(file_bytes))
                     extracted_text = "\n".join(
                         paragraph.text for paragraph in doc.paragraphs
                     )
+                elif filename.lower().endswith(".doc"):
+                    extracted_text = await extract_text_from_doc(file_bytes)
                 elif filename.lower().endswith(".txt"):
                     # Handle TXT files
                     try:
                         extracted_text = file_bytes.decode("utf-8", errors="ignore")
                     except Exception as e:
                         print(f"Failed to process .txt file {filename}: {e}")
+                        application["failure_reason"] = f"txt: {e}"
                         failed.append(application)
                         continue
 
                 else:
                     print(f"Unsupported file type for {filename}")
+                    application["failure_reason"] = f"unsupported file type: {filename}"
                     failed.append(application)
                     continue
 
                 application["resume_content"] = extracted_text
+                telemetry.count("items")
 
             except requests.RequestException as e:
                 print(f"Failed to download {filename}: {e}")
+                application["failure_reason"] = f"download: {e}"
                 failed.append(application)
             except Exception as e:
                 print(f"Error processing {filename}: {e}")
+                application["failure_reason"] = f"extraction: {e}"
                 failed.append(application)
+    telemetry.count("failures", len(failed))
     return filtered_applications, failed
 
 
 async def extract_text_from_doc(file_bytes):
-    def _extract():
-        try:
-            ole = olefile.OleFileIO(io.BytesIO(file_bytes))
-            if ole.exists("WordDocument"):
-                stream = ole.openstream("WordDocument")
-                data = stream.read()
-                text = data.decode("utf-8", errors="ignore")
-                return text
-            else:
-                print("No 'WordDocument' stream found in the .doc file.")
-                return None
-        except Exception as e:
-            print(f"Error extracting text from .doc file: {e}")
-            return None
+    """Text of a Word 97-2003 .doc; raises ValueError if it can't be read."""
+    return await asyncio.to_thread(doc_text.extract_doc_text, file_bytes)
 
-    return await asyncio.to_thread(_extract)
+
+def write_rows_to_sheet(flattened_rows):
+    service = authenticate_google_sheets()
+    write_to_google_sheet(service, flattened_rows)
+    try:
+        refresh_role_trends(
+            service,
+            SPREADSHEET_ID,
+            SHEET_NAME,
+            flattened_rows,
+            raw_tab=TAB_NAME,
+            raw_headers=RAW_HEADERS,
+        )
+    except Exception as e:
+        # Raw rows are already written and pending summary rows are kept
+        # locally (or rebuilt from the raw tab), so don't fail this run.
+        logging.error(f"An error occurred in the process function - aggregates: {e}")
 
 
 # Todo: Keep thinking about the degree overfitting
-async def process(created_after_date, created_before_date):
+@telemetry.traced_run(
+    attributes=lambda after, before, *_, **__: {
+        "created_after": after,
+        "created_before": before,
+    }
+)
+async def process(
+    created_after_date,
+    created_before_date,
+    write_rows=None,
+    extraction_deadline=None,
+    extracted=None,
+    owner=None,
+):
+    """
+    Run the pipeline for applications created in the given window. Rows are
+    written to Google Sheets unless a write_rows callable is given, in which
+    case it receives the flattened rows instead (used by backfill workers).
+    extraction_deadline (seconds) drives real-time vs Batch routing and
+    defaults to EXTRACTION_DEADLINE_SECONDS. See extract_and_write for
+    extracted and owner.
+    """
     try:
         jobs = await get_all_jobs()
         created_after = created_after_date
         created_before = created_before_date
         filtered_applications = await get_applications(created_after, created_before)
+        if filtered_applications:
+            filtered_applications = skip_written_applications(filtered_applications)
         resume_applications, failed = await download_resume_from_applications(
             filtered_applications
         )
+        # Failed downloads go to the retry queue instead of being sent to the
+        # LLM without a resume.
+        queue_failures(
+            retry_queue.DOWNLOAD,
+            [(app, app.get("failure_reason", "download failed")) for app in failed],
+        )
+        failed_ids = {id(app) for app in failed}
+        resume_applications = [
+            app for app in resume_applications if id(app) not in failed_ids
+        ]
         jobs_and_applications_list = await merge_jobs_and_applications(
             jobs, resume_applications
         )
     except Exception as e:
         logging.error(f"An error occurred in the process function - greenhouse: {e}")
         return func.HttpResponse(f"An error occurred: {e}", status_code=500)
+    return await extract_and_write(
+        jobs_and_applications_list, write_rows, extraction_deadline, extracted, owner
+    )
+
 
+@telemetry.traced_run(
+    attributes=lambda application_id, *_, **__: {"application_id": application_id}
+)
+async def process_application(application_id, write_rows=None):
+    """
+    Run one application (e.g. from a Greenhouse webhook) through the same
+    stages as process(). A resume that can't be downloaded is queued for
+    retry and answered with 202.
+    """
     try:
-        openai_client = await create_openai_client(OPEN_AI_KEY)
-        results = await asyncio.gather(
-            *(
-                parse_with_chatgpt(openai_client, candidate_data)
-                for candidate_data in jobs_and_applications_list
+        application = await get_application(application_id)
+        if application is None:
+            return func.HttpResponse("Application not found", status_code=404)
+        if not application.get("jobs"):
+            # Prospects aren't attached to a job and aren't reported on
+            return func.HttpResponse("Application has no job", status_code=200)
+        if not skip_written_applications([application]):
+            # e.g. application_updated for a stage change: same resume
+            return func.HttpResponse("Already processed", status_code=200)
+        job = await get_job(application["jobs"][0]["id"])
+        if job is None:
+            return func.HttpResponse("Job not found", status_code=404)
+        resume_applications, failed = await download_resume_from_applications(
+            [application]
+        )
+        if failed:
+            queue_failures(
+                retry_queue.DOWNLOAD,
+                [(app, app.get("failure_reason", "download failed")) for app in failed],
             )
+            return func.HttpResponse("Queued for retry", status_code=202)
+        candidates = await merge_jobs_and_applications([job], resume_applications)
+    except Exception as e:
+        logging.error(f"An error occurred in process_application - greenhouse: {e}")
+        return func.HttpResponse(f"An error occurred: {e}", status_code=500)
+    return await extract_and_write(candidates, write_rows)
+
+
+@telemetry.traced_run(
+    attributes=lambda after, before, *_, **__: {
+        "created_after": after,
+        "created_before": before,
+    }
+)
+async def enqueue_process(created_after_date, created_before_date, queue):
+    """
+    Fan-out coordinator: fetch the window's applications and put the ids of
+    those still to process on the queue in micro-batches for
+    process_work_item to pick up on any instance. Workers fetch the
+    applications and jobs themselves, so messages stay small and resume
+    URLs are fresh when downloaded. put_many has sent every item when this
+    returns 200; a failed send fails the run.
+    """
+    run_id = f"{created_after_date}/{created_before_date}"
+    try:
+        applications = await get_applications(created_after_date, created_before_date)
+        applications = skip_written_applications(
+            [application for application in applications or [] if application["jobs"]]
+        )
+        application_ids = [application["id"] for application in applications]
+        work_items = [
+            {"run_id": run_id, "part": part, "application_ids": batch}
+            for part, batch in enumerate(
+                work_queue.pack_messages(application_ids, WORK_ITEM_SIZE)
+            )
+        ]
+        queue.put_many(work_items)
+    except Exception as e:
+        logging.error(f"An error occurred in enqueue_process: {e}")
+        return func.HttpResponse(f"An error occurred: {e}", status_code=500)
+    telemetry.count("work_items", len(work_items))
+    return func.HttpResponse(
+        f"Queued {len(application_ids)} applications in {len(work_items)} work items",
+        status_code=200,
+    )
+
+
+@telemetry.traced_run(
+    attributes=lambda work_item, *_, **__: {
+        "run_id": work_item.get("run_id"),
+        "part": work_item.get("part"),
+        "applications": len(work_item.get("application_ids") or []),
+    }
+)
+async def process_work_item(work_item, write_rows=None):
+    """
+    Fan-out worker: fetch one micro-batch of applications and their jobs,
+    download their resumes and run them through extraction, the LLM and the
+    write. Applications written since they were queued are skipped.
+    """
+    try:
+        applications = []
+        for application_id in work_item["application_ids"]:
+            application = await get_application(application_id)
+            if application is None or not application.get("jobs"):
+                continue
+            applications.append(application)
+        applications = skip_written_applications(applications)
+        jobs = {}
+        for application in applications:
+            job_id = application["jobs"][0]["id"]
+            if job_id not in jobs:
+                jobs[job_id] = await get_job(job_id)
+        merged = await merge_jobs_and_applications(
+            [job for job in jobs.values() if job is not None], applications
+        )
+    except Exception as e:
+        logging.error(f"An error occurred in process_work_item - greenhouse: {e}")
+        return func.HttpResponse(f"An error occurred: {e}", status_code=500)
+    try:
+        resume_candidates, failed = await download_resume_from_applications(merged)
+        queue_failures(
+            retry_queue.DOWNLOAD,
+            [(c, c.get("failure_reason", "download failed")) for c in failed],
+        )
+        failed_ids = {id(c) for c in failed}
+        candidates = [c for c in resume_candidates if id(c) not in failed_ids]
+    except Exception as e:
+        logging.error(f"An error occurred in process_work_item - download: {e}")
+        return func.HttpResponse(f"An error occurred: {e}", status_code=500)
+    if not candidates:
+        return func.HttpResponse("Nothing left to process", status_code=200)
+    return await extract_and_write(candidates, write_rows)
+
+
+async def extract_and_write(
+    jobs_and_applications_list,
+    write_rows,
+    extraction_deadline=None,
+    extracted=None,
+    owner=None,
+):
+    """
+    The LLM, validation, normalization and write stages of a run. Candidates
+    are claimed in the application log first, so one already written with
+    the same resume, or being processed by another run, is skipped, and are
+    marked written once write_rows returns. When write_rows only collects
+    the rows for a later write, pass an extracted list: the candidates whose
+    rows were collected are added to it and left claimed, and the caller
+    marks them written (or releases them as owner) after the real write.
+    Claims are made as owner (a new run id by default) and last for the
+    extraction deadline plus APPLICATION_CLAIM_SECONDS; candidates left in
+    a queued Batch have their claims handed to that Batch.
+    """
+    if extraction_deadline is None:
+        extraction_deadline = EXTRACTION_DEADLINE_SECONDS
+    log = application_log.ApplicationLog()
+    try:
+        return await _extract_and_write(
+            log,
+            owner or application_log.new_owner(),
+            jobs_and_applications_list,
+            write_rows,
+            extraction_deadline,
+            extracted,
+        )
+    finally:
+        log.close()
+
+
+async def _extract_and_write(
+    log, owner, candidates, write_rows, extraction_deadline, extracted_out=None
+):
+    try:
+        claimed = log.claim(
+            candidates, owner, application_log.claim_seconds() + extraction_deadline
+        )
+    except Exception as e:
+        logging.error(f"An error occurred in the process function - claim: {e}")
+        return func.HttpResponse(str(e), status_code=500)
+    telemetry.count("already_written", len(candidates) - len(claimed))
+    if not claimed:
+        return func.HttpResponse("Nothing new to process", status_code=200)
+    jobs_and_applications_list = claimed
+    try:
+        openai_client = await create_openai_client(OPEN_AI_KEY)
+        results = await extract_with_chatgpt(
+            openai_client, jobs_and_applications_list, extraction_deadline
         )
     except Exception as e:
         logging.error(f"An error occurred in the process function - gpt: {e}")
     try:
-        validated_json, failed_messages = validation_gpt_response(results)
+        usable_results, llm_failures, extracted = [], [], []
+        batched = {}
+        for candidate, result in zip(jobs_and_applications_list, results):
+            if isinstance(result, BatchPending):
+                batched.setdefault(result.batch_id, []).append(candidate)
+                continue
+            if parse_gpt_result(result) is None:
+                llm_failures.append((candidate, "no parsable LLM response"))
+            else:
+                usable_results.append(result)
+                extracted.append(candidate)
+        # Candidates in a queued batch stay claimed, by the batch, while it runs
+        for batch_id, batch_candidates in batched.items():
+            log.hand_over(
+                batch_candidates,
+                owner,
+                application_log.batch_owner(batch_id),
+                application_log.batch_claim_seconds(),
+            )
+        queue_failures(retry_queue.LLM, llm_failures)
+        log.release([candidate for candidate, _ in llm_failures], owner)
+        validated_json, failed_messages = validation_gpt_response(usable_results)
     except Exception as e:
         logging.error(f"An error occurred in the process function - validation: {e}")
+        log.release(jobs_and_applications_list, owner)
         return func.HttpResponse(str(e), status_code=500)
+    try:
+        validated_json = canonical.canonicalize_candidates(validated_json)
+    except Exception as e:
+        # Raw names are still worth writing; aggregates are just less tidy
+        logging.error(f"An error occurred in the process function - canonical: {e}")
     try:
         flattened_rows = normalize_candidates(validated_json)
     except Exception as e:
         logging.error(f"An error occurred in the process function - normalization: {e}")
+        log.release(extracted, owner)
         return func.HttpResponse(str(e), status_code=500)
     try:
-        service = authenticate_google_sheets()
-        write_to_google_sheet(service, flattened_rows)
-        return func.HttpResponse("Processed to sheet successfully", status_code=200)
+        (write_rows or write_rows_to_sheet)(flattened_rows)
     except Exception as e:
         logging.error(f"Google Sheets exception found: {e}")
+        log.release(extracted, owner)
         return func.HttpResponse(str(e), status_code=500)
+    if extracted_out is None:
+        log.mark_written(extracted)
+    else:
+        extracted_out.extend(extracted)
+    return func.HttpResponse("Processed to sheet successfully", status_code=200)
 
 
 def parse_candidate(item):
@@ -545,6 +1017,7 @@ def expand_candidate(candidate):
     return rows
 
 
+@telemetry.traced()
 def normalize_candidates(candidate_data):
     """
     Given a list of candidate records (as dictionaries or dict-string),
@@ -556,6 +1029,8 @@ def normalize_candidates(candidate_data):
     for c in candidates:
         expanded = expand_candidate(c)
         all_rows.extend(expanded)
+    telemetry.count("items", len(candidates))
+    telemetry.count("rows", len(all_rows))
     return all_rows
 
 
@@ -0,0 +1,167 @@
+"""
+Resume text from PDFs within a page and character budget. pypdf and
+pdfplumber are tried in the order that has been fastest for documents of
+the same profile; an extractor whose output is empty or garbled falls
+back to the next one instead of only on exceptions.
+"""
+
+import io
+import os
+import threading
+import time
+
+import pdfplumber
+from pypdf import PdfReader
+
+import telemetry
+
+# Below this many non-space characters per page the text is probably a scan
+MIN_CHARS_PER_PAGE = 100
+MIN_LETTER_RATIO = 0.5
+MAX_GARBAGE_RATIO = 0.02
+# A profile needs this many timed runs of an extractor before its speed counts
+MIN_SAMPLES = 5
+# Every Nth extraction run of a profile tries the other order first, so the
+# extractor that is usually second still gets timed
+EXPLORE_EVERY = 20
+DEFAULT_ORDER = ("pypdf", "pdfplumber")
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def extraction_budget():
+    return {
+        "pages": int(os.getenv("PDF_MAX_PAGES", 10)),
+        "chars": int(os.getenv("PDF_MAX_CHARS", 30000)),
+    }
+
+
+def _read_pages(pages, max_pages, max_chars, extract):
+    parts, chars, read = [], 0, 0
+    for page in pages:
+        if read >= max_pages or chars >= max_chars:
+            break
+        text = extract(page) or ""
+        parts.append(text)
+        chars += len(text) + 1
+        read += 1
+    return "\n".join(parts)[:max_chars], read
+
+
+def _extract_pypdf(file_bytes, max_pages, max_chars):
+    reader = PdfReader(io.BytesIO(file_bytes))
+    return _read_pages(reader.pages, max_pages, max_chars, lambda p: p.extract_text())
+
+
+def _extract_pdfplumber(file_bytes, max_pages, max_chars):
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return _read_pages(pdf.pages, max_pages, max_chars, lambda p: p.extract_text())
+
+
+EXTRACTORS = {"pypdf": _extract_pypdf, "pdfplumber": _extract_pdfplumber}
+
+
+def is_low_quality(text, pages_read):
+    """Empty, too sparse for the pages read (scans), or mostly garbage."""
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < MIN_CHARS_PER_PAGE * max(1, pages_read):
+        return True
+    letters = sum(c.isalpha() for c in visible)
+    # pdfplumber writes unmapped glyphs as "(cid:123)", pypdf as U+FFFD
+    garbage = text.count("\ufffd") + 5 * text.count("(cid:")
+    return (
+        letters / len(visible) < MIN_LETTER_RATIO
+        or garbage / len(visible) > MAX_GARBAGE_RATIO
+    )
+
+
+def document_profile(file_bytes):
+    """
+    A coarse (page bucket, bytes-per-page bucket) key. Large pages usually
+    mean embedded images or scans, which the extractors handle differently.
+    """
+    try:
+        pages = len(PdfReader(io.BytesIO(file_bytes)).pages)
+    except Exception:
+        return ("unreadable", "")
+    size = "1-2" if pages <= 2 else "3-10" if pages <= 10 else "11+"
+    per_page = len(file_bytes) / max(1, pages)
+    weight = "light" if per_page < 50000 else "heavy"
+    return (size, weight)
+
+
+def record(profile, name, seconds, success):
+    with _stats_lock:
+        stats = _stats.setdefault(
+            (profile, name), {"runs": 0, "successes": 0, "seconds": 0.0}
+        )
+        stats["runs"] += 1
+        stats["successes"] += int(success)
+        stats["seconds"] += seconds
+    telemetry.observe(f"pdf_{name}_seconds", seconds)
+    telemetry.count(f"pdf_{name}_{'ok' if success else 'low_quality'}")
+
+
+def extractor_stats():
+    """{(profile, extractor): {"runs", "successes", "seconds"}} so far."""
+    with _stats_lock:
+        return {key: dict(value) for key, value in _stats.items()}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def extractor_order(profile):
+    """
+    Fastest first among extractors with enough samples and a success rate
+    no worse than the default's; the default order until then.
+    """
+    with _stats_lock:
+        stats = {name: _stats.get((profile, name)) for name in DEFAULT_ORDER}
+        runs = sum(s["runs"] for s in stats.values() if s)
+    order = list(DEFAULT_ORDER)
+    if all(s and s["runs"] >= MIN_SAMPLES for s in stats.values()):
+        default_rate = stats[order[0]]["successes"] / stats[order[0]]["runs"]
+        order.sort(
+            key=lambda name: (
+                stats[name]["successes"] / stats[name]["runs"] < default_rate,
+                stats[name]["seconds"] / stats[name]["runs"],
+            )
+        )
+    if runs % EXPLORE_EVERY == EXPLORE_EVERY - 1:
+        order.reverse()
+    return order
+
+
+def extract_pdf_text(file_bytes, budget=None):
+    """
+    Text of the first pages of a PDF, within budget {"pages", "chars"}.
+    Returns the first good extraction, else the longest low-quality one;
+    raises the last error if every extractor failed.
+    """
+    budget = budget or extraction_budget()
+    profile = document_profile(file_bytes)
+    best, error = None, None
+    for name in extractor_order(profile):
+        started = time.perf_counter()
+        try:
+            text, pages_read = EXTRACTORS[name](
+                file_bytes, budget["pages"], budget["chars"]
+            )
+        except Exception as e:
+            print(f"{name} failed: {e}")
+            record(profile, name, time.perf_counter() - started, False)
+            error = e
+            continue
+        good = not is_low_quality(text, pages_read)
+        record(profile, name, time.perf_counter() - started, good)
+        if good:
+            return text
+        if best is None or len(text.strip()) > len(best.strip()):
+            best = text
+    if best is not None:
+        return best
+    raise error
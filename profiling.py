@@ -0,0 +1,327 @@
+"""
+Opt-in profiling for a single process() run: a sampling CPU profiler over
+all threads, tracemalloc top allocations per pipeline stage, and an
+event-loop lag monitor that captures the loop thread's stack whenever the
+loop is blocked (synchronous requests calls, time.sleep, PDF parsing...).
+Artifacts are written under PROFILE_DIR/<profile_id>/, on shared storage by
+default so ProcessRolesProfile can serve them from any instance; only the
+newest PROFILE_MAX_COUNT profiles are kept.
+"""
+
+import asyncio
+import hmac
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import zipfile
+
+import storage
+import telemetry
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+
+PROFILE_KEY_HEADER = "x-profile-key"
+
+
+def profile_dir():
+    return os.getenv("PROFILE_DIR") or storage.state_path("recruitment-profiles")
+
+
+def profile_max_count():
+    return int(os.getenv("PROFILE_MAX_COUNT", 20))
+
+
+def _authorized(req):
+    """Whether the request carries the PROFILE_KEY secret."""
+    secret = os.getenv("PROFILE_KEY")
+    supplied = req.headers.get(PROFILE_KEY_HEADER) if req.headers else None
+    if not secret or not supplied:
+        return False
+    return hmac.compare_digest(secret.encode("utf-8"), supplied.encode("utf-8"))
+
+
+def profiling_requested(req=None):
+    """
+    Profiling is on when PROFILE_PROCESS is set, or when ?profile=1 is passed
+    by a caller that sends the PROFILE_KEY secret in the x-profile-key
+    header; ProcessRoles is anonymous, so the parameter alone is ignored.
+    """
+    value = None
+    if req is not None and _authorized(req):
+        value = req.params.get("profile")
+    if value is None:
+        value = os.getenv("PROFILE_PROCESS", "")
+    return str(value).strip().lower() in TRUTHY
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class ProcessProfiler:
+    """
+    Async context manager wrapping one run:
+
+        async with ProcessProfiler() as profiler:
+            result = await process(created_after, created_before)
+        profiler.profile_id  # artifacts in profile_dir()/profile_id
+    """
+
+    def __init__(
+        self,
+        sample_interval=0.01,
+        lag_interval=0.05,
+        lag_threshold=0.1,
+        top_allocations=25,
+        tracemalloc_frames=5,
+    ):
+        self.profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(profile_dir(), self.profile_id)
+        self.sample_interval = sample_interval
+        self.lag_interval = lag_interval
+        self.lag_threshold = lag_threshold
+        self.top_allocations = top_allocations
+        self.tracemalloc_frames = tracemalloc_frames
+        self.stacks = {}
+        self.samples = 0
+        self.stages = []
+        self.stalls = []
+        self.lags = []
+        self._stage_snapshots = {}
+        self._stop = threading.Event()
+        self._loop_thread = None
+        self._last_beat = None
+        self._stall = None
+        self._started_tracemalloc = False
+        self._threads = []
+        self._heartbeat = None
+        self._started = None
+
+    # CPU sampling
+
+    def _sample(self):
+        own = {t.ident for t in self._threads}
+        while not self._stop.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident in own:
+                    continue
+                stack = [names.get(ident, str(ident))] + _frame_stack(frame)
+                key = ";".join(stack)
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    # Event-loop lag
+
+    async def _beat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+            self._last_beat = time.monotonic()
+
+    def _watch(self):
+        while not self._stop.wait(self.lag_interval / 2):
+            stalled_for = time.monotonic() - self._last_beat - self.lag_interval
+            if stalled_for >= self.lag_threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = _frame_stack(frame) if frame else []
+                if self._stall is None:
+                    self._stall = {
+                        "started_offset_s": round(
+                            time.monotonic() - self._started - stalled_for, 3
+                        ),
+                        "stage": self._current_stage(),
+                        "stack": stack,
+                        "samples": {},
+                    }
+                # Long stalls move through several blocking calls, so keep
+                # a count of every stack seen while the loop is stuck.
+                key = ";".join(stack)
+                samples = self._stall["samples"]
+                samples[key] = samples.get(key, 0) + 1
+            elif self._stall is not None:
+                self._close_stall()
+
+    def _close_stall(self):
+        stall, self._stall = self._stall, None
+        stall["blocked_s"] = round(
+            time.monotonic() - self._started - stall["started_offset_s"], 3
+        )
+        stall["samples"] = [
+            {"stack": key.split(";"), "samples": hits}
+            for key, hits in sorted(stall["samples"].items(), key=lambda kv: -kv[1])[
+                :10
+            ]
+        ]
+        self.stalls.append(stall)
+
+    def _current_stage(self):
+        return self.stages[-1]["stage"] if self.stages else None
+
+    # Per-stage memory
+
+    @staticmethod
+    def _is_stage(span):
+        return span.parent is not None and span.parent.parent is None
+
+    def _on_span(self, event, span):
+        if not self._is_stage(span):
+            return
+        if event == "start":
+            tracemalloc.reset_peak()
+            self.stages.append({"stage": span.name, "span_id": span.id})
+            self._stage_snapshots[span.id] = tracemalloc.take_snapshot()
+            return
+        before = self._stage_snapshots.pop(span.id, None)
+        if before is None:
+            return
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        diff = after.compare_to(before, "traceback")[: self.top_allocations]
+        for stage in self.stages:
+            if stage["span_id"] == span.id:
+                stage.update(
+                    duration_s=round(span.duration or 0, 4),
+                    traced_current_mb=round(current / 1024 / 1024, 2),
+                    traced_peak_mb=round(peak / 1024 / 1024, 2),
+                    top_allocations=[
+                        {
+                            "size_diff_kb": round(stat.size_diff / 1024, 1),
+                            "count_diff": stat.count_diff,
+                            "traceback": [str(frame) for frame in stat.traceback],
+                        }
+                        for stat in diff
+                    ],
+                )
+
+    # Lifecycle
+
+    async def __aenter__(self):
+        self._started = time.monotonic()
+        self._last_beat = self._started
+        self._loop_thread = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self._started_tracemalloc = True
+        telemetry.add_span_listener(self._on_span)
+        self._threads = [
+            threading.Thread(target=self._sample, name="profiler-cpu", daemon=True),
+            threading.Thread(target=self._watch, name="profiler-lag", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._heartbeat = asyncio.create_task(self._beat())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._heartbeat.cancel()
+        try:
+            await self._heartbeat
+        except asyncio.CancelledError:
+            pass
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        if self._stall is not None:
+            self._close_stall()
+        telemetry.remove_span_listener(self._on_span)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        try:
+            self.write_artifacts(time.monotonic() - self._started, exc)
+        except OSError as e:
+            logging.error(f"Failed to write profile {self.profile_id}: {e}")
+        return False
+
+    def _top_functions(self, limit=40):
+        inclusive, own = {}, {}
+        for key, hits in self.stacks.items():
+            frames = key.split(";")[1:]
+            if frames:
+                own[frames[-1]] = own.get(frames[-1], 0) + hits
+            for frame in set(frames):
+                inclusive[frame] = inclusive.get(frame, 0) + hits
+        rank = lambda counts: [
+            {"function": name, "samples": hits}
+            for name, hits in sorted(counts.items(), key=lambda kv: -kv[1])[:limit]
+        ]
+        return {"self": rank(own), "inclusive": rank(inclusive)}
+
+    def write_artifacts(self, elapsed, error=None):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "cpu.collapsed"), "w") as file:
+            for key, hits in sorted(self.stacks.items(), key=lambda kv: -kv[1]):
+                file.write(f"{key} {hits}\n")
+        lags = sorted(self.lags)
+        summary = {
+            "profile_id": self.profile_id,
+            "elapsed_s": round(elapsed, 3),
+            "error": repr(error) if error else None,
+            "cpu_samples": self.samples,
+            "sample_interval_s": self.sample_interval,
+            "top_functions": self._top_functions(),
+            "loop_lag": {
+                "beats": len(lags),
+                "max_s": round(lags[-1], 4) if lags else None,
+                "p95_s": round(lags[int(0.95 * (len(lags) - 1))], 4) if lags else None,
+                "blocked_total_s": round(sum(s["blocked_s"] for s in self.stalls), 3),
+            },
+        }
+        artifacts = {
+            "summary.json": summary,
+            "memory_by_stage.json": [
+                {k: v for k, v in stage.items() if k != "span_id"}
+                for stage in self.stages
+            ],
+            "loop_stalls.json": self.stalls,
+        }
+        for name, payload in artifacts.items():
+            with open(os.path.join(self.path, name), "w") as file:
+                json.dump(payload, file, indent=2, default=str)
+        logging.info(f"Profile {self.profile_id} written to {self.path}")
+        prune_profiles(profile_max_count())
+        return self.path
+
+
+def prune_profiles(max_count):
+    """Delete all but the newest max_count profiles; ids sort by start time."""
+    for profile_id in list_profiles()[max_count:]:
+        shutil.rmtree(os.path.join(profile_dir(), profile_id), ignore_errors=True)
+
+
+def profile_archive(profile_id):
+    """Zip a profile's artifacts for download; None if it does not exist."""
+    if not profile_id or os.path.basename(profile_id) != profile_id:
+        return None
+    path = os.path.join(profile_dir(), profile_id)
+    if not os.path.isdir(path):
+        return None
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(os.listdir(path)):
+            archive.write(os.path.join(path, name), f"{profile_id}/{name}")
+    return buffer.getvalue()
+
+
+def list_profiles():
+    if not os.path.isdir(profile_dir()):
+        return []
+    return sorted(os.listdir(profile_dir()), reverse=True)
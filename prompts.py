@@ -0,0 +1,69 @@
+import hashlib
+import os
+import threading
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+EXTRACTION_PROMPT = "gpt_prompt"
+
+_prompts = {}
+_lock = threading.Lock()
+
+
+class Prompt:
+    """
+    A system prompt loaded once per process. version is a short content
+    hash so runs, traces and batches can be tied to the exact prompt used.
+    """
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        # Built once so every request shares a byte-identical prefix, which
+        # is what provider-side prompt caching keys on.
+        self.system_message = {"role": "system", "content": text}
+
+    def messages(self, candidate_data):
+        """Static system prefix first, per-candidate content last."""
+        return [
+            self.system_message,
+            {"role": "user", "content": f"Candidate Data: {candidate_data}"},
+        ]
+
+
+def get_prompt(name=EXTRACTION_PROMPT):
+    prompt = _prompts.get(name)
+    if prompt is None:
+        with _lock:
+            prompt = _prompts.get(name)
+            if prompt is None:
+                path = os.path.join(PROMPT_DIR, f"{name}.txt")
+                with open(path, "r") as file:
+                    prompt = Prompt(name, file.read())
+                _prompts[name] = prompt
+    return prompt
+
+
+def reload_prompts():
+    """Drop cached prompts so the next get_prompt re-reads them from disk."""
+    with _lock:
+        _prompts.clear()
+
+
+def cached_tokens(usage):
+    """
+    prompt_tokens_details.cached_tokens from a completion's usage, which may
+    be an SDK object or the plain dict found in Batch output. 0 if absent.
+    """
+    if not usage:
+        return 0
+    details = (
+        usage.get("prompt_tokens_details")
+        if isinstance(usage, dict)
+        else getattr(usage, "prompt_tokens_details", None)
+    )
+    if not details:
+        return 0
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
@@ -0,0 +1,76 @@
+import multiprocessing
+import threading
+import time
+
+_limiters = {}
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` calls per `per` seconds with bursts up to
+    `rate`. A limiter made with RateLimiter.shared() keeps its bucket in
+    shared memory so every worker process it is handed to draws from the
+    same budget.
+    """
+
+    def __init__(self, rate, per=1.0, state=None):
+        self.rate = float(rate)
+        self.per = float(per)
+        if state is None:
+            self._state = [self.rate, time.time()]
+            self._lock = threading.Lock()
+        else:
+            self._state = state
+            self._lock = state.get_lock()
+
+    @classmethod
+    def shared(cls, rate, per=1.0, context=None):
+        """Create the bucket with the multiprocessing context workers use."""
+        context = context or multiprocessing.get_context()
+        return cls(rate, per, context.Array("d", [float(rate), time.time()]))
+
+    def __getstate__(self):
+        if isinstance(self._state, list):
+            raise TypeError("Only RateLimiter.shared() limiters can be pickled")
+        return {"rate": self.rate, "per": self.per, "state": self._state}
+
+    def __setstate__(self, state):
+        self.__init__(state["rate"], state["per"], state["state"])
+
+    def acquire(self):
+        """Block until a call is allowed; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                tokens = min(
+                    self.rate,
+                    self._state[0] + (now - self._state[1]) * self.rate / self.per,
+                )
+                self._state[1] = now
+                if tokens >= 1:
+                    self._state[0] = tokens - 1
+                    return waited
+                self._state[0] = tokens
+                wait = (1 - tokens) * self.per / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def configure(name, limiter):
+    """Install (or with None, remove) the limiter used for `name` calls."""
+    if limiter is None:
+        _limiters.pop(name, None)
+    else:
+        _limiters[name] = limiter
+
+
+def acquire(name):
+    limiter = _limiters.get(name)
+    return limiter.acquire() if limiter is not None else 0.0
+
+
+def parse_rate(value):
+    """Parse "50/10" (50 calls per 10 seconds) or "5" (per second)."""
+    rate, _, per = str(value).partition("/")
+    return float(rate), float(per or 1)
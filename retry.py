@@ -0,0 +1,251 @@
+"""
+Reprocess items from the retry queue instead of rerunning whole windows.
+
+    python retry.py --stage download --limit 200
+
+The RetryFailures timer Function runs the same thing every 15 minutes.
+
+Download failures are re-fetched from Harvest (their signed attachment URLs
+expire), downloaded and merged with their job; together with queued LLM
+failures they are then extracted, validated and written like a normal run.
+Batches that were still running at their run's deadline are collected once
+they finish and written the same way; until then they are checked again
+every base_delay seconds. A Batch owns the application log claims on its
+candidates until it is collected, and re-claims them before its output is
+written, so anything another run wrote in the meantime is skipped. Items
+that fail again are rescheduled with exponential backoff and marked dead
+after the queue's max_attempts.
+"""
+
+import argparse
+import asyncio
+import logging
+
+import application_log
+import canonical
+import main
+import retry_queue
+import telemetry
+
+
+async def _refresh_downloads(queue, items):
+    """Re-download queued applications; returns (item, candidate) pairs."""
+    if not items:
+        return []
+    applications, items_by_id = [], {}
+    for item in items:
+        application = await main.get_application(item["item_key"])
+        if application is None:
+            application = dict(item["payload"])
+            application.pop("failure_reason", None)
+        applications.append(application)
+        items_by_id[str(application["id"])] = item
+    downloaded, failed = await main.download_resume_from_applications(applications)
+    for application in failed:
+        item = items_by_id.pop(str(application["id"]))
+        queue.mark_failed(item["id"], application.get("failure_reason"))
+    failed_ids = {id(application) for application in failed}
+    downloaded = [app for app in downloaded if id(app) not in failed_ids]
+    jobs = await main.get_all_jobs()
+    pairs = []
+    for candidate in await main.merge_jobs_and_applications(jobs, downloaded):
+        pairs.append((items_by_id.pop(str(candidate["id"])), candidate))
+    # Whatever is left had no matching job
+    for item in items_by_id.values():
+        queue.mark_failed(item["id"], "no matching job")
+    return pairs
+
+
+async def _collect_batches(queue, log, openai_client, items):
+    """
+    Outputs of finished queued batches as (item, candidate, result, owner)
+    for the candidates the batch could re-claim, the finished batch items,
+    and how many batches are still running.
+    """
+    outcomes, collected, running = [], [], 0
+    for item in items:
+        candidates = item["payload"]["candidates"]
+        owner = application_log.batch_owner(item["item_key"])
+        try:
+            check = await asyncio.to_thread(
+                main.check_gpt, openai_client, item["item_key"]
+            )
+        except Exception as e:
+            # Failed or expired: each candidate is retried on its own, which
+            # claims it again
+            logging.error(f"Queued batch {item['item_key']} failed: {e}")
+            log.release(candidates, owner)
+            for candidate in candidates:
+                queue.record(
+                    retry_queue.LLM, candidate.get("id"), candidate, f"batch: {e}"
+                )
+            queue.mark_done(item["id"])
+            continue
+        if not check:
+            queue.postpone(item["id"], queue.base_delay)
+            running += 1
+            continue
+        contents = main.batch_contents(check)
+        claimed = {id(c) for c in log.claim(candidates, owner)}
+        # The rest were written by another run while the batch ran
+        telemetry.count("already_written", len(candidates) - len(claimed))
+        collected.append(item)
+        outcomes += [
+            (item, candidate, contents.get(str(i)), owner)
+            for i, candidate in enumerate(candidates)
+            if id(candidate) in claimed
+        ]
+    return outcomes, collected, running
+
+
+@telemetry.traced_run(
+    attributes=lambda stage=None, limit=500, *_, **__: {"stage": stage, "limit": limit}
+)
+async def retry_failures(stage=None, limit=500, write_rows=None, queue=None):
+    """
+    Retry up to `limit` due items (optionally of one stage). Returns counts
+    of items that succeeded, failed again, are waiting on a Batch, were
+    already written by another run, and of rows written.
+    """
+    own_queue = queue is None
+    queue = queue or retry_queue.RetryQueue()
+    log = application_log.ApplicationLog()
+    owner = application_log.new_owner()
+    try:
+        due = queue.due(stage, limit)
+        pairs = await _refresh_downloads(
+            queue, [item for item in due if item["stage"] == retry_queue.DOWNLOAD]
+        )
+        pairs += [
+            (item, item["payload"]) for item in due if item["stage"] == retry_queue.LLM
+        ]
+        batches = [item for item in due if item["stage"] == retry_queue.BATCH]
+        summary = {
+            "due": len(due),
+            "succeeded": 0,
+            "failed": 0,
+            "pending": 0,
+            "skipped": 0,
+            "rows": 0,
+        }
+        claimed = {
+            id(c) for c in log.claim([candidate for _, candidate in pairs], owner)
+        }
+        for item, candidate in pairs:
+            if id(candidate) not in claimed:
+                # Written by another run since it failed here
+                queue.mark_done(item["id"])
+                summary["skipped"] += 1
+        pairs = [(item, c) for item, c in pairs if id(c) in claimed]
+        outcomes, collected = [], []
+        if pairs or batches:
+            openai_client = await main.create_openai_client(main.OPEN_AI_KEY)
+            outcomes, collected, summary["pending"] = await _collect_batches(
+                queue, log, openai_client, batches
+            )
+        if pairs:
+            results = await main.extract_with_chatgpt(
+                openai_client,
+                [candidate for _, candidate in pairs],
+                main.EXTRACTION_DEADLINE_SECONDS,
+            )
+            outcomes += [
+                (item, candidate, result, owner)
+                for (item, candidate), result in zip(pairs, results)
+            ]
+        succeeded, usable_results, extracted = {}, [], []
+        for item, candidate, result, claim_owner in outcomes:
+            if isinstance(result, main.BatchPending):
+                # Now tracked, and claimed, by the batch extract_with_chatgpt
+                # queued
+                log.hand_over(
+                    [candidate],
+                    claim_owner,
+                    application_log.batch_owner(result.batch_id),
+                    application_log.batch_claim_seconds(),
+                )
+                queue.mark_done(item["id"])
+                summary["pending"] += 1
+                continue
+            if main.parse_gpt_result(result) is not None:
+                succeeded[item["id"]] = item
+                usable_results.append(result)
+                extracted.append((candidate, claim_owner))
+                continue
+            log.release([candidate], claim_owner)
+            if item["stage"] == retry_queue.LLM:
+                queue.mark_failed(item["id"], "no parsable LLM response")
+            else:
+                # A download or batch that now fails at the LLM moves to
+                # that stage, one candidate at a time
+                queue.record(
+                    retry_queue.LLM,
+                    candidate.get("id"),
+                    candidate,
+                    "no parsable LLM response",
+                )
+                if item["stage"] == retry_queue.DOWNLOAD:
+                    queue.mark_done(item["id"])
+        if usable_results:
+            validated_json, _ = main.validation_gpt_response(usable_results)
+            validated_json = canonical.canonicalize_candidates(validated_json)
+            rows = main.normalize_candidates(validated_json)
+            if rows:
+                try:
+                    (write_rows or main.write_rows_to_sheet)(rows)
+                except Exception as e:
+                    for candidate, claim_owner in extracted:
+                        log.release([candidate], claim_owner)
+                    for item in succeeded.values():
+                        queue.mark_failed(item["id"], f"write: {e}")
+                    raise
+            log.mark_written([candidate for candidate, _ in extracted])
+            summary["rows"] = len(rows)
+        # Collected batches are done even if none of their candidates parsed
+        for item in collected:
+            succeeded.setdefault(item["id"], item)
+        for item in succeeded.values():
+            queue.mark_done(item["id"])
+        summary["succeeded"] = len(succeeded)
+        summary["failed"] = (
+            summary["due"]
+            - summary["succeeded"]
+            - summary["pending"]
+            - summary["skipped"]
+        )
+        telemetry.count("retried", summary["due"])
+        telemetry.count("retry_succeeded", summary["succeeded"])
+        return summary
+    finally:
+        log.close()
+        if own_queue:
+            queue.close()
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--stage",
+        choices=[retry_queue.DOWNLOAD, retry_queue.LLM, retry_queue.BATCH],
+        default=None,
+    )
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument(
+        "--status", action="store_true", help="Only print queue counts by stage"
+    )
+    args = parser.parse_args(argv)
+    if args.status:
+        queue = retry_queue.RetryQueue()
+        try:
+            for (stage, status), count in sorted(queue.counts().items()):
+                print(f"{stage:10} {status:8} {count}")
+        finally:
+            queue.close()
+        return None
+    summary = asyncio.run(retry_failures(args.stage, args.limit))
+    print(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    main_cli()
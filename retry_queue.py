@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import time
+
+import storage
+
+DOWNLOAD = "download"
+LLM = "llm"
+# Batches still running when their run's deadline passed; item_key is the
+# batch id and the payload holds the batch's candidates
+BATCH = "batch"
+
+PENDING = "pending"
+DONE = "done"
+DEAD = "dead"
+
+
+def retry_queue_path():
+    # Shared by every instance on Azure, so the RetryFailures timer sees
+    # failures recorded anywhere
+    return os.getenv("RETRY_QUEUE_DB_PATH") or storage.state_db_path(
+        "recruitment_retry_queue.db"
+    )
+
+
+class RetryQueue:
+    """
+    Durable dead-letter queue for items that failed a pipeline stage. Each
+    (stage, item_key) is stored once with its payload and last reason;
+    failed retries back off exponentially and are marked dead after
+    max_attempts.
+    """
+
+    def __init__(self, db_path=None, base_delay=300, max_delay=86400, max_attempts=8):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        # Backfill workers share the file, so wait on locks instead of failing
+        self.conn = sqlite3.connect(db_path or retry_queue_path(), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS failures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stage TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                reason TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (stage, item_key)
+            );
+            CREATE INDEX IF NOT EXISTS failures_due
+                ON failures (status, next_attempt_at);
+            """)
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, stage, item_key, payload, reason):
+        """
+        Add a failed item, or refresh its payload and reason if it is already
+        queued. Re-recording a done or dead item makes it pending again.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO failures (stage, item_key, payload, reason, "
+                "next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (stage, item_key) DO UPDATE SET "
+                "payload = excluded.payload, reason = excluded.reason, "
+                "status = 'pending', updated_at = excluded.updated_at",
+                (
+                    stage,
+                    str(item_key),
+                    json.dumps(payload, default=str),
+                    str(reason),
+                    now,
+                    now,
+                    now,
+                ),
+            )
+
+    def due(self, stage=None, limit=500, now=None):
+        now = time.time() if now is None else now
+        query = "SELECT * FROM failures WHERE status = ? AND next_attempt_at <= ?"
+        params = [PENDING, now]
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        query += " ORDER BY next_attempt_at LIMIT ?"
+        params.append(limit)
+        return [
+            {**dict(row), "payload": json.loads(row["payload"])}
+            for row in self.conn.execute(query, params)
+        ]
+
+    def mark_done(self, item_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE failures SET status = ?, updated_at = ? WHERE id = ?",
+                (DONE, time.time(), item_id),
+            )
+
+    def mark_failed(self, item_id, reason):
+        """Schedule the next attempt with exponential backoff, or give up."""
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT attempts FROM failures WHERE id = ?", (item_id,)
+        ).fetchone()
+        attempts = (row["attempts"] if row else 0) + 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        status = DEAD if attempts >= self.max_attempts else PENDING
+        with self.conn:
+            self.conn.execute(
+                "UPDATE failures SET attempts = ?, reason = ?, status = ?, "
+                "next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (attempts, str(reason), status, now + delay, now, item_id),
+            )
+
+    def postpone(self, item_id, delay, reason=None):
+        """Check again after delay seconds without counting an attempt."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE failures SET next_attempt_at = ?, "
+                "reason = COALESCE(?, reason), updated_at = ? WHERE id = ?",
+                (now + delay, reason, now, item_id),
+            )
+
+    def counts(self):
+        return {
+            (row["stage"], row["status"]): row["n"]
+            for row in self.conn.execute(
+                "SELECT stage, status, COUNT(*) AS n FROM failures "
+                "GROUP BY stage, status"
+            )
+        }
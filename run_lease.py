@@ -0,0 +1,304 @@
+"""
+Single-flight leases for ProcessRoles windows. A trigger claims the part of
+its window that no other run has covered; if another run is in flight and
+only its "since that run started" remainder is left, the trigger attaches
+to that run and returns its result instead of starting a second run.
+
+A running lease is renewed while its run executes, from a thread of its
+own so a run that blocks the event loop (synchronous downloads, PDF
+parsing) can't starve the renewals. It only lapses once the run's process
+has stopped (crashed, or killed at host.json's functionTimeout).
+
+A run covers [created_after, min(created_before, started_at)): applications
+created after it started were not there to be seen, so later triggers still
+pick them up.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import azure.functions as func
+
+import storage
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _env_number(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def lease_settings():
+    return {
+        # How long a lease outlives its last renewal, so a crashed run's
+        # lease lapses; renewed every ttl / 3 while the run executes
+        "ttl": _env_number("RUN_LEASE_TTL_SECONDS", 300),
+        # How long an attached trigger waits for the in-flight run's result
+        "attach_wait": _env_number("RUN_ATTACH_WAIT_SECONDS", 200),
+        "poll": _env_number("RUN_ATTACH_POLL_SECONDS", 2),
+        # Leases older than this are dropped; triggers only look back a day
+        "retention": _env_number("RUN_LEASE_RETENTION_SECONDS", 7 * 86400),
+    }
+
+
+def to_epoch(value):
+    parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def to_timestamp(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime(
+        TIMESTAMP_FORMAT
+    )
+
+
+def subtract(window, covered):
+    """Parts of the (start, end) window not inside any covered range."""
+    remaining = [window]
+    for cover_start, cover_end in sorted(covered):
+        next_remaining = []
+        for start, end in remaining:
+            if cover_end <= start or cover_start >= end:
+                next_remaining.append((start, end))
+                continue
+            if start < cover_start:
+                next_remaining.append((start, cover_start))
+            if cover_end < end:
+                next_remaining.append((cover_end, end))
+        remaining = next_remaining
+    return remaining
+
+
+class LeaseBackend:
+    """
+    Where leases live. claim() must be atomic across every process that
+    can trigger a run; it returns (claimed_leases, attached_run_ids), where
+    each claimed lease is (lease_id, start, end) in epoch seconds.
+    """
+
+    def claim(self, start, end, ttl, now=None):
+        raise NotImplementedError
+
+    def prune(self, older_than):
+        """Forget leases started before the older_than epoch time."""
+
+    def renew(self, lease_id, expires_at):
+        """Push a running lease's expiry out to the expires_at epoch time."""
+        raise NotImplementedError
+
+    def finish(self, lease_id, status, status_code=None, message=None):
+        raise NotImplementedError
+
+    def results(self, lease_ids):
+        """{lease_id: (status, status_code, message)}"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def run_lease_path():
+    return os.getenv("RUN_LEASE_DB_PATH") or storage.state_db_path(
+        "recruitment_run_leases.db"
+    )
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    def __init__(self, db_path=None):
+        # single_flight uses the connection from worker threads, one at a time
+        self.conn = sqlite3.connect(
+            db_path or run_lease_path(),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "id TEXT PRIMARY KEY, window_start REAL NOT NULL, "
+            "window_end REAL NOT NULL, started_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL, status TEXT NOT NULL, "
+            "status_code INTEGER, message TEXT)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def claim(self, start, end, ttl, now=None):
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            overlapping = self.conn.execute(
+                "SELECT id, window_start, window_end, started_at, status "
+                "FROM leases WHERE window_start < ? AND window_end > ? "
+                "AND (status = ? OR (status = ? AND expires_at > ?))",
+                (end, start, DONE, RUNNING, now),
+            ).fetchall()
+            covered = [
+                (lease_start, min(lease_end, started_at))
+                for _, lease_start, lease_end, started_at, _ in overlapping
+            ]
+            in_flight = [row for row in overlapping if row[4] == RUNNING]
+            # Anything newer than the latest in-flight run's start is left
+            # for a later trigger rather than started alongside it.
+            attach_from = max((row[3] for row in in_flight), default=None)
+            claimed, attached = [], []
+            for gap_start, gap_end in subtract((start, end), covered):
+                if attach_from is not None and gap_start >= attach_from:
+                    continue
+                lease_id = uuid.uuid4().hex
+                self.conn.execute(
+                    "INSERT INTO leases VALUES (?, ?, ?, ?, ?, ?, NULL, NULL)",
+                    (lease_id, gap_start, gap_end, now, now + ttl, RUNNING),
+                )
+                claimed.append((lease_id, gap_start, gap_end))
+            if not claimed:
+                attached = [row[0] for row in in_flight]
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return claimed, attached
+
+    def prune(self, older_than):
+        self.conn.execute("DELETE FROM leases WHERE started_at < ?", (older_than,))
+
+    def renew(self, lease_id, expires_at):
+        self.conn.execute(
+            "UPDATE leases SET expires_at = ? WHERE id = ? AND status = ?",
+            (expires_at, lease_id, RUNNING),
+        )
+
+    def finish(self, lease_id, status, status_code=None, message=None):
+        self.conn.execute(
+            "UPDATE leases SET status = ?, status_code = ?, message = ? "
+            "WHERE id = ?",
+            (status, status_code, message, lease_id),
+        )
+
+    def results(self, lease_ids):
+        placeholders = ",".join("?" * len(lease_ids))
+        return {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT id, status, status_code, message FROM leases "
+                f"WHERE id IN ({placeholders})",
+                list(lease_ids),
+            )
+        }
+
+
+def open_lease_backend(url=None):
+    """A backend from a RUN_LEASE_URL-style string; only "sqlite://[path]"."""
+    url = url or os.getenv("RUN_LEASE_URL", "sqlite://")
+    scheme, _, path = url.partition("://")
+    if scheme == "sqlite":
+        return SQLiteLeaseBackend(path or None)
+    raise ValueError(f"Unsupported run lease backend: {url}")
+
+
+async def _wait_for(backend, lease_ids, settings):
+    deadline = time.monotonic() + settings["attach_wait"]
+    while True:
+        results = await asyncio.to_thread(backend.results, lease_ids)
+        if all(status != RUNNING for status, _, _ in results.values()):
+            return results
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(settings["poll"])
+
+
+def _renew_until(stop, backend, lease_id, settings):
+    """Renew the lease every ttl / 3 until stop is set."""
+    while not stop.wait(settings["ttl"] / 3):
+        try:
+            backend.renew(lease_id, time.time() + settings["ttl"])
+        except Exception as e:
+            logging.warning(f"Could not renew run lease {lease_id}: {e}")
+
+
+async def _run_with_renewal(run, backend, lease_id, start, end, settings):
+    # The renewal thread is stopped and joined, not abandoned, so it never
+    # uses the backend at the same time as finish()
+    stop = threading.Event()
+    renewal = threading.Thread(
+        target=_renew_until,
+        args=(stop, backend, lease_id, settings),
+        name=f"run-lease-{lease_id}",
+        daemon=True,
+    )
+    renewal.start()
+    try:
+        return await run(to_timestamp(start), to_timestamp(end))
+    finally:
+        stop.set()
+        await asyncio.to_thread(renewal.join)
+
+
+async def single_flight(created_after, created_before, run, backend=None):
+    """
+    Run `run(created_after, created_before)` (an async callable returning
+    an HttpResponse) only over the part of the window nobody has covered,
+    or attach to the in-flight run when nothing is left to claim.
+    """
+    settings = lease_settings()
+    own_backend = backend is None
+    backend = backend or open_lease_backend()
+    try:
+        await asyncio.to_thread(backend.prune, time.time() - settings["retention"])
+        claimed, attached = await asyncio.to_thread(
+            backend.claim,
+            to_epoch(created_after),
+            to_epoch(created_before),
+            settings["ttl"],
+        )
+        if not claimed and attached:
+            results = await _wait_for(backend, attached, settings)
+            if results is None:
+                return func.HttpResponse(
+                    f"Attached to in-flight run {', '.join(attached)}",
+                    status_code=202,
+                )
+            failed = [r for r in results.values() if r[0] != DONE]
+            return func.HttpResponse(
+                f"Attached to run {', '.join(attached)} - "
+                + "; ".join(str(message) for _, _, message in results.values()),
+                status_code=500 if failed else 200,
+            )
+        if not claimed:
+            return func.HttpResponse("Window already processed", status_code=200)
+
+        messages, status_code = [], 200
+        for lease_id, start, end in claimed:
+            try:
+                result = await _run_with_renewal(
+                    run, backend, lease_id, start, end, settings
+                )
+            except Exception as e:
+                await asyncio.to_thread(backend.finish, lease_id, FAILED, 500, str(e))
+                raise
+            message = result.get_body().decode("utf-8", errors="replace")
+            await asyncio.to_thread(
+                backend.finish,
+                lease_id,
+                DONE if result.status_code < 400 else FAILED,
+                result.status_code,
+                message,
+            )
+            messages.append(f"{to_timestamp(start)} -> {to_timestamp(end)}: {message}")
+            status_code = max(status_code, result.status_code)
+        return func.HttpResponse("; ".join(messages), status_code=status_code)
+    finally:
+        if own_backend:
+            backend.close()
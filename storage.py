@@ -0,0 +1,55 @@
+"""
+Default locations for the pipeline's state. On Azure, $HOME/data is on the
+app's file share: it survives restarts and scale-in and every instance sees
+the same files. Locally, and in tests, a temp directory is used. Each
+store's own *_DB_PATH setting still takes precedence.
+
+The SQLite stores rely on SQLite's file locking, which is not reliable
+across machines on an SMB share. They are therefore only put on the share
+when the app runs on a single instance
+(WEBSITE_MAX_DYNAMIC_APPLICATION_SCALE_OUT=1, or STATE_SINGLE_INSTANCE=1 on
+a one-instance dedicated plan): that instance's worker processes all lock
+through the same SMB client, so there is one writer. On a scaled-out app
+state_db_path() refuses instead of letting instances corrupt the stores.
+"""
+
+import os
+import tempfile
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+
+def on_shared_storage():
+    return bool(os.getenv("WEBSITE_INSTANCE_ID") and os.getenv("HOME"))
+
+
+def single_instance():
+    return (
+        os.getenv("WEBSITE_MAX_DYNAMIC_APPLICATION_SCALE_OUT") == "1"
+        or os.getenv("STATE_SINGLE_INSTANCE", "").strip().lower() in TRUTHY
+    )
+
+
+def state_dir():
+    if on_shared_storage():
+        path = os.path.join(os.environ["HOME"], "data", "recruitment")
+        os.makedirs(path, exist_ok=True)
+        return path
+    return tempfile.gettempdir()
+
+
+def state_path(filename):
+    """A plain file (or directory) of state, e.g. profiles."""
+    return os.path.join(state_dir(), filename)
+
+
+def state_db_path(filename):
+    """A SQLite store's default path; see the module docstring."""
+    if on_shared_storage() and not single_instance():
+        raise RuntimeError(
+            f"{filename} would be shared by several instances over SMB, where "
+            "SQLite locking is unreliable; limit the app to one instance "
+            "(WEBSITE_MAX_DYNAMIC_APPLICATION_SCALE_OUT=1) or set the store's "
+            "*_DB_PATH setting"
+        )
+    return state_path(filename)
@@ -0,0 +1,275 @@
+import contextvars
+import datetime
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+_current_run = contextvars.ContextVar("telemetry_run", default=None)
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+_span_listeners = []
+
+
+def trace_dir():
+    """Where run files are written; None (the default) turns the files off."""
+    return os.getenv("TRACE_DIR") or None
+
+
+def trace_max_files():
+    # Oldest run files beyond this many are deleted after each export
+    return int(os.getenv("TRACE_MAX_FILES", 500))
+
+
+class Span:
+    """
+    A timed stage of a run. Counters (items, bytes, tokens, retries,
+    failures, ...) are summed and observations (per-call latencies etc.)
+    keep count/sum/max. Both may be updated from worker threads.
+    """
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.counters = {}
+        self.observations = {}
+        self.status = "ok"
+        self.error = None
+        self.started = time.perf_counter()
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        with self._lock:
+            stats = self.observations.setdefault(
+                name, {"count": 0, "sum": 0.0, "max": None}
+            )
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = value if stats["max"] is None else max(stats["max"], value)
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self.started
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+        return {
+            "span_id": self.id,
+            "name": self.name,
+            "parent_id": self.parent.id if self.parent else None,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "counters": self.counters,
+            "observations": self.observations,
+        }
+
+
+class Run:
+    def __init__(self, name, attributes=None):
+        self.id = uuid.uuid4().hex
+        self.root = Span(name, attributes=attributes)
+        self.spans = [self.root]
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            "run_id": self.id,
+            "name": self.root.name,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+def add_span_listener(listener):
+    """
+    Register listener(event, span), called with "start" and "end" around
+    every span. Used by profiling to take per-stage snapshots.
+    """
+    _span_listeners.append(listener)
+
+
+def remove_span_listener(listener):
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def _notify(event, current):
+    for listener in list(_span_listeners):
+        try:
+            listener(event, current)
+        except Exception as e:
+            logging.error(f"Span listener failed: {e}")
+
+
+class span:
+    """
+    Context manager timing one stage under the current span. Outside of a
+    traced run the span is still timed but not exported anywhere.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.span = Span(self.name, parent=parent, attributes=self.attributes)
+        run = _current_run.get()
+        if run is not None:
+            run.add(self.span)
+        self._token = _current_span.set(self.span)
+        _notify("start", self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.finish(exc)
+        _current_span.reset(self._token)
+        _notify("end", self.span)
+        return False
+
+
+def current_span():
+    return _current_span.get()
+
+
+def count(name, value=1):
+    current = _current_span.get()
+    if current is not None and value:
+        current.count(name, value)
+
+
+def observe(name, value):
+    current = _current_span.get()
+    if current is not None:
+        current.observe(name, value)
+
+
+def traced(name=None):
+    """Decorator wrapping a sync or async function in a span."""
+
+    def decorator(fn):
+        span_name = name or fn.__name__
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_run(name=None, attributes=None):
+    """
+    Decorator for an async pipeline entry point: everything it calls is
+    collected into one run which is exported when it returns. A returned
+    HttpResponse's status code is recorded on the root span.
+
+    Arguments are not recorded, since they can hold candidate data; pass
+    attributes(*args, **kwargs) returning the root span's attributes to
+    record a safe summary of them instead.
+    """
+
+    def decorator(fn):
+        run_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            run = Run(
+                run_name,
+                attributes=dict(attributes(*args, **kwargs)) if attributes else {},
+            )
+            run_token = _current_run.set(run)
+            span_token = _current_span.set(run.root)
+            error = None
+            try:
+                result = await fn(*args, **kwargs)
+                status_code = getattr(result, "status_code", None)
+                if status_code is not None:
+                    run.root.attributes["status_code"] = status_code
+                    if status_code >= 400:
+                        run.root.status = "error"
+                return result
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                run.root.finish(error)
+                _current_span.reset(span_token)
+                _current_run.reset(run_token)
+                export_run(run)
+
+        return wrapper
+
+    return decorator
+
+
+def export_run(run):
+    """
+    Emit one structured log line per span (picked up by the Functions log
+    stream) and, when TRACE_DIR is set, write the whole run there for
+    offline analysis, keeping only the newest TRACE_MAX_FILES files.
+    """
+    payload = run.to_dict()
+    for span_data in payload["spans"]:
+        logging.info(
+            "telemetry %s", json.dumps({"run_id": run.id, **span_data}, default=str)
+        )
+    directory = trace_dir()
+    if directory is None:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run.root.name}-{run.id}.json")
+        with open(path, "w") as file:
+            json.dump(payload, file, indent=2, default=str)
+    except OSError as e:
+        logging.error(f"Failed to write trace file: {e}")
+        return None
+    prune_traces(directory, trace_max_files())
+    return path
+
+
+def prune_traces(directory, max_files):
+    """Delete all but the newest max_files run files in directory."""
+    try:
+        paths = [
+            entry.path
+            for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.endswith(".json")
+        ]
+        if len(paths) <= max_files:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[: len(paths) - max_files]:
+            os.remove(path)
+    except OSError as e:
+        # Another export may have removed the same file first
+        logging.warning(f"Failed to prune trace files: {e}")
@@ -0,0 +1,33 @@
+import base64
+import json
+
+import pytest
+
+
+@pytest.fixture
+def setup_env(monkeypatch, tmp_path):
+    """
+    This fixture sets environment variables that `main.get_secrets()` reads.
+    It runs before each test and reverts after the test finishes.
+    """
+    monkeypatch.setenv("GREENHOUSE_API_KEY", "fake-greenhouse-api-key")
+    monkeypatch.setenv("GREENHOUSE_BASE_URL", "https://fake.greenhouse.io")
+    monkeypatch.setenv("SPREADSHEET_ID", "fake-spreadsheet-id")
+    monkeypatch.setenv("OPEN_AI_KEY", "fake-openai-key")
+    monkeypatch.setenv("USER_ID", "fake-user-id")
+
+    # Minimal valid JSON for a "service_account"
+    fake_service_account = {"type": "service_account"}
+    encoded_creds = base64.b64encode(
+        json.dumps(fake_service_account).encode("utf-8")
+    ).decode("utf-8")
+    monkeypatch.setenv("GOOGLE_SHEETS_CREDENTIALS_BASE64", encoded_creds)
+    monkeypatch.setenv("ROLE_TRENDS_DB_PATH", str(tmp_path / "aggregates.db"))
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path / "traces"))
+    monkeypatch.setenv("RETRY_QUEUE_DB_PATH", str(tmp_path / "retry_queue.db"))
+    monkeypatch.setenv("WRITE_BUFFER_DB_PATH", str(tmp_path / "write_buffer.db"))
+    monkeypatch.setenv("WORK_QUEUE_DB_PATH", str(tmp_path / "work_queue.db"))
+    monkeypatch.setenv("CANONICAL_DB_PATH", str(tmp_path / "canonical.db"))
+    monkeypatch.setenv("RUN_LEASE_DB_PATH", str(tmp_path / "run_leases.db"))
+    monkeypatch.setenv("APPLICATION_LOG_DB_PATH", str(tmp_path / "applications.db"))
+    yield
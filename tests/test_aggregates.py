@@ -0,0 +1,176 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import aggregates
+from benchmarks.fake_services import FakeSheets, sheets_service
+
+RAW_HEADERS = [
+    "Candidate Id",
+    "Role",
+    "Date Quarter",
+    "Education",
+    "Schools",
+    "Country",
+    "State/Province",
+    "City",
+]
+
+
+def _rows():
+    return [
+        {
+            "Candidate Id": 1,
+            "Role": "Engineer",
+            "Date Quarter": "Q1",
+            "Education": "Undergraduate",
+            "Schools": "MIT",
+            "Country": "USA",
+            "State/Province": "Massachusetts",
+            "City": "Boston",
+        },
+        {
+            "Candidate Id": 1,
+            "Role": "Engineer",
+            "Date Quarter": "Q1",
+            "Education": "Masters",
+            "Schools": "",
+            "Country": "USA",
+            "State/Province": "Massachusetts",
+            "City": "Boston",
+        },
+    ]
+
+
+def _counts(conn, dimension, value):
+    return conn.execute(
+        "SELECT row_count, candidate_count FROM aggregates "
+        "WHERE dimension = ? AND value = ?",
+        (dimension, value),
+    ).fetchone()
+
+
+def test_update_aggregates_counts_distinct_candidates(tmp_path):
+    conn = aggregates.open_aggregate_store(str(tmp_path / "agg.db"))
+    aggregates.update_aggregates(conn, _rows())
+
+    assert _counts(conn, "Total", "All") == (2, 1)
+    assert _counts(conn, "Schools", "MIT") == (1, 1)
+    assert _counts(conn, "City", "USA / Massachusetts / Boston") == (2, 1)
+    # Empty padding values from expand_candidate are not aggregated
+    assert _counts(conn, "Schools", "") is None
+
+    aggregates.update_aggregates(conn, [dict(_rows()[0], **{"Candidate Id": 2})])
+    assert _counts(conn, "Total", "All") == (3, 2)
+
+
+def _push(service, conn):
+    return aggregates.push_aggregate_updates(
+        service, "sheet-id", "'Role Trends'", conn, "Raw", RAW_HEADERS
+    )
+
+
+def _write_raw(sheets, rows):
+    raw = sheets.tabs.setdefault("Raw", [RAW_HEADERS])
+    raw.extend([[row.get(header, "") for header in RAW_HEADERS] for row in rows])
+
+
+def test_push_aggregate_updates_writes_only_pending_rows(tmp_path):
+    conn = aggregates.open_aggregate_store(str(tmp_path / "agg.db"))
+    with FakeSheets() as sheets:
+        service = sheets_service(sheets.url)
+        aggregates.update_aggregates(conn, _rows())
+        assert _push(service, conn) == 7
+        assert sheets.tabs["Role Trends"][0] == aggregates.SUMMARY_HEADERS
+
+        aggregates.update_aggregates(
+            conn,
+            [
+                {
+                    "Candidate Id": 2,
+                    "Role": "Engineer",
+                    "Date Quarter": "Q1",
+                    "Schools": "MIT",
+                }
+            ],
+        )
+        summary = list(sheets.tabs["Role Trends"])
+        assert _push(service, conn) == 2
+
+    changed = [
+        (before, after)
+        for before, after in zip(summary, sheets.tabs["Role Trends"])
+        if before != after
+    ]
+    assert [after[2:] for _, after in changed] == [
+        ["Schools", "MIT", 2, 2],
+        ["Total", "All", 3, 2],
+    ]
+    # Rows were updated in place rather than appended
+    assert len(sheets.tabs["Role Trends"]) == len(summary)
+
+
+def test_new_store_rebuilds_from_raw_tab_instead_of_overwriting(tmp_path):
+    first = aggregates.open_aggregate_store(str(tmp_path / "first.db"))
+    second = aggregates.open_aggregate_store(str(tmp_path / "second.db"))
+    with FakeSheets() as sheets:
+        service = sheets_service(sheets.url)
+        _write_raw(sheets, _rows())
+        aggregates.update_aggregates(first, _rows())
+        _push(service, first)
+        summary_rows = len(sheets.tabs["Role Trends"])
+
+        # Another (or a recycled) instance with an empty store
+        new_rows = [dict(_rows()[0], **{"Candidate Id": 2})]
+        _write_raw(sheets, new_rows)
+        aggregates.update_aggregates(second, new_rows)
+        _push(service, second)
+
+        by_key = {tuple(row[:4]): row[4:] for row in sheets.tabs["Role Trends"][1:]}
+        assert by_key[("Engineer", "Q1", "Total", "All")] == [3, 2]
+        assert by_key[("Engineer", "Q1", "Schools", "MIT")] == [2, 2]
+        assert len(sheets.tabs["Role Trends"]) == summary_rows
+
+        # The first store is now behind the sheet and rebuilds too
+        _write_raw(sheets, [dict(_rows()[1], **{"Candidate Id": 3})])
+        aggregates.update_aggregates(first, [dict(_rows()[1], **{"Candidate Id": 3})])
+        _push(service, first)
+        by_key = {tuple(row[:4]): row[4:] for row in sheets.tabs["Role Trends"][1:]}
+        assert by_key[("Engineer", "Q1", "Total", "All")] == [4, 3]
+
+
+def test_concurrent_refreshes_keep_every_summary_row(tmp_path, monkeypatch):
+    monkeypatch.setenv("ROLE_TRENDS_DB_PATH", str(tmp_path / "agg.db"))
+    batches = [
+        [dict(_rows()[0], **{"Candidate Id": i, "Role": f"Role {i}"})] for i in range(6)
+    ]
+    with FakeSheets() as sheets:
+        service = sheets_service(sheets.url)
+        for rows in batches:
+            _write_raw(sheets, rows)
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(
+                pool.map(
+                    lambda rows: aggregates.refresh_role_trends(
+                        service, "sheet-id", "'Role Trends'", rows, "Raw", RAW_HEADERS
+                    ),
+                    batches,
+                )
+            )
+        summary = sheets.tabs["Role Trends"][1:]
+
+    by_key = {tuple(row[:4]): row[4:] for row in summary}
+    # Every group got its own row: none was overwritten by another push
+    assert len(by_key) == len(summary) == 6 * 6
+    assert all(by_key[(f"Role {i}", "Q1", "Total", "All")] == [1, 1] for i in range(6))
+
+
+def test_push_lock_serializes_pushes(tmp_path):
+    db_path = str(tmp_path / "agg.db")
+    with aggregates.push_lock(db_path):
+        with pytest.raises(sqlite3.OperationalError):
+            with aggregates.push_lock(db_path, timeout=0.1):
+                pass
+    with aggregates.push_lock(db_path, timeout=0.1):
+        pass
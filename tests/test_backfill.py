@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+
+from benchmarks.fake_services import FakeGreenhouse, FakeOpenAI
+
+
+def _day(day):
+    return datetime.datetime(2024, 1, day, tzinfo=datetime.timezone.utc)
+
+
+def test_plan_shards_splits_busy_and_merges_quiet_windows(setup_env):
+    import backfill
+
+    counts = {1: 100, 2: 100, 3: 500, 4: 0, 5: 50}
+
+    def estimate(after, before):
+        return counts[after.day]
+
+    shards = backfill.plan_shards(
+        _day(1), _day(6), 200, probe_days=1, estimate=estimate
+    )
+
+    assert [(a.day, b.day, n) for a, b, n in shards[:1]] == [(1, 3, 200)]
+    # Day 3 is split into three equal windows
+    assert [n for _, _, n in shards[1:4]] == [167, 167, 167]
+    assert shards[3][1] == _day(4)
+    assert [(a.day, b.day, n) for a, b, n in shards[4:]] == [(4, 6, 50)]
+
+
+def test_rate_limiter_spaces_calls():
+    import rate_limits
+
+    limiter = rate_limits.RateLimiter(rate=2, per=0.2)
+    waited = sum(limiter.acquire() for _ in range(4))
+    assert waited == pytest.approx(0.2, abs=0.05)
+
+
+def test_backfill_processes_shards_in_parallel(setup_env, monkeypatch):
+    import backfill
+
+    with FakeGreenhouse(applications=120) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(backfill.main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        rows = []
+        # Synthetic applications arrive every 17 minutes from 2024-01-01
+        result = backfill.run_backfill(
+            "2024-01-01",
+            "2024-01-03",
+            workers=2,
+            target_size=50,
+            probe_days=1,
+            write_rows=rows.extend,
+        )
+
+    assert result["failed"] == []
+    assert result["shards"] == len(result["completed"]) == 3
+    candidate_ids = {row["Candidate Id"] for row in rows}
+    assert len(candidate_ids) == 120
+
+
+def test_failed_shard_writes_are_not_marked_written(setup_env, monkeypatch):
+    import backfill
+
+    def failing_write(rows):
+        raise RuntimeError("sheets unavailable")
+
+    with FakeGreenhouse(applications=40) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(backfill.main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        window = dict(workers=1, target_size=50, probe_days=1)
+        first = backfill.run_backfill(
+            "2024-01-01", "2024-01-02", write_rows=failing_write, **window
+        )
+        # The rerun backfill suggests writes what the failed shard lost
+        rows = []
+        second = backfill.run_backfill(
+            "2024-01-01", "2024-01-02", write_rows=rows.extend, **window
+        )
+
+    assert first["completed"] == [] and len(first["failed"]) == 1
+    assert second["failed"] == []
+    assert len({row["Candidate Id"] for row in rows}) == 40
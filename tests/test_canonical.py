@@ -0,0 +1,158 @@
+import canonical
+
+
+def test_seeded_aliases_and_fuzzy_matches(tmp_path):
+    index = canonical.CanonicalIndex(str(tmp_path / "canonical.db"))
+
+    assert index.canonicalize("state", "MA") == "Massachusetts"
+    assert index.canonicalize("country", "United States of America") == "USA"
+    assert (
+        index.canonicalize("school", "MIT") == "Massachusetts Institute of Technology"
+    )
+    assert (
+        index.canonicalize("school", "Massachusets Institute of Technology")
+        == "Massachusetts Institute of Technology"
+    )
+    # Unknown names are kept as given; only an identical key reuses them
+    assert index.canonicalize("company", "Acme Corp.") == "Acme Corp."
+    assert index.canonicalize("company", "ACME Corporation") == "Acme Corp."
+    assert (
+        index.canonicalize("company", "Globex International Holdings")
+        == "Globex International Holdings"
+    )
+    assert (
+        index.canonicalize("company", "Globex Internatonal Holdings")
+        == "Globex Internatonal Holdings"
+    )
+    # Similar but different names stay apart
+    assert index.canonicalize("school", "Boston College") == "Boston College"
+    assert index.canonicalize("school", "Boston University") == "Boston University"
+    assert index.canonicalize("school", "Northeastern University") == (
+        "Northeastern University"
+    )
+    assert index.canonicalize("school", "Northwestern University") == (
+        "Northwestern University"
+    )
+
+    # Reviewed names become targets; fuzzy matches are recorded, not indexed
+    index.review(
+        "company", "Globex International Holdings", "Globex International Holdings"
+    )
+    assert (
+        index.canonicalize("company", "Globex Internationl Holdings")
+        == "Globex International Holdings"
+    )
+    assert "globex internationl holdings" not in index.aliases["company"]
+    index.close()
+
+    reopened = canonical.CanonicalIndex(str(tmp_path / "canonical.db"))
+    assert (
+        reopened.aliases["company"]["globex international holdings"]
+        == "Globex International Holdings"
+    )
+    assert reopened.unreviewed["company"]["acme"] == "Acme Corp."
+    assert reopened.conn.execute(
+        "SELECT canonical, source FROM aliases WHERE alias_key = ?",
+        ("globex internationl holdings",),
+    ).fetchone() == ("Globex International Holdings", "fuzzy")
+    reopened.close()
+
+
+def test_fuzzy_matches_keep_word_order(tmp_path):
+    index = canonical.CanonicalIndex(str(tmp_path / "canonical.db"))
+    index.review("school", "Washington University", "Washington University")
+    index.review("school", "University of Virginia", "University of Virginia")
+
+    assert (
+        index.canonicalize("school", "University of Washington")
+        == "University of Washington"
+    )
+    assert (
+        index.canonicalize("school", "University of West Virginia")
+        == "University of West Virginia"
+    )
+    assert (
+        index.canonicalize("school", "University of Virgina")
+        == "University of Virginia"
+    )
+    # Unreviewed names don't absorb others
+    assert (
+        index.canonicalize("school", "University of Washingtn")
+        == "University of Washingtn"
+    )
+    index.close()
+
+
+def test_canonicalize_candidates_keeps_list_alignment(tmp_path):
+    index = canonical.CanonicalIndex(str(tmp_path / "canonical.db"))
+    candidates = [
+        {
+            "Schools": ["MIT", "Massachusetts Institute of Technology"],
+            "Degree": ["BS", "MS"],
+            "City": "NYC",
+            "State/Province": "NY",
+            "Country": "US",
+            "Previous Companies": [],
+            "Role": "Engineer",
+        }
+    ]
+
+    [candidate] = canonical.canonicalize_candidates(candidates, index)
+
+    assert candidate["Schools"] == ["Massachusetts Institute of Technology"] * 2
+    assert (candidate["City"], candidate["State/Province"], candidate["Country"]) == (
+        "New York",
+        "New York",
+        "USA",
+    )
+    assert candidate["Role"] == "Engineer"
+    index.close()
+
+
+def test_instances_share_spellings_and_reviews(tmp_path):
+    path = str(tmp_path / "canonical.db")
+    first = canonical.CanonicalIndex(path)
+    second = canonical.CanonicalIndex(path)
+
+    assert first.canonicalize("company", "Initech LLC") == "Initech LLC"
+    # Recorded by the other instance after this one was loaded
+    assert second.canonicalize("company", "INITECH") == "Initech LLC"
+    first.review("company", "Initech LLC", "Initech")
+    assert second.canonicalize("company", "Initech, LLC") == "Initech"
+    first.close()
+    second.close()
+
+
+def test_review_cli_lists_accepts_and_exports(setup_env, tmp_path, capsys):
+    seed_path = tmp_path / "aliases.json"
+    seed_path.write_text(open(canonical.SEED_PATH, encoding="utf-8").read())
+    index = canonical.CanonicalIndex()
+    index.canonicalize("school", "Mass Inst of Tech")
+    index.close()
+
+    canonical.main_cli(["--pending", "--kind", "school"])
+    assert "mass inst of tech -> Mass Inst of Tech" in capsys.readouterr().out
+    canonical.main_cli(
+        [
+            "--kind",
+            "school",
+            "--name",
+            "mass inst of tech",
+            "--canonical",
+            "Massachusetts Institute of Technology",
+        ]
+    )
+    capsys.readouterr()
+    canonical.main_cli(["--pending", "--kind", "school"])
+    assert "mass inst of tech" not in capsys.readouterr().out
+
+    index = canonical.CanonicalIndex()
+    assert index.pending("school") == []
+    assert index.export_reviewed(str(seed_path)) == 1
+    index.close()
+    fresh = canonical.CanonicalIndex(str(tmp_path / "fresh.db"), str(seed_path))
+    assert (
+        fresh.canonicalize("school", "Mass. Inst. of Tech.")
+        == "Massachusetts Institute of Technology"
+    )
+    fresh.close()
@@ -0,0 +1,20 @@
+import pytest
+
+import doc_text
+from benchmarks import synthetic
+
+
+def test_extracts_8bit_and_utf16_pieces():
+    text = synthetic.make_resume_text(seed=3, positions=8) + "\nCafé – naïve"
+    # make_doc stores the first half as cp1252 and the second as UTF-16
+    assert doc_text.extract_doc_text(synthetic.make_doc(text)).strip() == text
+
+
+def test_clean_hides_field_codes_and_maps_controls():
+    raw = 'Site: \x13 HYPERLINK "https://x.io" \x14x.io\x15\rA\x07B\x07\x07\x0bEnd\x01'
+    assert doc_text._clean(raw) == "Site: x.io\nA\tB\t\t\nEnd"
+
+
+def test_rejects_files_that_are_not_word_documents():
+    with pytest.raises((OSError, ValueError)):
+        doc_text.extract_doc_text(b"plain text, not an OLE file")
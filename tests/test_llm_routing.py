@@ -0,0 +1,202 @@
+import asyncio
+import json
+
+import openai
+
+import llm_routing
+from benchmarks.fake_services import FakeOpenAI
+
+
+def test_small_runs_stay_realtime(monkeypatch):
+    monkeypatch.setenv("REALTIME_MAX_CANDIDATES", "10")
+    plan = llm_routing.plan_extraction([1000] * 10, deadline_seconds=60)
+    assert (plan["mode"], plan["realtime"], plan["batch"]) == ("realtime", 10, 0)
+
+
+def test_large_runs_without_deadline_go_to_batch(monkeypatch):
+    monkeypatch.setenv("REALTIME_MAX_CANDIDATES", "10")
+    plan = llm_routing.plan_extraction([1000] * 50, deadline_seconds=None)
+    assert (plan["mode"], plan["realtime"], plan["batch"]) == ("batch", 0, 50)
+
+
+def test_limited_headroom_splits_the_run(monkeypatch):
+    monkeypatch.setenv("REALTIME_MAX_CANDIDATES", "10")
+    monkeypatch.setenv("OPENAI_TPM_LIMIT", "20000")
+    # One minute of deadline: only the current headroom is usable
+    plan = llm_routing.plan_extraction(
+        [1000] * 50, deadline_seconds=60, headroom={"remaining_tokens": 30000}
+    )
+    assert (plan["mode"], plan["realtime"], plan["batch"]) == ("split", 30, 20)
+
+
+def test_rate_limit_headers_update_headroom():
+    llm_routing.record_rate_limit_headers(
+        {"x-ratelimit-remaining-requests": "42", "x-ratelimit-remaining-tokens": "9000"}
+    )
+    headroom = llm_routing.current_headroom()
+    assert headroom["remaining_requests"] == 42
+    assert headroom["remaining_tokens"] == 9000
+
+
+def _force_plan(monkeypatch, realtime):
+    monkeypatch.setattr(
+        llm_routing,
+        "plan_extraction",
+        lambda estimates, deadline: {
+            "mode": "split",
+            "candidates": len(estimates),
+            "realtime": realtime,
+            "batch": len(estimates) - realtime,
+            "estimated_tokens": sum(estimates),
+            "reason": "test",
+        },
+    )
+
+
+def test_extract_with_chatgpt_split_returns_every_candidate(setup_env, monkeypatch):
+    import main
+
+    monkeypatch.setenv("REALTIME_MAX_CANDIDATES", "2")
+    monkeypatch.setattr(main, "BATCH_POLL_SECONDS", 0.05)
+    _force_plan(monkeypatch, 2)
+    candidates = [{"candidate_id": i, "resume_content": "..."} for i in range(5)]
+    with FakeOpenAI() as llm:
+        client = openai.OpenAI(api_key="test", base_url=f"{llm.url}/v1")
+        results = asyncio.run(main.extract_with_chatgpt(client, candidates, 30))
+        summary = llm.summary()
+        batch_models = {
+            json.loads(line)["body"]["model"]
+            for batch in llm.batches.values()
+            for line in llm.files[batch["input_file_id"]].splitlines()
+            if line.strip()
+        }
+
+    assert len(results) == 5
+    validated, failed = main.validation_gpt_response(results)
+    assert sorted(v["Candidate Id"] for v in validated) == [0, 1, 2, 3, 4]
+    assert summary["POST /v1/chat/completions"]["requests"] == 2
+    assert summary["POST /v1/batches"]["requests"] == 1
+    # Both legs use the same model
+    assert batch_models == {main.EXTRACTION_MODEL}
+
+
+def test_batch_pending_at_deadline_is_collected_later(setup_env, monkeypatch):
+    import main
+    import retry
+    from retry_queue import BATCH, DONE, RetryQueue
+
+    monkeypatch.setattr(main, "BATCH_POLL_SECONDS", 0.05)
+    _force_plan(monkeypatch, 0)
+    candidates = [{"id": i, "candidate_id": i, "resume_content": "."} for i in (7, 8)]
+    with FakeOpenAI(batch_delay=3600) as llm:
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        client = openai.OpenAI(api_key="test")
+        results = asyncio.run(main.extract_with_chatgpt(client, candidates, 0.1))
+        assert all(isinstance(result, main.BatchPending) for result in results)
+
+        queue = RetryQueue()
+        [item] = queue.due()
+        assert item["stage"] == BATCH
+        assert item["item_key"] == results[0].batch_id
+        rows = []
+        summary = asyncio.run(retry.retry_failures(write_rows=rows.extend))
+        assert (summary["pending"], rows) == (1, [])
+        assert queue.due() == []
+
+        llm.batch_delay = 0
+        summary = asyncio.run(
+            retry.retry_failures(write_rows=rows.extend, queue=_due_now(queue))
+        )
+
+    assert summary["succeeded"] == 1
+    assert {row["Candidate Id"] for row in rows} == {7, 8}
+    assert queue.counts() == {(BATCH, DONE): 1}
+    assert llm.summary()["POST /v1/batches"]["requests"] == 1
+    queue.close()
+
+
+def _due_now(queue):
+    with queue.conn:
+        queue.conn.execute("UPDATE failures SET next_attempt_at = 0")
+    return queue
+
+
+def _extract_into_batch(main, candidates, rows):
+    # The whole run goes to a Batch that is still running at the deadline
+    response = asyncio.run(
+        main.extract_and_write(candidates, rows.extend, extraction_deadline=0.1)
+    )
+    assert response.status_code == 200
+
+
+def test_failed_batch_releases_its_claims(setup_env, monkeypatch):
+    import main
+    import retry
+    from retry_queue import BATCH, DONE, LLM, RetryQueue
+
+    monkeypatch.setattr(main, "BATCH_POLL_SECONDS", 0.05)
+    _force_plan(monkeypatch, 0)
+    candidates = [{"id": i, "candidate_id": i, "resume_content": "."} for i in (7, 8)]
+    rows = []
+    with FakeOpenAI(batch_delay=3600) as llm:
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        _extract_into_batch(main, candidates, rows)
+        for batch in llm.batches.values():
+            batch["status"] = "failed"
+
+        queue = RetryQueue()
+        asyncio.run(retry.retry_failures(write_rows=rows.extend, queue=queue))
+        assert {item["stage"] for item in queue.due(now=float("inf"))} == {LLM}
+
+        # The candidates are retried on their own instead of being skipped
+        # as claimed by the failed batch
+        _force_plan(monkeypatch, 2)
+        summary = asyncio.run(
+            retry.retry_failures(write_rows=rows.extend, queue=_due_now(queue))
+        )
+
+    assert (summary["succeeded"], summary["skipped"]) == (2, 0)
+    assert {row["Candidate Id"] for row in rows} == {7, 8}
+    assert queue.counts() == {(BATCH, DONE): 1, (LLM, DONE): 2}
+    queue.close()
+
+
+def test_batch_output_skips_applications_written_meanwhile(setup_env, monkeypatch):
+    import application_log
+    import main
+    import retry
+    from retry_queue import RetryQueue
+
+    monkeypatch.setattr(main, "BATCH_POLL_SECONDS", 0.05)
+    _force_plan(monkeypatch, 0)
+    candidates = [{"id": i, "candidate_id": i, "resume_content": "."} for i in (7, 8)]
+    rows = []
+    with FakeOpenAI(batch_delay=3600) as llm:
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        _extract_into_batch(main, candidates, rows)
+
+        # The batch's claims keep another run (e.g. a webhook) off them...
+        _force_plan(monkeypatch, 1)
+
+        def webhook():
+            return asyncio.run(
+                main.extract_and_write([dict(candidates[0])], rows.extend)
+            )
+
+        assert webhook().get_body() == b"Nothing new to process"
+
+        # ...until they lapse; then that run writes the candidate itself
+        log = application_log.ApplicationLog()
+        log.conn.execute("UPDATE applications SET expires_at = 0")
+        log.close()
+        assert webhook().status_code == 200
+        webhook_rows = len(rows)
+        assert {row["Candidate Id"] for row in rows} == {7}
+
+        llm.batch_delay = 0
+        queue = RetryQueue()
+        asyncio.run(retry.retry_failures(write_rows=rows.extend, queue=_due_now(queue)))
+        queue.close()
+
+    # The batch output only adds candidate 8; 7 isn't written twice
+    assert {row["Candidate Id"] for row in rows[webhook_rows:]} == {8}
@@ -0,0 +1,11 @@
+from benchmarks import load_test
+
+
+def test_process_runs_against_fake_services(setup_env):
+    report = load_test.run_load_test(applications=30)
+
+    assert report["status_code"] == 200
+    # Every synthetic candidate expands to several rows (one per school etc.)
+    assert report["rows_written"] >= 30
+    assert report["openai"]["POST /v1/chat/completions"]["requests"] == 30
+    assert report["greenhouse"]["GET /resumes/{id}"]["statuses"] == {200: 30}
@@ -1,30 +1,7 @@
 import pytest
-import json
-import base64
 from unittest.mock import AsyncMock, patch
 
 
-@pytest.fixture
-def setup_env(monkeypatch):
-    """
-    This fixture sets environment variables that `main.get_secrets()` reads.
-    It runs before each test and reverts after the test finishes.
-    """
-    monkeypatch.setenv("GREENHOUSE_API_KEY", "fake-greenhouse-api-key")
-    monkeypatch.setenv("GREENHOUSE_BASE_URL", "https://fake.greenhouse.io")
-    monkeypatch.setenv("SPREADSHEET_ID", "fake-spreadsheet-id")
-    monkeypatch.setenv("OPEN_AI_KEY", "fake-openai-key")
-    monkeypatch.setenv("USER_ID", "fake-user-id")
-
-    # Minimal valid JSON for a "service_account"
-    fake_service_account = {"type": "service_account"}
-    encoded_creds = base64.b64encode(
-        json.dumps(fake_service_account).encode("utf-8")
-    ).decode("utf-8")
-    monkeypatch.setenv("GOOGLE_SHEETS_CREDENTIALS_BASE64", encoded_creds)
-    yield
-
-
 @pytest.mark.asyncio
 async def test_process_success(setup_env):
     """
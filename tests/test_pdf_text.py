@@ -0,0 +1,50 @@
+import pytest
+
+import pdf_text
+from benchmarks import synthetic
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    pdf_text.reset_stats()
+    yield
+    pdf_text.reset_stats()
+
+
+def test_stops_at_page_and_character_budget():
+    text = synthetic.make_resume_text(seed=1, positions=12)
+    pdf = synthetic.make_pdf(text, lines_per_page=10)
+    lines = text.split("\n")
+
+    first_pages = pdf_text.extract_pdf_text(pdf, {"pages": 2, "chars": 100000})
+    assert lines[19].strip() in first_pages
+    assert lines[20].strip() not in first_pages
+
+    assert len(pdf_text.extract_pdf_text(pdf, {"pages": 50, "chars": 300})) <= 300
+
+
+def test_low_quality_output_falls_back(monkeypatch):
+    pdf = synthetic.make_pdf(synthetic.make_resume_text(seed=2))
+    monkeypatch.setitem(pdf_text.EXTRACTORS, "pypdf", lambda *a: ("(cid:3)" * 50, 1))
+
+    text = pdf_text.extract_pdf_text(pdf)
+
+    assert "EXPERIENCE" in text
+    stats = pdf_text.extractor_stats()
+    profile = pdf_text.document_profile(pdf)
+    assert stats[(profile, "pypdf")]["successes"] == 0
+    assert stats[(profile, "pdfplumber")]["successes"] == 1
+
+
+def test_prefers_the_faster_extractor_per_profile():
+    fast, slow = ("1-2", "light"), ("11+", "heavy")
+    for _ in range(pdf_text.MIN_SAMPLES):
+        pdf_text.record(fast, "pypdf", 0.5, True)
+        pdf_text.record(fast, "pdfplumber", 0.1, True)
+        pdf_text.record(slow, "pypdf", 0.5, True)
+        # Faster, but worse results than the default
+        pdf_text.record(slow, "pdfplumber", 0.1, False)
+
+    assert pdf_text.extractor_order(fast) == ["pdfplumber", "pypdf"]
+    assert pdf_text.extractor_order(slow) == ["pypdf", "pdfplumber"]
+    assert pdf_text.extractor_order(("3-10", "light")) == ["pypdf", "pdfplumber"]
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import json
+import time
+import zipfile
+
+import profiling
+import telemetry
+
+
+def _blocking_stage():
+    time.sleep(0.3)
+    return [bytearray(1024) for _ in range(200)]
+
+
+@telemetry.traced_run("pipeline")
+async def _pipeline():
+    with telemetry.span("download"):
+        data = _blocking_stage()
+    await asyncio.sleep(0.05)
+    return data
+
+
+def test_profiler_records_stalls_memory_and_cpu(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path / "traces"))
+
+    async def run():
+        async with profiling.ProcessProfiler(sample_interval=0.005) as profiler:
+            await _pipeline()
+        return profiler
+
+    profiler = asyncio.run(run())
+
+    with open(tmp_path / profiler.profile_id / "loop_stalls.json") as file:
+        stalls = json.load(file)
+    assert stalls and stalls[0]["stage"] == "download"
+    assert any("_blocking_stage" in frame for frame in stalls[0]["stack"])
+
+    with open(tmp_path / profiler.profile_id / "memory_by_stage.json") as file:
+        stages = json.load(file)
+    assert [stage["stage"] for stage in stages] == ["download"]
+    assert stages[0]["top_allocations"]
+
+    with open(tmp_path / profiler.profile_id / "cpu.collapsed") as file:
+        assert "_blocking_stage" in file.read()
+
+    archive = zipfile.ZipFile(
+        io.BytesIO(profiling.profile_archive(profiler.profile_id))
+    )
+    assert f"{profiler.profile_id}/summary.json" in archive.namelist()
+    assert profiling.profile_archive("../etc") is None
+
+
+def test_profiling_requested(monkeypatch):
+    class Request:
+        def __init__(self, params, headers=None):
+            self.params = params
+            self.headers = headers or {}
+
+    monkeypatch.delenv("PROFILE_PROCESS", raising=False)
+    monkeypatch.setenv("PROFILE_KEY", "secret")
+    assert profiling.profiling_requested(
+        Request({"profile": "1"}, {"x-profile-key": "secret"})
+    )
+    # Anonymous callers can't turn profiling on
+    assert not profiling.profiling_requested(Request({"profile": "1"}))
+    assert not profiling.profiling_requested(
+        Request({"profile": "1"}, {"x-profile-key": "guess"})
+    )
+    assert not profiling.profiling_requested(Request({}))
+    monkeypatch.setenv("PROFILE_PROCESS", "true")
+    assert profiling.profiling_requested(Request({}))
+
+
+def test_old_profiles_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    for profile_id in ["20240101T000000-a", "20240102T000000-b", "20240103T000000-c"]:
+        (tmp_path / profile_id).mkdir()
+
+    profiling.prune_profiles(2)
+
+    assert profiling.list_profiles() == ["20240103T000000-c", "20240102T000000-b"]
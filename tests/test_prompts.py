@@ -0,0 +1,47 @@
+import asyncio
+
+import openai
+
+import prompts
+import telemetry
+from benchmarks.fake_services import FakeOpenAI
+
+
+def test_prompt_is_loaded_once_with_a_stable_prefix():
+    prompts.reload_prompts()
+    prompt = prompts.get_prompt()
+    assert prompts.get_prompt() is prompt
+    assert len(prompt.version) == 12
+
+    first = prompt.messages({"candidate_id": 1})
+    second = prompt.messages({"candidate_id": 2})
+    assert first[0] is second[0]
+    assert first[0]["role"] == "system"
+    assert first[1]["content"] == "Candidate Data: {'candidate_id': 1}"
+
+
+def test_cached_tokens_reads_sdk_objects_and_dicts():
+    assert (
+        prompts.cached_tokens({"prompt_tokens_details": {"cached_tokens": 1024}})
+        == 1024
+    )
+    assert prompts.cached_tokens({"prompt_tokens": 10}) == 0
+    assert prompts.cached_tokens(None) == 0
+
+
+def test_parse_with_chatgpt_reports_cached_tokens(setup_env):
+    import main
+
+    async def run(client):
+        with telemetry.span("llm") as span:
+            for candidate_id in (1, 2):
+                await main.parse_with_chatgpt(client, {"candidate_id": candidate_id})
+        return span
+
+    with FakeOpenAI() as llm:
+        client = openai.OpenAI(api_key="test", base_url=f"{llm.url}/v1")
+        span = asyncio.run(run(client))
+
+    assert span.counters["calls"] == 2
+    # The second call reuses the byte-identical system prefix
+    assert span.counters["cached_tokens"] >= 1024
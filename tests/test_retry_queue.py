@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from benchmarks.fake_services import FakeGreenhouse, FakeOpenAI
+from retry_queue import DEAD, DONE, DOWNLOAD, LLM, RetryQueue, retry_queue_path
+
+
+def test_retry_queue_backs_off_and_gives_up(tmp_path):
+    queue = RetryQueue(str(tmp_path / "queue.db"), base_delay=10, max_attempts=2)
+    queue.record(LLM, 1, {"id": 1}, "no parsable LLM response")
+    # Recording the same item again refreshes it instead of duplicating it
+    queue.record(LLM, 1, {"id": 1, "name": "x"}, "still unparsable")
+
+    [item] = queue.due()
+    assert item["payload"] == {"id": 1, "name": "x"}
+    assert item["reason"] == "still unparsable"
+
+    queue.mark_failed(item["id"], "again")
+    assert queue.due() == []
+    assert len(queue.due(now=time.time() + 10)) == 1
+
+    queue.mark_failed(item["id"], "and again")
+    assert queue.due(now=time.time() + 3600) == []
+    assert queue.counts() == {(LLM, DEAD): 1}
+    queue.close()
+
+
+def test_failed_download_is_retried_on_its_own(setup_env, monkeypatch):
+    import main
+    import retry
+
+    with FakeGreenhouse(applications=5) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        greenhouse.missing_resumes.add(2)
+        rows = []
+        response = asyncio.run(
+            main.process(
+                "2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z", write_rows=rows.extend
+            )
+        )
+
+        assert response.status_code == 200
+        assert len({row["Candidate Id"] for row in rows}) == 4
+        queue = RetryQueue()
+        [item] = queue.due()
+        assert (item["stage"], item["item_key"]) == (DOWNLOAD, "500002")
+        assert item["reason"].startswith("download: 404")
+
+        greenhouse.missing_resumes.clear()
+        retried = []
+        summary = asyncio.run(retry.retry_failures(write_rows=retried.extend))
+
+    assert summary["succeeded"] == 1
+    assert len({row["Candidate Id"] for row in retried}) == 1
+    assert queue.counts() == {(DOWNLOAD, DONE): 1}
+    queue.close()
+
+
+def test_default_path_is_on_the_shared_app_storage(monkeypatch, tmp_path):
+    monkeypatch.delenv("RETRY_QUEUE_DB_PATH", raising=False)
+    monkeypatch.setenv("WEBSITE_INSTANCE_ID", "instance-1")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("STATE_SINGLE_INSTANCE", raising=False)
+
+    # SQLite on the SMB share needs a single writer: refuse when scaled out
+    monkeypatch.delenv("WEBSITE_MAX_DYNAMIC_APPLICATION_SCALE_OUT", raising=False)
+    with pytest.raises(RuntimeError):
+        retry_queue_path()
+
+    monkeypatch.setenv("WEBSITE_MAX_DYNAMIC_APPLICATION_SCALE_OUT", "1")
+    path = retry_queue_path()
+    assert path == os.path.join(
+        str(tmp_path), "data", "recruitment", os.path.basename(path)
+    )
+    assert os.path.isdir(os.path.dirname(path))
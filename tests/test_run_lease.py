@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import azure.functions as func
+
+import run_lease
+
+DAY = 86400.0
+
+
+def test_claims_only_the_uncovered_part_of_a_window(tmp_path):
+    backend = run_lease.SQLiteLeaseBackend(str(tmp_path / "leases.db"))
+    now = 10 * DAY
+
+    [(first, start, end)], _ = backend.claim(now - DAY, now + DAY, 900, now=now)
+    assert (start, end) == (now - DAY, now + DAY)
+
+    # A second trigger while the first runs has nothing older to claim
+    claimed, attached = backend.claim(now - DAY, now + DAY, 900, now=now + 5)
+    assert (claimed, attached) == ([], [first])
+
+    # A wider window only claims the part before the in-flight run
+    [(_, start, end)], _ = backend.claim(now - 3 * DAY, now + DAY, 900, now=now + 5)
+    assert (start, end) == (now - 3 * DAY, now - DAY)
+
+    # Once done, the next day's run covers only what came in since it started
+    backend.finish(first, run_lease.DONE, 200, "ok")
+    [(_, start, end)], _ = backend.claim(now, now + 2 * DAY, 900, now=now + DAY)
+    assert (start, end) == (now, now + 2 * DAY)
+    backend.close()
+
+
+def test_expired_leases_no_longer_cover(tmp_path):
+    backend = run_lease.SQLiteLeaseBackend(str(tmp_path / "leases.db"))
+    backend.claim(0, DAY, ttl=60, now=DAY)
+    [(_, start, end)], _ = backend.claim(0, DAY, ttl=60, now=DAY + 61)
+    assert (start, end) == (0, DAY)
+    backend.close()
+
+
+def test_concurrent_triggers_share_one_run(setup_env, monkeypatch):
+    monkeypatch.setenv("RUN_ATTACH_POLL_SECONDS", "0.01")
+    calls = []
+
+    async def run(after, before):
+        calls.append((after, before))
+        await asyncio.sleep(0.2)
+        return func.HttpResponse("Processed to sheet successfully", status_code=200)
+
+    async def trigger_twice():
+        window = ("2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z")
+        first = asyncio.create_task(run_lease.single_flight(*window, run))
+        await asyncio.sleep(0.05)
+        second = await run_lease.single_flight(*window, run)
+        return await first, second
+
+    first, second = asyncio.run(trigger_twice())
+
+    assert calls == [("2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z")]
+    assert first.status_code == second.status_code == 200
+    assert "Attached to run" in second.get_body().decode()
+
+
+def test_running_lease_is_renewed_past_its_ttl(setup_env, monkeypatch):
+    monkeypatch.setenv("RUN_LEASE_TTL_SECONDS", "0.15")
+    monkeypatch.setenv("RUN_ATTACH_POLL_SECONDS", "0.01")
+    calls = []
+
+    async def run(after, before):
+        calls.append((after, before))
+        await asyncio.sleep(0.5)
+        return func.HttpResponse("Processed to sheet successfully", status_code=200)
+
+    async def trigger_after_ttl():
+        window = ("2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z")
+        first = asyncio.create_task(run_lease.single_flight(*window, run))
+        await asyncio.sleep(0.3)
+        second = await run_lease.single_flight(*window, run)
+        return await first, second
+
+    first, second = asyncio.run(trigger_after_ttl())
+
+    assert len(calls) == 1
+    assert first.status_code == second.status_code == 200
+    assert "Attached to run" in second.get_body().decode()
+
+
+def test_lease_is_renewed_while_the_run_blocks_the_loop(setup_env, monkeypatch):
+    monkeypatch.setenv("RUN_LEASE_TTL_SECONDS", "0.15")
+    monkeypatch.setenv("RUN_ATTACH_POLL_SECONDS", "0.01")
+    window = ("2024-01-01T00:00:00Z", "2024-01-03T00:00:00Z")
+    calls, results = [], {}
+
+    async def run(after, before):
+        calls.append((after, before))
+        # e.g. a synchronous resume download
+        time.sleep(0.6)
+        return func.HttpResponse("Processed to sheet successfully", status_code=200)
+
+    def trigger(name, delay):
+        time.sleep(delay)
+        results[name] = asyncio.run(run_lease.single_flight(*window, run))
+
+    threads = [
+        threading.Thread(target=trigger, args=("first", 0)),
+        threading.Thread(target=trigger, args=("second", 0.4)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results["first"].status_code == results["second"].status_code == 200
+    assert "Attached to run" in results["second"].get_body().decode()
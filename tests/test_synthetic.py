@@ -0,0 +1,25 @@
+import io
+
+from docx import Document
+from pypdf import PdfReader
+
+from benchmarks import synthetic
+
+
+def test_synthetic_resumes_are_extractable():
+    text = synthetic.make_resume_text(seed=3, positions=8)
+
+    pdf = PdfReader(io.BytesIO(synthetic.make_pdf(text, lines_per_page=20)))
+    assert len(pdf.pages) > 1
+    assert "EXPERIENCE" in pdf.pages[0].extract_text()
+
+    doc = Document(io.BytesIO(synthetic.make_docx(text)))
+    assert doc.paragraphs[0].text == text.split("\n")[0]
+
+
+def test_synthetic_applications_reference_jobs():
+    jobs = synthetic.make_jobs(5)
+    applications = synthetic.make_applications(20, jobs)
+    job_ids = {job["id"] for job in jobs}
+    assert all(app["jobs"][0]["id"] in job_ids for app in applications)
+    assert all(app["attachments"][0]["type"] == "resume" for app in applications)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import telemetry
+
+
+class _Response:
+    status_code = 200
+
+
+def test_traced_run_exports_nested_spans(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+
+    @telemetry.traced()
+    def stage(items):
+        telemetry.count("items", len(items))
+        telemetry.observe("item_seconds", 0.5)
+        return items
+
+    @telemetry.traced_run("pipeline")
+    async def pipeline():
+        with telemetry.span("outer"):
+            await asyncio.to_thread(stage, [1, 2, 3])
+        return _Response()
+
+    asyncio.run(pipeline())
+
+    [trace_file] = os.listdir(tmp_path)
+    with open(tmp_path / trace_file) as file:
+        spans = {span["name"]: span for span in json.load(file)["spans"]}
+    assert spans["pipeline"]["attributes"]["status_code"] == 200
+    assert spans["stage"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["stage"]["counters"] == {"items": 3}
+    assert spans["stage"]["observations"]["item_seconds"]["count"] == 1
+
+
+def test_traced_run_records_errors(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+
+    @telemetry.traced_run("pipeline")
+    async def pipeline():
+        with telemetry.span("stage"):
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(pipeline())
+
+    [trace_file] = os.listdir(tmp_path)
+    with open(tmp_path / trace_file) as file:
+        spans = {span["name"]: span for span in json.load(file)["spans"]}
+    assert spans["stage"]["status"] == "error"
+    assert spans["stage"]["error"] == "ValueError: boom"
+    assert spans["pipeline"]["status"] == "error"
+
+
+def test_traced_run_records_only_the_given_attributes(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+
+    @telemetry.traced_run("worker", attributes=lambda item, *_: {"part": item["part"]})
+    async def worker(item):
+        return _Response()
+
+    asyncio.run(worker({"part": 3, "candidates": [{"email": "a@example.com"}]}))
+
+    [trace_file] = os.listdir(tmp_path)
+    with open(tmp_path / trace_file) as file:
+        trace = file.read()
+    assert "a@example.com" not in trace
+    [root] = [span for span in json.loads(trace)["spans"] if span["name"] == "worker"]
+    assert root["attributes"] == {"part": 3, "status_code": 200}
+
+
+def test_run_files_are_opt_in_and_capped(monkeypatch, tmp_path):
+    @telemetry.traced_run("pipeline")
+    async def pipeline():
+        return _Response()
+
+    monkeypatch.delenv("TRACE_DIR", raising=False)
+    asyncio.run(pipeline())
+    assert os.listdir(tmp_path) == []
+
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("TRACE_MAX_FILES", "2")
+    for _ in range(4):
+        asyncio.run(pipeline())
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,66 @@
+import asyncio
+
+import webhooks
+from benchmarks.fake_services import FakeGreenhouse, FakeOpenAI
+
+
+def test_verify_signature():
+    body = b'{"action": "new_candidate_application"}'
+    signature = webhooks.sign(body, "secret")
+
+    assert signature.startswith("sha256 ")
+    assert webhooks.verify_signature(body, signature, "secret")
+    assert not webhooks.verify_signature(body + b" ", signature, "secret")
+    assert not webhooks.verify_signature(body, signature, "other")
+    assert not webhooks.verify_signature(body, None, "secret")
+
+
+def test_process_application_runs_one_candidate(setup_env, monkeypatch):
+    import main
+
+    with FakeGreenhouse(applications=5) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        rows = []
+        response = asyncio.run(main.process_application(500003, rows.extend))
+        missing = asyncio.run(main.process_application(1, rows.extend))
+
+        assert response.status_code == 200
+        assert missing.status_code == 404
+        assert rows
+        assert llm.summary()["POST /v1/chat/completions"]["requests"] == 1
+        assert "GET /v1/applications" not in greenhouse.summary()
+
+
+def test_written_applications_are_not_processed_again(setup_env, monkeypatch):
+    import main
+
+    with FakeGreenhouse(applications=3) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        application = greenhouse.applications[0]
+        rows = []
+
+        def completions():
+            return llm.summary()["POST /v1/chat/completions"]["requests"]
+
+        first = asyncio.run(main.process_application(application["id"], rows.extend))
+        # A stage change fires application_updated with the same resume
+        again = asyncio.run(main.process_application(application["id"], rows.extend))
+        assert first.status_code == again.status_code == 200
+        assert again.get_body() == b"Already processed"
+        assert completions() == 1
+
+        # The poll over the same window only extracts the other applications
+        response = asyncio.run(
+            main.process(
+                "2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z", write_rows=rows.extend
+            )
+        )
+        assert response.status_code == 200
+        assert completions() == 3
+
+        # A new resume is reprocessed
+        application["attachments"][0]["created_at"] = "2024-12-01T00:00:00.000Z"
+        asyncio.run(main.process_application(application["id"], rows.extend))
+        assert completions() == 4
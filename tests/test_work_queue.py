@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import work_queue
+from benchmarks.fake_services import FakeGreenhouse, FakeOpenAI
+
+
+@pytest.mark.parametrize("scheme", ["memory://", "sqlite://"])
+def test_queue_redelivers_until_completed(setup_env, scheme):
+    queue = work_queue.open_queue(scheme)
+    queue.put_many([{"n": 1}, {"n": 2}])
+
+    first = queue.get(visibility_timeout=0)
+    assert first.body == {"n": 1}
+    # Not completed, so it becomes visible again
+    again = queue.get(visibility_timeout=60)
+    assert (again.body, again.dequeue_count) == ({"n": 1}, 2)
+    queue.complete(again)
+
+    second = queue.get()
+    assert second.body == {"n": 2}
+    assert queue.get() is None
+    queue.complete(second)
+    assert len(queue) == 0
+    queue.close()
+
+
+def test_pack_messages_respects_count_and_size():
+    items = [{"text": "x" * 100}] * 7
+    assert [len(b) for b in work_queue.pack_messages(items, 3)] == [3, 3, 1]
+    assert [len(b) for b in work_queue.pack_messages(items, 10, max_bytes=250)] == [
+        2,
+        2,
+        2,
+        1,
+    ]
+
+
+def test_pack_messages_rejects_items_no_message_can_hold():
+    with pytest.raises(ValueError):
+        work_queue.pack_messages([{"text": "x"}, {"text": "x" * 300}], 10, 250)
+
+
+def test_fanout_processes_every_candidate(setup_env, monkeypatch):
+    import fanout
+
+    with FakeGreenhouse(applications=12) as greenhouse, FakeOpenAI() as llm:
+        monkeypatch.setattr(fanout.main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        monkeypatch.setattr(fanout.main, "WORK_ITEM_SIZE", 5)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{llm.url}/v1")
+        rows = []
+        summary = fanout.run_fanout(
+            "2024-01-01T00:00:00Z",
+            "2025-01-01T00:00:00Z",
+            concurrency=3,
+            write_rows=rows.extend,
+        )
+
+    assert summary["completed"] == 3 and summary["failed"] == 0
+    assert len({row["Candidate Id"] for row in rows}) == 12
+
+
+def test_enqueue_fails_the_run_when_a_send_fails(setup_env, monkeypatch):
+    import main
+
+    class FailingQueue(work_queue.MemoryQueue):
+        def put(self, body):
+            assert set(body) == {"run_id", "part", "application_ids"}
+            raise ConnectionError("queue unavailable")
+
+    with FakeGreenhouse(applications=3) as greenhouse:
+        monkeypatch.setattr(main, "HARVEST_API_URL", f"{greenhouse.url}/v1")
+        response = asyncio.run(
+            main.enqueue_process(
+                "2024-01-01T00:00:00Z", "2025-01-01T00:00:00Z", FailingQueue()
+            )
+        )
+
+    assert response.status_code == 500
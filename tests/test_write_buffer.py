@@ -0,0 +1,28 @@
+import pytest
+
+from write_buffer import WriteBuffer
+
+
+def test_write_buffer_coalesces_rows(tmp_path):
+    buffer = WriteBuffer(str(tmp_path / "buffer.db"))
+    limits = {"rows": 3, "seconds": 3600}
+    written = []
+    buffer.add(1, [{"Candidate Id": 1}])
+    # An update before the flush replaces the application's rows
+    buffer.add(1, [{"Candidate Id": 1, "School": "a"}, {"Candidate Id": 1}])
+    assert buffer.flush(written.extend, limits=limits) == 0
+
+    buffer.add(2, [{"Candidate Id": 2}])
+    assert buffer.flush(written.extend, limits=limits) == 3
+    assert len(written) == 3
+    assert buffer.pending()[0] == 0
+
+    def failing_write(rows):
+        raise RuntimeError("sheets down")
+
+    buffer.add(3, [{"Candidate Id": 3}])
+    with pytest.raises(RuntimeError):
+        buffer.flush(failing_write, force=True)
+    # Rows are kept for the next flush
+    assert buffer.flush(written.extend, force=True) == 1
+    buffer.close()
@@ -0,0 +1,36 @@
+import hashlib
+import hmac
+import os
+
+SIGNATURE_HEADER = "Signature"
+# Greenhouse actions that carry an application worth (re)processing. Updates
+# fire on every stage change; process_application skips those unless the
+# resume changed (see application_log).
+APPLICATION_ACTIONS = {
+    "new_candidate_application",
+    "application_updated",
+}
+
+
+def webhook_secret():
+    return os.getenv("GREENHOUSE_WEBHOOK_SECRET")
+
+
+def sign(body, secret):
+    """The Signature header Greenhouse sends for body: "sha256 <hex>"."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return f"sha256 {digest}"
+
+
+def verify_signature(body, signature, secret):
+    """Check a Signature header against the HMAC-SHA256 of the raw body."""
+    if not signature or not secret:
+        return False
+    return hmac.compare_digest(signature.strip(), sign(body, secret))
+
+
+def application_id(event):
+    """The application id of a webhook event, or None if it has none."""
+    payload = event.get("payload") or {}
+    application = payload.get("application") or {}
+    return application.get("id")
@@ -0,0 +1,268 @@
+import asyncio
+import collections
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+# Azure Storage queues cap messages at 64 KB, and queue-triggered Functions
+# expect them base64-encoded, so leave room for that.
+MAX_MESSAGE_BYTES = 45000
+# The queue ProcessRolesWorker is triggered from
+WORKER_QUEUE_NAME = "role-work-items"
+
+
+class Message:
+    def __init__(self, id, body, dequeue_count=1):
+        self.id = id
+        self.body = body
+        self.dequeue_count = dequeue_count
+
+
+class WorkQueue:
+    """
+    Minimal queue interface the coordinator and workers are written against.
+    get() hides a message for visibility_timeout seconds; it comes back if
+    it isn't completed in time, like Azure Storage queues.
+    """
+
+    def put(self, body):
+        raise NotImplementedError
+
+    def put_many(self, bodies):
+        for body in bodies:
+            self.put(body)
+
+    def get(self, visibility_timeout=300):
+        raise NotImplementedError
+
+    def complete(self, message):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryQueue(WorkQueue):
+    def __init__(self, max_dequeue_count=5):
+        self.max_dequeue_count = max_dequeue_count
+        self.messages = collections.deque()
+        self.in_flight = {}
+        self.poison = []
+        self.lock = threading.Lock()
+
+    def put(self, body):
+        with self.lock:
+            self.messages.append(Message(uuid.uuid4().hex, body, 0))
+
+    def get(self, visibility_timeout=300):
+        now = time.monotonic()
+        with self.lock:
+            for message_id, (message, visible_at) in list(self.in_flight.items()):
+                if visible_at <= now:
+                    # Redeliveries go first, like the oldest-first SQLite queue
+                    del self.in_flight[message_id]
+                    self.messages.appendleft(message)
+            while self.messages:
+                message = self.messages.popleft()
+                message.dequeue_count += 1
+                if message.dequeue_count > self.max_dequeue_count:
+                    self.poison.append(message)
+                    continue
+                self.in_flight[message.id] = (message, now + visibility_timeout)
+                return message
+        return None
+
+    def complete(self, message):
+        with self.lock:
+            self.in_flight.pop(message.id, None)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.messages) + len(self.in_flight)
+
+
+def work_queue_path():
+    return os.getenv(
+        "WORK_QUEUE_DB_PATH",
+        os.path.join(tempfile.gettempdir(), "recruitment_work_queue.db"),
+    )
+
+
+class SQLiteQueue(WorkQueue):
+    """Durable local queue; messages dequeued too often are set aside."""
+
+    def __init__(self, db_path=None, max_dequeue_count=5):
+        self.max_dequeue_count = max_dequeue_count
+        self.conn = sqlite3.connect(
+            db_path or work_queue_path(),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL, "
+            "dequeue_count INTEGER NOT NULL DEFAULT 0, "
+            "visible_at REAL NOT NULL, poison INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def put_many(self, bodies):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO messages (body, visible_at) VALUES (?, ?)",
+                [(json.dumps(body, default=str), now) for body in bodies],
+            )
+            self.conn.execute("COMMIT")
+
+    def put(self, body):
+        self.put_many([body])
+
+    def get(self, visibility_timeout=300):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE messages SET poison = 1 WHERE poison = 0 "
+                    "AND visible_at <= ? AND dequeue_count >= ?",
+                    (now, self.max_dequeue_count),
+                )
+                row = self.conn.execute(
+                    "SELECT id, body, dequeue_count FROM messages "
+                    "WHERE poison = 0 AND visible_at <= ? ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE messages SET dequeue_count = dequeue_count + 1, "
+                        "visible_at = ? WHERE id = ?",
+                        (now + visibility_timeout, row[0]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return Message(row[0], json.loads(row[1]), row[2] + 1)
+
+    def complete(self, message):
+        with self.lock:
+            self.conn.execute("DELETE FROM messages WHERE id = ?", (message.id,))
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE poison = 0"
+            ).fetchone()[0]
+
+
+class StorageQueue(WorkQueue):
+    """
+    Put-only client for an Azure Storage queue on the AzureWebJobsStorage
+    account. Unlike an output binding, which writes after the function
+    returns, put() has sent the message when it returns, so a failed send
+    fails the caller's run.
+    """
+
+    def __init__(self, queue_name=WORKER_QUEUE_NAME, connection_string=None):
+        from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+
+        self.client = QueueClient.from_connection_string(
+            connection_string or os.environ["AzureWebJobsStorage"],
+            queue_name,
+            message_encode_policy=TextBase64EncodePolicy(),
+        )
+
+    def put(self, body):
+        message = json.dumps(body, default=str)
+        if len(message) > MAX_MESSAGE_BYTES:
+            raise ValueError(
+                f"Work item of {len(message)} bytes is over {MAX_MESSAGE_BYTES}"
+            )
+        self.client.send_message(message)
+
+    def close(self):
+        self.client.close()
+
+
+def open_queue(url=None):
+    """
+    A queue from a WORK_QUEUE_URL-style string: "memory://",
+    "sqlite:///path/to/queue.db" ("sqlite://" uses WORK_QUEUE_DB_PATH) or
+    "azurequeue://<queue name>" (put-only; see StorageQueue).
+    """
+    url = url or os.getenv("WORK_QUEUE_URL", "sqlite://")
+    scheme, _, path = url.partition("://")
+    if scheme == "memory":
+        return MemoryQueue()
+    if scheme == "sqlite":
+        return SQLiteQueue(path or None)
+    if scheme == "azurequeue":
+        return StorageQueue(path or WORKER_QUEUE_NAME)
+    raise ValueError(f"Unsupported work queue: {url}")
+
+
+def pack_messages(items, max_items, max_bytes=MAX_MESSAGE_BYTES):
+    """
+    Group items into lists of at most max_items whose JSON stays under
+    max_bytes. An item too big on its own raises ValueError, since no queue
+    message could hold it.
+    """
+    batches, current, current_bytes = [], [], 0
+    for item in items:
+        size = len(json.dumps(item, default=str))
+        if size > max_bytes:
+            raise ValueError(f"Item of {size} bytes is over {max_bytes}")
+        if current and (len(current) >= max_items or current_bytes + size > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(item)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def drain(queue, handler, concurrency=4, visibility_timeout=300):
+    """
+    Run the async handler(body) for every message until the queue is empty,
+    on `concurrency` threads with their own event loops; the local stand-in
+    for queue-triggered worker instances. Failed messages reappear after
+    the visibility timeout. Returns (completed, failed) counts.
+    """
+    counts = collections.Counter()
+    counts_lock = threading.Lock()
+
+    def _worker():
+        while True:
+            message = queue.get(visibility_timeout)
+            if message is None:
+                return
+            try:
+                asyncio.run(handler(message.body))
+            except Exception as e:
+                print(f"Work item {message.id} failed: {e}")
+                with counts_lock:
+                    counts["failed"] += 1
+                continue
+            queue.complete(message)
+            with counts_lock:
+                counts["completed"] += 1
+
+    threads = [threading.Thread(target=_worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["completed"], counts["failed"]
@@ -0,0 +1,114 @@
+"""
+Rows waiting to be written to the sheet together, so frequent small runs
+(webhooks) don't each cost a Sheets append and aggregate push. The buffer
+lives on shared storage by default, so rows buffered on an instance that
+is scaled in are still flushed by the FlushWebhookWrites timer.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import storage
+
+
+def write_buffer_path():
+    return os.getenv("WRITE_BUFFER_DB_PATH") or storage.state_db_path(
+        "recruitment_write_buffer.db"
+    )
+
+
+def flush_limits():
+    return {
+        "rows": int(os.getenv("WRITE_FLUSH_ROWS", 50)),
+        "seconds": float(os.getenv("WRITE_FLUSH_SECONDS", 300)),
+    }
+
+
+class WriteBuffer:
+    """
+    Rows kept per key (e.g. an application), so a redelivery that arrives
+    before the flush replaces the earlier rows instead of duplicating them.
+    Shared by every invocation through one SQLite file.
+    """
+
+    def __init__(self, db_path=None):
+        self.conn = sqlite3.connect(
+            db_path or write_buffer_path(), timeout=30, isolation_level=None
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending_rows ("
+            "item_key TEXT PRIMARY KEY, rows TEXT NOT NULL, "
+            "row_count INTEGER NOT NULL, added_at REAL NOT NULL)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, item_key, rows):
+        if not rows:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pending_rows VALUES (?, ?, ?, ?)",
+            (
+                str(item_key),
+                json.dumps(rows, default=str),
+                len(rows),
+                time.time(),
+            ),
+        )
+
+    def pending(self):
+        """(row count, age in seconds of the oldest entry)"""
+        rows, oldest = self.conn.execute(
+            "SELECT COALESCE(SUM(row_count), 0), MIN(added_at) FROM pending_rows"
+        ).fetchone()
+        return rows, (time.time() - oldest if oldest is not None else 0.0)
+
+    def take(self):
+        """Remove and return everything pending as {item_key: rows}."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            taken = {
+                key: json.loads(stored)
+                for key, stored in self.conn.execute(
+                    "SELECT item_key, rows FROM pending_rows"
+                )
+            }
+            self.conn.execute("DELETE FROM pending_rows")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return taken
+
+    def restore(self, taken):
+        """Put taken rows back unless a newer version arrived meanwhile."""
+        for key, rows in taken.items():
+            self.conn.execute(
+                "INSERT OR IGNORE INTO pending_rows VALUES (?, ?, ?, ?)",
+                (key, json.dumps(rows, default=str), len(rows), time.time()),
+            )
+
+    def flush(self, write_rows, force=False, limits=None):
+        """
+        Write pending rows in one call when enough have piled up, the oldest
+        has waited long enough, or force is set. Returns the rows written.
+        """
+        limits = limits or flush_limits()
+        count, age = self.pending()
+        if not count or not (
+            force or count >= limits["rows"] or age >= limits["seconds"]
+        ):
+            return 0
+        taken = self.take()
+        rows = [row for application_rows in taken.values() for row in application_rows]
+        if not rows:
+            return 0
+        try:
+            write_rows(rows)
+        except Exception:
+            self.restore(taken)
+            raise
+        return len(rows)